@@ -11,28 +11,40 @@ async def main():
     date_str = get_target_date_str()
     print(f"=== 启动 News Saga Engine: {date_str} ===")
     
-    # 2. 爬取数据 (Eyes)
-    crawler = CrawlerService()
-    briefing = await crawler.fetch_daily_briefing(date_str)
+    # 2. 爬取 + 认知处理 (Eyes + Brain)
+    # 流式模式：每条新闻解析完立即进入 Saga 路由，抓取与 LLM 调用重叠进行
+    # 3. 归档 (Memory - Raw)：不依赖认知层处理是否成功，处理中途出错也要保住当天的原始档案
+    manager = SagaManager()
+    archiver = DataArchiver()
+    briefing = None
+    async with CrawlerService() as crawler:
+        stream = crawler.stream_daily_briefing(date_str)
+        print("🧠 进入认知层处理 (流式)...")
+        try:
+            await manager.process_news_stream(stream)
+        except Exception:
+            if not stream.completed:
+                # 顺序模式下处理与抓取交织，出错时流还没读完：重新抓一遍 (HTTP 缓存命中，开销很小) 再归档
+                print("⚠️ 认知层处理中断，补抓剩余新闻后归档原始档案")
+                stream = crawler.stream_daily_briefing(date_str)
+                async for _ in stream:
+                    pass
+            raise
+        finally:
+            if stream.completed:
+                briefing = stream.to_briefing()
+                if briefing:
+                    archiver.save_daily_raw(briefing)
     
     if not briefing:
         print("❌ 爬取失败或当日无新闻")
         return
 
-    print(f"✅ 爬取完成，共 {len(briefing.news_items)} 条新闻。")
-
-    # 2.5 立即归档 (Memory - Raw)
-    archiver = DataArchiver()
-    archiver.save_daily_raw(briefing)
-
-    # 3. 认知处理与归档 (Brain + Memory - Sagas)
-    print("🧠 进入认知层处理...")
-    manager = SagaManager()
-    await manager.process_daily_briefing(briefing)
+    print(f"✅ 爬取完成并已归档，共 {len(briefing.news_items)} 条新闻。")
 
     # 4. 生成展示层报告 (The Face)
     print("\n>>> 阶段 4: 生成可视化报告")
-    reporter = SagaReporter()
+    reporter = SagaReporter(store=manager.store, url_index=manager.url_index)
     
     # [修改] 这里将 briefing 传入，以便渲染“今日原始档案”区域
     reporter.generate_readme("README.md", briefing=briefing)
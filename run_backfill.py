@@ -0,0 +1,30 @@
+# run_backfill.py
+import argparse
+import asyncio
+import sys
+from src.date_utils import iter_date_range
+from src.backfill import BackfillRunner
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="按日期区间回填原始档案 (可断点续跑)")
+    parser.add_argument("start", help="开始日期 YYYYMMDD")
+    parser.add_argument("end", help="结束日期 YYYYMMDD (包含)")
+    parser.add_argument("--concurrency", type=int, default=3, help="同时抓取的日期数")
+    parser.add_argument("--retry-empty", action="store_true", help="重新抓取上次判定为无内容的日期")
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    dates = iter_date_range(args.start, args.end)
+    print(f"=== 📦 启动回填 (Backfill): {args.start} ~ {args.end} ===")
+
+    runner = BackfillRunner(concurrency=args.concurrency)
+    stats = await runner.run(dates, retry_empty=args.retry_empty)
+
+    print("=== 📦 回填任务结束 ===")
+    # 有失败或缺页的日期时返回非零状态码，便于外部重试
+    if stats[BackfillRunner.FAILED] or stats[BackfillRunner.PARTIAL]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
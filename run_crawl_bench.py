@@ -0,0 +1,123 @@
+# run_crawl_bench.py
+import argparse
+import asyncio
+import time
+import psutil
+from src.crawler import CrawlerService
+from src.fetch_governor import FetchGovernor
+from src.fixtures import FixtureRecorder, FixtureServer
+
+class RssSampler:
+    """后台采样本进程及全部子进程 (解析进程池、浏览器) 的 RSS，记录峰值"""
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._task = None
+
+    def _sample(self) -> int:
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    async def _loop(self):
+        while True:
+            self.peak_bytes = max(self.peak_bytes, self._sample())
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._task.cancel()
+        self.peak_bytes = max(self.peak_bytes, self._sample())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="爬虫夹具录制 / 本地替身服务器 / 抓取基准测试")
+    parser.add_argument("--fixtures", default="data/fixtures", help="夹具目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="录制某天的列表页、摘要页和详情页")
+    record.add_argument("dates", nargs="+", help="日期 YYYYMMDD")
+
+    def add_server_args(p):
+        p.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的平均注入延迟")
+        p.add_argument("--jitter", type=float, default=0.5, help="延迟抖动比例 (0~1)")
+        p.add_argument("--error-rate", type=float, default=0.0, help="随机返回 503 的概率")
+        p.add_argument("--seed", type=int, default=0)
+
+    serve = sub.add_parser("serve", help="启动本地替身服务器 (Ctrl+C 退出)")
+    serve.add_argument("--port", type=int, default=8800)
+    add_server_args(serve)
+
+    bench = sub.add_parser("bench", help="对各抓取模式跑基准测试")
+    bench.add_argument("date", help="已录制的日期 YYYYMMDD")
+    bench.add_argument("--modes", nargs="+", default=["http", "browser"], choices=["http", "browser"])
+    bench.add_argument("--parse-executor", default="process", choices=["process", "thread", "inline"])
+    bench.add_argument("--repeat", type=int, default=1, help="每种模式重复次数")
+    bench.add_argument("--rate", type=float, default=1000.0, help="每秒请求数上限 (本地测试默认放开)")
+    bench.add_argument("--concurrency", type=int, default=16, help="单域名并发上限")
+    add_server_args(bench)
+    return parser.parse_args()
+
+async def run_bench(args):
+    server = FixtureServer(args.fixtures, latency_ms=args.latency_ms, jitter=args.jitter,
+                           error_rate=args.error_rate, seed=args.seed)
+    rows = []
+    async with server:
+        for mode in args.modes:
+            for run in range(args.repeat):
+                governor = FetchGovernor(rate=args.rate, max_concurrency=args.concurrency, backoff_base=0.1)
+                crawler = CrawlerService(mode=mode, cache_mode="off", parse_executor=args.parse_executor,
+                                         base_url_template=server.base_url_template, governor=governor)
+                async with RssSampler() as sampler:
+                    start = time.perf_counter()
+                    async with crawler:
+                        briefing = await crawler.fetch_daily_briefing(args.date)
+                    wall = time.perf_counter() - start
+
+                pages = len(governor.outcomes)
+                rows.append({
+                    "mode": mode,
+                    "run": run + 1,
+                    "items": len(briefing.news_items) if briefing else 0,
+                    "pages": pages,
+                    "failed": len(governor.failed()),
+                    "wall_s": wall,
+                    "pages_per_s": pages / wall if wall else 0.0,
+                    "parse_ms_per_page": 1000 * crawler.parse_stats["seconds"] / max(1, crawler.parse_stats["pages"]),
+                    "peak_rss_mb": sampler.peak_bytes / 1024 / 1024,
+                })
+
+    print(f"\n=== ⏱️ 抓取基准: {args.date} (latency={args.latency_ms}ms, error_rate={args.error_rate}, "
+          f"parse={args.parse_executor}) ===")
+    print(f"{'mode':<8}{'run':>4}{'items':>7}{'pages':>7}{'failed':>8}{'wall(s)':>9}{'pages/s':>9}{'parse(ms/p)':>13}{'peakRSS(MB)':>13}")
+    for r in rows:
+        print(f"{r['mode']:<8}{r['run']:>4}{r['items']:>7}{r['pages']:>7}{r['failed']:>8}{r['wall_s']:>9.2f}"
+              f"{r['pages_per_s']:>9.1f}{r['parse_ms_per_page']:>13.2f}{r['peak_rss_mb']:>13.1f}")
+    print(f"(服务器统计: {server.stats})")
+
+async def main():
+    args = parse_args()
+    if args.command == "record":
+        recorder = FixtureRecorder(args.fixtures)
+        for date_str in args.dates:
+            await recorder.record(date_str)
+
+    elif args.command == "serve":
+        server = FixtureServer(args.fixtures, port=args.port, latency_ms=args.latency_ms,
+                               jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+        async with server:
+            print(f"💡 列表页模板: {server.base_url_template}")
+            await asyncio.Event().wait()
+
+    elif args.command == "bench":
+        await run_bench(args)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,8 +11,8 @@ async def main():
     print(f"=== 📥 启动数据采集 (Fetch): {date_str} ===")
     
     # 2. 爬取数据 (Crawl)
-    crawler = CrawlerService()
-    briefing = await crawler.fetch_daily_briefing(date_str)
+    async with CrawlerService() as crawler:
+        briefing = await crawler.fetch_daily_briefing(date_str)
     
     if not briefing or not briefing.news_items:
         print(f"❌ 采集失败或当日({date_str})无新闻内容")
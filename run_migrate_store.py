@@ -0,0 +1,109 @@
+# run_migrate_store.py
+import argparse
+import sys
+from datetime import datetime, timedelta
+from src.saga_store import (JsonSagaStore, SqliteSagaStore, export_json, open_saga_store,
+                            sqlite_path_for, log_path_for, index_dir_for)
+from src.saga_catalog import SagaCatalog, cold_dir_for, open_cold_store
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="故事线存储迁移: JSON 目录 <-> SQLite 数据库")
+    parser.add_argument("--sagas", default="data/sagas", help="故事线 JSON 目录 (数据库为同名 .sqlite 文件)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    to_sqlite = sub.add_parser("to-sqlite", help="把 JSON 目录 (及冷存储) 导入 SQLite (各一个事务)，导入后自动改用 SQLite")
+    to_sqlite.add_argument("--force", action="store_true", help="数据库已存在时覆盖其中的同名故事线")
+
+    export = sub.add_parser("export-json", help="把 SQLite 中的故事线导出为每文件一个 JSON (兼容旧格式)")
+    export.add_argument("--output", help="导出目录 (默认写回 --sagas 目录)")
+
+    sub.add_parser("compact", help="把事件日志合并进快照 (JSON) / 截断 WAL (SQLite)")
+
+    archive = sub.add_parser("archive-cold", help="把较早的事件移入冷存储 (完整历史不变)")
+    archive.add_argument("--days", type=int, required=True, help="早于今天 N 天的事件移入冷存储")
+    return parser.parse_args()
+
+def _copy_to_sqlite(source: JsonSagaStore, db_path) -> bool:
+    """把一个 JSON 存储导入 SQLite，并逐个故事线核对事件数与 URL 集合"""
+    sagas = source.load_all()
+    target = SqliteSagaStore(str(db_path))
+    target.save_many(sagas.values())
+
+    imported = target.load_all()
+    mismatched = [saga_id for saga_id, saga in sagas.items()
+                  if saga_id not in imported or len(imported[saga_id].events) != len(saga.events)]
+    ok = not mismatched and source.processed_urls() <= target.processed_urls()
+    counts = target.counts()
+    target.close()
+    expected_events = sum(len(s.events) for s in sagas.values())
+    print(f"{'✅' if ok else '❌'} 已导入 {len(sagas)} 个故事线 / {expected_events} 个事件 -> {db_path} "
+          f"(数据库中共 {counts['sagas']} / {counts['events']})")
+    for saga_id in mismatched[:10]:
+        got = len(imported[saga_id].events) if saga_id in imported else "缺失"
+        print(f"   ❌ {saga_id}: 源 {len(sagas[saga_id].events)} 个事件，数据库 {got}")
+    return ok
+
+def to_sqlite(args):
+    db_path = sqlite_path_for(args.sagas)
+    # 冷存储跟随热存储的后端 (open_cold_store 按热存储类型查找)，一并迁移
+    cold_dir = cold_dir_for(args.sagas)
+    cold_db_path = sqlite_path_for(str(cold_dir))
+    for path in (db_path, cold_db_path):
+        if path.exists() and not args.force:
+            print(f"❌ 数据库已存在: {path} (使用 --force 覆盖)")
+            sys.exit(1)
+
+    ok = _copy_to_sqlite(JsonSagaStore(args.sagas, log_path=str(log_path_for(args.sagas))), db_path)
+    if cold_dir.exists():
+        ok = _copy_to_sqlite(JsonSagaStore(str(cold_dir)), cold_db_path) and ok
+    if not ok:
+        sys.exit(1)
+    print(f"💡 SAGA_STORE_BACKEND=auto 时将自动使用该数据库；{args.sagas}/*.json 不再更新，"
+          f"需要时用 export-json 重新导出")
+
+def export(args):
+    db_path = sqlite_path_for(args.sagas)
+    if not db_path.exists():
+        print(f"❌ 未找到数据库: {db_path}")
+        sys.exit(1)
+    store = SqliteSagaStore(str(db_path))
+    output = args.output or args.sagas
+    log_path = log_path_for(output)
+    if log_path.exists() and log_path.stat().st_size:
+        print(f"❌ {log_path} 中还有未合并的事件日志，会覆盖导出结果；请先删除或运行 compact")
+        sys.exit(1)
+    count = export_json(store, output)
+    store.close()
+    print(f"✅ 已导出 {count} 个故事线 -> {output}")
+
+def compact(args):
+    store = open_saga_store(args.sagas)
+    count = store.compact()
+    store.close()
+    print(f"✅ 已合并: 重写 {count} 个故事线快照")
+
+def archive_cold(args):
+    store = open_saga_store(args.sagas)
+    catalog = SagaCatalog(store, str(index_dir_for(args.sagas) / "catalog.json"),
+                          cold=open_cold_store(args.sagas, store))
+    catalog.load()
+    cutoff = (datetime.now() - timedelta(days=args.days)).strftime("%Y%m%d")
+    moved = catalog.archive_cold(cutoff, args.sagas)
+    store.compact()
+    catalog.flush()
+    store.close()
+    print(f"✅ 已把 {cutoff} 之前的 {moved} 个事件移入冷存储")
+
+def main():
+    args = parse_args()
+    if args.command == "to-sqlite":
+        to_sqlite(args)
+    elif args.command == "export-json":
+        export(args)
+    elif args.command == "compact":
+        compact(args)
+    elif args.command == "archive-cold":
+        archive_cold(args)
+
+if __name__ == "__main__":
+    main()
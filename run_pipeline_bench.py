@@ -0,0 +1,135 @@
+# run_pipeline_bench.py
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from src.archiver import DataArchiver
+from src.intelligence import IntelligenceEngine
+from src.llm_governor import LLMGovernor
+from src.llm_stub import LLMStubServer
+from src.manager import SagaManager
+from src.reporter import SagaReporter
+from src.saga_store import SagaStore, open_saga_store, sqlite_path_for, log_path_for
+from src.saga_catalog import cold_dir_for, open_cold_store, merge_cold
+from src.run_journal import RunJournal
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="用本地 LLM 替身服务对认知层 + 报告渲染做端到端基准测试")
+    parser.add_argument("dates", nargs="+", help="已归档的日期 YYYYMMDD (按顺序处理)")
+    parser.add_argument("--archive", default="data/archive", help="原始档案目录")
+    parser.add_argument("--sagas", default="data/sagas", help="作为起点的故事线目录 (只读，会复制到临时目录)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="依次测试的 SagaManager 并发")
+    parser.add_argument("--repeat", type=int, default=1, help="每种配置重复次数")
+    parser.add_argument("--cache", choices=["off", "cold", "warm"], default="off",
+                        help="LLM 缓存: off 不用；cold 每轮全新缓存；warm 先预跑一遍再计时")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json", help="临时故事线存储后端")
+    parser.add_argument("--fused", action="store_true", help="启用融合路由")
+    parser.add_argument("--speculative", action="store_true", help="启用投机摘要")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="替身服务的平均响应延迟")
+    parser.add_argument("--jitter", type=float, default=0.5, help="uniform 为抖动比例，lognormal 为 sigma")
+    parser.add_argument("--distribution", choices=["uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回 429/503 的概率")
+    parser.add_argument("--chars-per-token", type=float, default=1.5, help="估算 token 数用的字符/token 比")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+def prepare_sagas(src_dir: str, target: SagaStore, first_date: str) -> int:
+    """复制故事线并剪掉基准日期及之后的事件，让这些新闻重新走一遍完整流程"""
+    kept = []
+    source = open_saga_store(src_dir)
+    cold = open_cold_store(src_dir, source)
+    for saga in source.load_all().values():
+        saga = merge_cold(saga, cold)
+        saga.events = [e for e in saga.events if e.date < first_date]
+        if saga.events:
+            kept.append(saga)
+    target.save_many(kept)
+    return len(kept)
+
+async def run_once(args, briefings, stub: LLMStubServer, concurrency: int, workdir: Path, cache_path) -> dict:
+    sagas_dir = workdir / "sagas"
+    store = open_saga_store(str(sagas_dir), backend=args.store)
+    prepare_sagas(args.sagas, store, args.dates[0])
+    governor = LLMGovernor(backoff_base=0.05, backoff_cap=1.0)
+    engine = IntelligenceEngine(api_key="stub", base_url=stub.base_url, cache_path=cache_path,
+                                ledger_dir=None, governor=governor)
+    manager = SagaManager(str(sagas_dir), concurrency=concurrency, speculative=args.speculative,
+                          fused=args.fused, pre_route=False, intelligence=engine, store=store,
+                          journal=RunJournal(None))  # 不读写断点日志，每轮都完整处理
+
+    items, process_s, summaries = 0, 0.0, []
+    for briefing in briefings:
+        start = time.perf_counter()
+        await manager.process_daily_briefing(briefing)
+        process_s += time.perf_counter() - start
+        items += len(briefing.news_items)
+        summaries.append(engine.ledger.last_summary or {})
+
+    reporter = SagaReporter(str(sagas_dir), store=store, url_index=manager.url_index)
+    start = time.perf_counter()
+    reporter.generate_readme(str(workdir / "README.md"), briefing=briefings[-1])
+    reporter.generate_html_report(str(workdir / "report.html"), briefing=briefings[-1])
+    render_s = time.perf_counter() - start
+    store.close()
+
+    by_func = {}
+    for summary in summaries:
+        for func, entry in summary.get("by_func", {}).items():
+            by_func.setdefault(func, []).append(entry)
+    return {
+        "items": items,
+        "process_s": process_s,
+        "render_s": render_s,
+        "items_per_s": items / process_s if process_s else 0.0,
+        "sent": sum(s.get("sent", 0) for s in summaries),
+        "cache_hits": sum(s.get("cache_hits", 0) for s in summaries),
+        "retries": sum(s.get("retries", 0) for s in summaries),
+        "deferred": len(manager.deferred),
+        # 多天的分位数取各天中的最大值，只作粗略对比
+        "stages": {func: (sum(e["sent"] for e in entries),
+                          max(e["p50"] for e in entries), max(e["p95"] for e in entries))
+                   for func, entries in by_func.items()},
+    }
+
+async def run_bench(args):
+    archiver = DataArchiver(args.archive)
+    briefings = [archiver.load_daily_raw(d) for d in args.dates]
+    stub = LLMStubServer(latency_ms=args.latency_ms, jitter=args.jitter, distribution=args.distribution,
+                         error_rate=args.error_rate, chars_per_token=args.chars_per_token, seed=args.seed)
+    rows = []
+    async with stub:
+        for concurrency in args.concurrency:
+            for run in range(args.repeat):
+                with tempfile.TemporaryDirectory(prefix="pipeline_bench_") as tmp:
+                    workdir = Path(tmp)
+                    cache_path = str(workdir / "llm_cache.sqlite") if args.cache != "off" else None
+                    if args.cache == "warm":
+                        await run_once(args, briefings, stub, concurrency, workdir, cache_path)
+                        sagas_dir = str(workdir / "sagas")
+                        for data_dir in (sagas_dir, str(cold_dir_for(sagas_dir))):
+                            shutil.rmtree(data_dir, ignore_errors=True)
+                            sqlite_path_for(data_dir).unlink(missing_ok=True)
+                        log_path_for(sagas_dir).unlink(missing_ok=True)
+                        shutil.rmtree(workdir / "sagas_index", ignore_errors=True)
+                    result = await run_once(args, briefings, stub, concurrency, workdir, cache_path)
+                rows.append({"concurrency": concurrency, "run": run + 1, **result})
+
+    print(f"\n=== ⏱️ 认知层基准: {', '.join(args.dates)} (latency={args.latency_ms}ms/{args.distribution}, "
+          f"error_rate={args.error_rate}, cache={args.cache}, store={args.store}, fused={args.fused}, speculative={args.speculative}) ===")
+    print(f"{'conc':>5}{'run':>4}{'items':>7}{'process(s)':>12}{'items/s':>9}{'sent':>6}{'hits':>6}"
+          f"{'retries':>9}{'deferred':>10}{'render(ms)':>12}")
+    for r in rows:
+        print(f"{r['concurrency']:>5}{r['run']:>4}{r['items']:>7}{r['process_s']:>12.2f}{r['items_per_s']:>9.2f}"
+              f"{r['sent']:>6}{r['cache_hits']:>6}{r['retries']:>9}{r['deferred']:>10}{1000 * r['render_s']:>12.1f}")
+
+    print("\n各阶段 LLM 延迟 (实际发出的请求):")
+    print(f"{'conc':>5}{'run':>4}  {'stage':<12}{'sent':>6}{'p50(s)':>9}{'p95(s)':>9}")
+    for r in rows:
+        for func, (sent, p50, p95) in sorted(r["stages"].items()):
+            print(f"{r['concurrency']:>5}{r['run']:>4}  {func:<12}{sent:>6}{p50:>9.3f}{p95:>9.3f}")
+    print(f"(替身服务统计: {stub.stats})")
+
+if __name__ == "__main__":
+    asyncio.run(run_bench(parse_args()))
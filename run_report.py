@@ -2,6 +2,7 @@
 FilePath: \news_crawl\run_report.py
 '''
 # run_report.py
+import argparse
 import asyncio
 import os
 import sys
@@ -15,7 +16,14 @@ from src.notifier import EmailNotifier
 # 加载环境变量 (API Key, SMTP Config)
 load_dotenv()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="认知层处理 + 报告生成 (中途中断后重跑可从断点继续)")
+    parser.add_argument("--retry-failed", action="store_true", help="连续失败次数已达上限 (RUN_JOURNAL_MAX_ATTEMPTS) 的新闻也重新处理")
+    return parser.parse_args()
+
 async def main():
+    args = parse_args()
+
     # 1. 确定目标日期
     date_str = get_target_date_str()
     print(f"=== 📊 启动报告生成 (Report): {date_str} ===")
@@ -33,12 +41,12 @@ async def main():
     # 3. 认知层处理 (AI Analysis & Saga Update)
     # 注意：这一步会调用 LLM 并更新 data/sagas 下的 JSON 文件
     print("\n🧠 进入认知层处理 (Saga Analysis)...")
-    manager = SagaManager()
+    manager = SagaManager(retry_failed=args.retry_failed)
     await manager.process_daily_briefing(briefing)
 
     # 4. 生成可视化报告 (Render)
     print("\n🎨 生成可视化报告...")
-    reporter = SagaReporter()
+    reporter = SagaReporter(store=manager.store, url_index=manager.url_index)
     
     # A. 生成 Markdown (用于 GitHub 仓库展示)
     reporter.generate_readme("README.md", briefing=briefing)
@@ -0,0 +1,41 @@
+# run_train_pre_router.py
+import argparse
+import sys
+from src.config import PRE_ROUTER_MODEL_PATH, PRE_ROUTER_IGNORE_THRESHOLD
+from src.pre_router import PreRouter, build_training_set, cross_validate, IGNORED
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="用历史档案与故事线重新训练本地预路由分类器")
+    parser.add_argument("--archive", default="data/archive", help="原始档案目录")
+    parser.add_argument("--sagas", default="data/sagas", help="故事线目录")
+    parser.add_argument("--output", default=PRE_ROUTER_MODEL_PATH, help="模型输出路径")
+    parser.add_argument("--folds", type=int, default=5, help="交叉验证折数")
+    parser.add_argument("--min-per-class", type=int, default=30, help="每类最少样本数，不足则不训练")
+    parser.add_argument("--eval-only", action="store_true", help="只输出交叉验证结果，不保存模型")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    samples = build_training_set(args.archive, args.sagas)
+    ignored = sum(1 for *_, label in samples if label == IGNORED)
+    routed = len(samples) - ignored
+    print(f"=== 🧮 预路由训练: {len(samples)} 条样本 (忽略 {ignored} / 路由 {routed}) ===")
+    if min(ignored, routed) < args.min_per_class:
+        print(f"❌ 样本不足 (每类至少 {args.min_per_class} 条)，跳过训练")
+        sys.exit(1)
+
+    thresholds = sorted({0.5, 0.7, 0.8, 0.9, 0.95, 0.99, PRE_ROUTER_IGNORE_THRESHOLD})
+    print(f"\n{args.folds} 折交叉验证 (当前阈值 {PRE_ROUTER_IGNORE_THRESHOLD}):")
+    print(f"{'threshold':>10}{'skip':>8}{'precision':>11}{'lost':>6}")
+    for row in cross_validate(samples, thresholds, folds=args.folds):
+        marker = " ←" if row["threshold"] == PRE_ROUTER_IGNORE_THRESHOLD else ""
+        print(f"{row['threshold']:>10.2f}{row['skip_rate']:>8.1%}{row['precision']:>11.1%}{row['lost']:>6}{marker}")
+
+    if args.eval_only:
+        return
+    model = PreRouter.train(samples, folds=args.folds)
+    model.save(args.output)
+    print(f"\n💾 模型已保存: {args.output}")
+
+if __name__ == "__main__":
+    main()
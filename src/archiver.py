@@ -39,6 +39,11 @@ class DataArchiver:
         print(f"💾 [Archiver] 原始档案已保存: {file_path}")
         return str(file_path)
 
+    def has_daily_raw(self, date_str: str) -> bool:
+        """判断某日原始档案是否已存在 (用于回填时跳过)"""
+        year = date_str[:4]
+        return (self.base_dir / year / f"{date_str}_raw.json").exists()
+
     def load_daily_raw(self, date_str: str) -> DailyBriefing:
         """
         读取历史档案 (用于回溯或重试)
@@ -0,0 +1,115 @@
+# src/backfill.py
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .archiver import DataArchiver
+from .crawler import CrawlerService
+
+class BackfillRunner:
+    """
+    日期区间回填：跳过已归档日期，多个日期并发抓取 (全局并发上限)，
+    并把每个日期的进度写入进度文件，任务被杀后重启可从断点继续。
+    """
+    # 进度状态
+    RUNNING = "running"
+    DONE = "done"
+    PARTIAL = "partial"  # 已归档，但有详情页未能获取，下次回填时重新抓取
+    EMPTY = "empty"    # 列表页正常返回但无内容 (如当天无节目)
+    FAILED = "failed"
+
+    def __init__(self, archiver: Optional[DataArchiver] = None, progress_path: str = "data/backfill_progress.json",
+                 concurrency: int = 3):
+        self.archiver = archiver or DataArchiver()
+        self.progress_path = Path(progress_path)
+        self.concurrency = concurrency
+        self.progress: Dict[str, Dict] = self._load_progress()
+
+    def _load_progress(self) -> Dict[str, Dict]:
+        if not self.progress_path.exists():
+            return {}
+        try:
+            with open(self.progress_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ [Backfill] 进度文件损坏，重新开始: {e}")
+            return {}
+
+    def _mark(self, date_str: str, status: str, **extra):
+        self.progress[date_str] = {
+            "status": status,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            **extra
+        }
+        # 先写临时文件再原子替换，避免进程被杀时留下半截 JSON
+        self.progress_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.progress_path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.progress, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.progress_path)
+
+    def pending_dates(self, dates: List[str], retry_empty: bool = False) -> List[str]:
+        """过滤出仍需抓取的日期"""
+        pending = []
+        for date_str in dates:
+            status = self.progress.get(date_str, {}).get("status")
+            if self.archiver.has_daily_raw(date_str) and status != self.PARTIAL:
+                continue
+            if status == self.EMPTY and not retry_empty:
+                continue
+            pending.append(date_str)
+        return pending
+
+    async def run(self, dates: List[str], retry_empty: bool = False) -> Dict[str, int]:
+        pending = self.pending_dates(dates, retry_empty)
+        print(f"📦 [Backfill] 区间共 {len(dates)} 天，待抓取 {len(pending)} 天 (并发 {self.concurrency})")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stats = {self.DONE: 0, self.PARTIAL: 0, self.EMPTY: 0, self.FAILED: 0}
+
+        # 所有日期共用一个 CrawlerService，浏览器与连接池只启动一次
+        async with CrawlerService() as crawler:
+            async def crawl_one(date_str: str):
+                async with semaphore:
+                    self._mark(date_str, self.RUNNING)
+                    try:
+                        stream = crawler.stream_daily_briefing(date_str)
+                        async for _ in stream:
+                            pass
+                        briefing = stream.to_briefing()
+                    except Exception as e:
+                        print(f"❌ [Backfill] {date_str} 抓取异常: {e}")
+                        self._mark(date_str, self.FAILED, error=str(e))
+                        stats[self.FAILED] += 1
+                        return
+
+                    if stream.list_failed:
+                        # 列表页没拿到 (网络错误/非 200)：记为失败，下次回填重试，不能当作当天无节目
+                        print(f"❌ [Backfill] {date_str} 列表页获取失败")
+                        self._mark(date_str, self.FAILED, error="list page fetch failed")
+                        stats[self.FAILED] += 1
+                        return
+
+                    if not briefing or not briefing.news_items:
+                        print(f"📭 [Backfill] {date_str} 无新闻内容")
+                        self._mark(date_str, self.EMPTY)
+                        stats[self.EMPTY] += 1
+                        return
+
+                    # 缺页的日期也先归档 (有总比没有好)，但记为 PARTIAL，下次回填时整天重新抓取
+                    saved_path = self.archiver.save_daily_raw(briefing)
+                    status = self.PARTIAL if stream.failed_urls else self.DONE
+                    if status == self.PARTIAL:
+                        print(f"⚠️ [Backfill] {date_str} 有 {len(stream.failed_urls)} 个详情页缺失，记为部分完成")
+                    self._mark(date_str, status, items=len(briefing.news_items), path=saved_path,
+                               failed_pages=stream.failed_urls)
+                    stats[status] += 1
+
+            await asyncio.gather(*(crawl_one(d) for d in pending))
+
+        print(f"📦 [Backfill] 完成: 成功 {stats[self.DONE]} / 缺页 {stats[self.PARTIAL]} / "
+              f"无内容 {stats[self.EMPTY]} / 失败 {stats[self.FAILED]}")
+        return stats
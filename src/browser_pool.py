@@ -0,0 +1,56 @@
+# src/browser_pool.py
+import asyncio
+from typing import List, Optional
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+
+from .config import BROWSER_MAX_PAGES
+
+class BrowserPool:
+    """
+    进程级共享浏览器池
+    整个进程只启动一次 Chromium，摘要页、详情页以及多个日期的抓取共用同一个 AsyncWebCrawler，
+    通过信号量限制同时打开的页面数。
+    """
+    def __init__(self, browser_config: BrowserConfig, max_pages: int = BROWSER_MAX_PAGES):
+        self.browser_config = browser_config
+        self.max_pages = max_pages
+        self.launch_count = 0  # 浏览器实际启动次数 (用于观测)
+        self._crawler: Optional[AsyncWebCrawler] = None
+        self._start_lock = asyncio.Lock()
+        self._pages = asyncio.Semaphore(max_pages)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _ensure_started(self) -> AsyncWebCrawler:
+        # 懒启动：HTTP 直连全部成功时完全不需要拉起浏览器
+        async with self._start_lock:
+            if self._crawler is None:
+                print(f"🌐 [BrowserPool] 启动浏览器 (max_pages={self.max_pages})")
+                crawler = AsyncWebCrawler(config=self.browser_config)
+                await crawler.start()
+                self._crawler = crawler
+                self.launch_count += 1
+        return self._crawler
+
+    async def arun(self, url: str, config: CrawlerRunConfig):
+        """渲染单个页面，异常时返回 None"""
+        crawler = await self._ensure_started()
+        async with self._pages:
+            try:
+                return await crawler.arun(url=url, config=config)
+            except Exception as e:
+                print(f"⚠️ [BrowserPool] 渲染失败 {url}: {e}")
+                return None
+
+    async def arun_many(self, urls: List[str], config: CrawlerRunConfig) -> List:
+        """并发渲染多个页面 (受 max_pages 限制)，结果顺序与 urls 一致"""
+        return await asyncio.gather(*(self.arun(url, config) for url in urls))
+
+    async def close(self):
+        if self._crawler is not None:
+            await self._crawler.close()
+            self._crawler = None
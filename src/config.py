@@ -8,6 +8,35 @@ load_dotenv()  # [新增] 加载 .env 文件中的环境变量
 BASE_URL_TEMPLATE = "https://tv.cctv.com/lm/xwlb/day/{date_str}.shtml"
 DATA_DIR = "data"
 
+# --- 抓取模式配置 ---
+# http: 详情页/摘要页优先用 aiohttp 直连下载，仅当 #content_area 缺失或为空时才回退到 Crawl4AI 浏览器渲染
+# browser: 全部交给 Crawl4AI 渲染 (旧行为)
+CRAWL_MODE = os.getenv("CRAWL_MODE", "http")
+HTTP_CONCURRENCY = int(os.getenv("HTTP_CONCURRENCY", "8"))  # 连接池上限
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))  # 单次请求超时 (秒)
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))  # 共享浏览器池同时打开的最大页面数
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+# --- 抓取限流与重试 (按域名) ---
+FETCH_RATE_PER_HOST = float(os.getenv("FETCH_RATE_PER_HOST", "5"))  # 每秒请求数 (令牌桶速率)
+FETCH_MAX_CONCURRENCY_PER_HOST = int(os.getenv("FETCH_MAX_CONCURRENCY_PER_HOST", "8"))  # 自适应并发的上限
+FETCH_MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", "3"))  # 403/429/5xx/超时 的最大重试次数
+
+# --- HTTP 响应缓存 ---
+# off: 关闭; revalidate: 命中后条件请求 (ETag/Last-Modified); replay: 完全离线，只读缓存
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "revalidate")
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, "cache", "http")
+# 超过该天数未再使用 (下载或 304 复用) 的缓存条目在抓取结束时清理；0 表示不清理
+HTTP_CACHE_TTL_DAYS = float(os.getenv("HTTP_CACHE_TTL_DAYS", "30"))
+
+# --- HTML 解析执行器 ---
+# process: 进程池 (默认，解析与网络 I/O 跨核并行); thread: 线程池; inline: 在事件循环内直接解析
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "process")
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
 # --- 爬虫选择器配置 ---
 # 请确保这里填入你实际测试通过的 CSS Selectors
 SELECTORS = {
@@ -71,4 +100,81 @@ if not LLM_API_KEY:
 
 # 可选修改：给 Base URL 和 Model 设置默认值，但允许环境变量覆盖
 LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.siliconflow.cn/v1")
-LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-ai/DeepSeek-V3") # 注意模型名是否正确
\ No newline at end of file
+LLM_MODEL = os.getenv("LLM_MODEL", "deepseek-ai/DeepSeek-V3") # 注意模型名是否正确
+
+# --- LLM 响应缓存 (SQLite，按 模型+消息+温度 命中) ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.path.join(DATA_DIR, "cache", "llm_cache.sqlite")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# --- Saga 处理并发 ---
+# 同时进行 LLM 路由/摘要的新闻条数；1 表示逐条顺序处理 (落盘始终按播出顺序)
+# 并发模式下路由候选来自运行开始时的检索索引，看不到当天新建的故事线；落盘时若当天新建的故事线
+# 进入了候选，会再路由一次 (多一次 LLM 调用)，结果与顺序模式基本一致但不保证完全相同
+SAGA_CONCURRENCY = int(os.getenv("SAGA_CONCURRENCY", "1"))
+# 批量路由：一次请求最多路由的新闻条数 (1 = 关闭)；只在并发模式 (SAGA_CONCURRENCY > 1) 下启用
+ROUTE_BATCH_SIZE = int(os.getenv("ROUTE_BATCH_SIZE", "1"))
+
+# --- 路由候选检索 ---
+# 路由时只把 BM25 检索出的前 K 个活跃故事线交给 LLM (0 = 关闭，发送全部活跃故事线)
+ROUTE_CANDIDATE_K = int(os.getenv("ROUTE_CANDIDATE_K", "20"))
+
+# --- 投机摘要 ---
+# 路由的同时提前生成事件摘要，路由结果为 ignore 时取消/丢弃 (默认关闭)
+SPECULATIVE_SUMMARY = os.getenv("SPECULATIVE_SUMMARY", "false").lower() == "true"
+
+# --- 融合调用 ---
+# 一次请求同时完成路由、事件摘要与新建元数据，校验失败的部分回退到单独调用 (默认关闭)
+FUSED_ROUTING = os.getenv("FUSED_ROUTING", "false").lower() == "true"
+
+# --- 本地预路由 ---
+# 路由前先用本地分类器判断是否为琐事，高置信度的直接 ignore，省掉路由调用 (默认关闭)
+PRE_ROUTER_ENABLED = os.getenv("PRE_ROUTER_ENABLED", "false").lower() == "true"
+PRE_ROUTER_MODEL_PATH = os.getenv("PRE_ROUTER_MODEL_PATH", os.path.join(DATA_DIR, "models", "pre_router.json"))
+# 标定后的忽略概率不低于该值才跳过 LLM
+PRE_ROUTER_IGNORE_THRESHOLD = float(os.getenv("PRE_ROUTER_IGNORE_THRESHOLD", "0.9"))
+PRE_ROUTER_AUDIT_PATH = os.getenv("PRE_ROUTER_AUDIT_PATH", os.path.join(DATA_DIR, "logs", "pre_router_audit.jsonl"))
+
+# --- 近似重复检测 ---
+# 正文与已处理新闻近似重复 (MinHash 估计的 Jaccard 不低于阈值) 时沿用历史结果，不调用 LLM
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.85"))
+
+# --- LLM 调用账本 ---
+# 每次运行的逐次调用记录与汇总 (延迟分位数、token、估算费用) 写到该目录，留空则不落盘
+# 默认放在不入库的 data/logs 下 (CI 以 artifact 形式上传)，避免每天提交进仓库历史
+LLM_LEDGER_DIR = os.getenv("LLM_LEDGER_DIR", os.path.join(DATA_DIR, "logs", "llm_ledger"))
+# 每百万 token 单价 (默认按 SiliconFlow DeepSeek-V3 的人民币报价)
+LLM_PRICE_INPUT_PER_M = float(os.getenv("LLM_PRICE_INPUT_PER_M", "2.0"))
+LLM_PRICE_OUTPUT_PER_M = float(os.getenv("LLM_PRICE_OUTPUT_PER_M", "8.0"))
+LLM_PRICE_CURRENCY = os.getenv("LLM_PRICE_CURRENCY", "CNY")
+
+# --- LLM 调用调度 ---
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))        # 单次请求超时 (秒)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))    # 每次调用的最多尝试次数
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # 在途请求上限 (AIMD 在 1~该值间自适应)
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "30"))
+# 连续失败达到阈值后熔断，冷却期内直接快速失败，条目留待下次重试
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))
+
+# --- 故事线存储 ---
+# json: 每个故事线一个 JSON 文件 (data/sagas/*.json)；sqlite: 单个数据库 (data/sagas.sqlite)
+# auto: 数据库文件存在时用 sqlite，否则用 json (用 python run_migrate_store.py to-sqlite 迁移)
+SAGA_STORE_BACKEND = os.getenv("SAGA_STORE_BACKEND", "auto")
+# JSON 存储的事件日志 (data/sagas.log.jsonl)：新建/追加只追加一行，运行结束或累计到阈值时合并进快照
+SAGA_LOG_ENABLED = os.getenv("SAGA_LOG_ENABLED", "true").lower() == "true"
+SAGA_LOG_COMPACT_EVERY = int(os.getenv("SAGA_LOG_COMPACT_EVERY", "500"))
+# 故事线按需加载：常驻内存的只有头信息，事件列表首次访问时载入，按 LRU 淘汰 (近似内存预算，MB)
+SAGA_CACHE_MB = float(os.getenv("SAGA_CACHE_MB", "64"))
+# 早于 N 天 (相对本次运行日期) 的事件转入冷存储 data/sagas_cold，0 = 不转移；每个故事线至少保留最近一个事件
+SAGA_COLD_AFTER_DAYS = int(os.getenv("SAGA_COLD_AFTER_DAYS", "0"))
+
+# --- 断点续跑 ---
+# 每条新闻的处理进度与 LLM 结果按日期记在该目录 (默认放在 data/cache 下，随 CI 缓存保存)，留空则不记录
+RUN_JOURNAL_DIR = os.getenv("RUN_JOURNAL_DIR", os.path.join(DATA_DIR, "cache", "journal"))
+RUN_JOURNAL_KEEP_DAYS = int(os.getenv("RUN_JOURNAL_KEEP_DAYS", "14"))
+# 处理失败的条目重跑时自动重试，连续失败达到该次数后不再重试 (run_report.py --retry-failed 可强制重试)
+RUN_JOURNAL_MAX_ATTEMPTS = int(os.getenv("RUN_JOURNAL_MAX_ATTEMPTS", "3"))
@@ -1,248 +1,296 @@
 import asyncio
-import re
-import json
-from typing import Optional, List
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 import aiohttp
-from bs4 import BeautifulSoup  # 确保已安装 beautifulsoup4
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+from crawl4ai import BrowserConfig, CrawlerRunConfig, CacheMode
 
 # 相对导入
-from .config import BASE_URL_TEMPLATE, SELECTORS
+from .config import BASE_URL_TEMPLATE, CRAWL_MODE, HTTP_CONCURRENCY, HTTP_TIMEOUT, BROWSER_MAX_PAGES
+from .config import HTTP_USER_AGENT, HTTP_CACHE_MODE, HTTP_CACHE_DIR, HTTP_CACHE_TTL_DAYS, PARSE_EXECUTOR, PARSE_WORKERS
 from .schema import RawNewsItem, DailyBriefing, NewsType
+from .browser_pool import BrowserPool
+from .http_cache import ResponseCache
+from .extractor import extract_detail, extract_abstract, parse_daily_list, timed_call
+from .fetch_governor import FetchGovernor
 
 class CrawlerService:
-    def __init__(self):
+    def __init__(self, mode: str = CRAWL_MODE, max_pages: int = BROWSER_MAX_PAGES,
+                 cache_mode: str = HTTP_CACHE_MODE, parse_executor: str = PARSE_EXECUTOR,
+                 base_url_template: Optional[str] = None, governor: Optional[FetchGovernor] = None):
         self.browser_config = BrowserConfig(
             headless=True,
             verbose=False,
-            text_mode=False
+            text_mode=False,
+            user_agent=HTTP_USER_AGENT
         )
+        # http: 直连优先 + 浏览器兜底; browser: 全部浏览器渲染
+        self.mode = mode
+        self.max_pages = max_pages
+        # 列表页地址模板 (可指向本地替身服务器做离线测试)
+        self.base_url_template = base_url_template or BASE_URL_TEMPLATE
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.browser_pool: Optional[BrowserPool] = None
+        self.parse_executor_kind = parse_executor
+        self._parse_executor: Optional[Executor] = None
+        self.cache = ResponseCache(HTTP_CACHE_DIR, mode=cache_mode, ttl_days=HTTP_CACHE_TTL_DAYS)
+        # 所有联网请求 (直连与浏览器渲染) 共用的限流/重试调度器
+        self.governor = governor or FetchGovernor()
+        # 解析统计 (耗时在执行器内部测量，不含排队时间)
+        self.parse_stats = {"pages": 0, "seconds": 0.0}
+        # 浏览器只负责渲染，字段提取统一由 extractor 在同一棵 lxml 树上完成
+        self.render_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
+
+    async def __aenter__(self):
+        """
+        打开进程级共享资源：HTTP 连接池 + 浏览器池 (浏览器在首次渲染时才真正启动)。
+        多个日期的抓取应在同一个 async with 块内完成，以便只付一次启动成本。
+        """
+        connector = aiohttp.TCPConnector(limit=HTTP_CONCURRENCY)
+        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers={"User-Agent": HTTP_USER_AGENT}
+        )
+        self.browser_pool = BrowserPool(self.browser_config, max_pages=self.max_pages)
+        # 解析是 CPU 密集的同步调用，放到独立执行器中，避免阻塞事件循环上的并发下载
+        if self.parse_executor_kind == "process":
+            # 用 spawn 启动子进程：此时事件循环、连接池和浏览器线程都已存在，fork 会把它们的锁状态一起复制过去
+            self._parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                                       mp_context=multiprocessing.get_context("spawn"))
+        elif self.parse_executor_kind == "thread":
+            self._parse_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.governor.outcomes:
+            self.governor.print_report()
+        if self.browser_pool:
+            await self.browser_pool.close()
+            self.browser_pool = None
+        if self._session:
+            await self._session.close()
+            self._session = None
+        if self._parse_executor:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+        # 抓取结束后清理长期未使用的缓存，避免缓存目录无限增长
+        removed = self.cache.prune()
+        if removed["entries"] or removed["blobs"]:
+            print(f"🧹 [Cache] 已清理 {removed['entries']} 条过期缓存 / {removed['blobs']} 个响应体")
+
+    async def _parse(self, func, *args):
+        """在解析执行器中运行 extractor 函数 (inline 模式下直接调用)"""
+        if self._parse_executor is None:
+            result, elapsed = timed_call(func, *args)
+        else:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self._parse_executor, timed_call, func, *args)
+        self.parse_stats["pages"] += 1
+        self.parse_stats["seconds"] += elapsed
+        return result
 
     async def fetch_daily_briefing(self, date_str) -> Optional[DailyBriefing]:
         """
         统一入口函数：获取当天的完整简报数据
         """
-        # 1. 获取列表
-        abstract_item, news_items_links = await self._fetch_daily_list(date_str)
-        if not abstract_item:
+        if self._session is None:
+            # 未通过 async with 使用时，为本次调用临时打开资源
+            async with self:
+                return await self.fetch_daily_briefing(date_str)
+
+        stream = self.stream_daily_briefing(date_str)
+        async for _ in stream:
+            pass
+        return stream.to_briefing()
+
+    def stream_daily_briefing(self, date_str) -> "BriefingStream":
+        """
+        流式入口：每个详情页解析完成就立即产出其新闻条目，下游无需等待整天抓取结束。
+        必须在 async with CrawlerService() 块内迭代。
+        """
+        return BriefingStream(self, date_str)
+
+    async def _fetch_abstract(self, abstract_item) -> str:
+        # 摘要页通常格式比较简单，优先保留段落格式，失败时回退 abstract_schema
+        if self.mode == "http":
+            formatted = await self._parse(extract_abstract, await self._http_get(abstract_item['url']))
+            if formatted: return formatted
+            print("⚠️ [Direct] 摘要页缺少正文，回退浏览器渲染")
+
+        return await self._parse(extract_abstract, await self._render(abstract_item['url']))
+
+    async def _fetch_detail(self, url: str, title: str) -> List[dict]:
+        """
+        获取并解析单个详情页 (快讯会拆成多条)，失败返回空列表。
+        http 模式下先直连下载，#content_area 缺失或为空时再回退浏览器渲染。
+        """
+        if self.mode == "http":
+            # 下载完立即投递解析，下载与解析在不同页面间重叠
+            html = await self._http_get(url)
+            parsed = await self._parse(extract_detail, html, url, title, True)
+            if parsed is not None:
+                return parsed
+            print(f"⚠️ [Direct] 页面缺少正文，回退浏览器渲染: {url}")
+
+        html = await self._render(url)
+        if not html:
+            print(f"❌ [Crawler] 页面抓取失败，已记录: {title} ({url})")
+            return []
+        return await self._parse(extract_detail, html, url, title)
+
+    async def _http_get(self, url: str) -> Optional[str]:
+        """
+        通过共享连接池下载页面，失败返回 None (强制 utf-8 解码，避免 CCTV 页面被误判为 GBK)
+        命中磁盘缓存时发送条件请求，304 直接复用缓存；replay 模式下完全不联网。
+        """
+        cached = self.cache.lookup(url)
+        if self.cache.replay:
+            if cached is None:
+                print(f"⚠️ [Cache] 离线回放未命中: {url}")
+            return cached.text if cached else None
+
+        request_headers = cached.validators() if cached else {}
+
+        async def attempt():
+            async with self._session.get(url, headers=request_headers) as response:
+                if response.status != 200:
+                    return response.status, None
+                return 200, (dict(response.headers), await response.read())
+
+        status, payload = await self.governor.run(url, attempt)
+        if status == 304 and cached:
+            self.cache.touch(cached)
+            return cached.text
+        if status != 200:
+            if status is not None:
+                print(f"⚠️ [Direct] HTTP {status}: {url}")
             return None
 
-        # 2. 获取详情
-        abstract_text, details_list = await self._fetch_full_content(abstract_item, news_items_links)
-
-        # 3. 组装 Pydantic 对象
-        raw_items = []
-        for detail in details_list:
-            raw_items.append(RawNewsItem(
-                title=detail.get('title', 'No Title'),
-                url=detail.get('original_url', ''),
-                content=detail.get('content', ''),
-                date=date_str,
-                type=detail.get('type', NewsType.NORMAL),
-                parent_url=detail.get('parent_url', None)
-            ))
-        
-        return DailyBriefing(
-            date=date_str,
-            abstract_text=abstract_text,
-            news_items=raw_items
-        )
+        headers, content_bytes = payload
+        self.cache.store(url, status, headers, content_bytes)
+        return content_bytes.decode('utf-8', errors='ignore')
+
+    async def _render(self, url: str) -> Optional[str]:
+        """
+        浏览器渲染单个页面，返回渲染后的 HTML；失败返回 None。
+        渲染结果同样写入缓存 (variant=rendered)，replay 模式下直接读取。
+        """
+        if self.cache.replay:
+            cached = self.cache.lookup(url, variant="rendered")
+            return cached.text if cached else None
+
+        async def attempt():
+            res = await self.browser_pool.arun(url, self.render_config)
+            if not res:
+                return None, None
+            # 渲染失败且拿不到状态码时按传输层失败处理 (会重试)
+            status = res.status_code or (200 if res.success else None)
+            return status, res
+
+        status, res = await self.governor.run(url, attempt)
+        if not res or not res.success:
+            return None
+        self.cache.store(url, 200, {}, res.html.encode('utf-8'), variant="rendered")
+        return res.html
 
     async def _fetch_daily_list(self, date_str):
-        # 保持原有的列表获取逻辑不变
-        url = BASE_URL_TEMPLATE.format(date_str=date_str)
+        """
+        列表页直连下载，解析逻辑见 extractor.parse_daily_list。
+        下载或解析失败返回 None；页面正常但没有条目返回 (None, [])，调用方据此区分"失败"与"当天无内容"。
+        """
+        url = self.base_url_template.format(date_str=date_str)
         print(f"[*] [Direct] 正在下载列表: {url}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200: return None, []
-                    content_bytes = await response.read()
-            
-            html_content = content_bytes.decode('utf-8', errors='ignore')
-            pattern = re.compile(r'<a\s+[^>]*?href=[\'"](.*?)[\'"][^>]*?title=[\'"](.*?)[\'"]', re.IGNORECASE)
-            matches = pattern.findall(html_content)
-            
-            if not matches:
-                 pattern_text = re.compile(r'<a\s+[^>]*?href=[\'"](.*?)[\'"][^>]*?>(.*?)</a>', re.IGNORECASE)
-                 matches = pattern_text.findall(html_content)
-
-            unique_items = {}
-            for url, title in matches:
-                if not url or not title: continue
-                if url in unique_items: continue
-                clean_title = title.replace('[视频]', '').strip()
-                unique_items[url] = {'url': url, 'title': clean_title}
-
-            final_list = list(unique_items.values())
-            if not final_list: return None, []
-            return final_list[0], final_list[1:]
+            html_content = await self._http_get(url)
+            if html_content is None: return None
+            return parse_daily_list(html_content)
         except Exception as e:
             print(f"[Error] 列表获取异常: {e}")
-            return None, []
-
-    async def _fetch_full_content(self, abstract_item, news_items):
-        url_map = {item['url']: item['title'] for item in news_items}
-        
-        async def get_abstract():
-            # 摘要页通常格式比较简单，保持原样或也可以应用格式化
-            schema = SELECTORS["abstract_schema"]
-            config = CrawlerRunConfig(extraction_strategy=JsonCssExtractionStrategy(schema))
-            async with AsyncWebCrawler(config=self.browser_config) as crawler:
-                res = await crawler.arun(url=abstract_item['url'], config=config)
-                if res.success:
-                    # 尝试用 BS4 提取以获得更好的格式，如果失败则回退
-                    formatted = self._extract_normal_content(res.html)
-                    if formatted: return formatted
-                    
-                    data = json.loads(res.extracted_content)
-                    return data[0]['raw_content'] if data else ""
-                return ""
-
-        async def get_details():
-            urls = [item['url'] for item in news_items]
-            # 依然使用 CSS 策略作为兜底，但主要依赖 res.html 解析
-            schema = SELECTORS["news_detail_schema"]
-            config = CrawlerRunConfig(
-                extraction_strategy=JsonCssExtractionStrategy(schema),
-                cache_mode=CacheMode.BYPASS
-            )
-            
-            results_list = []
-            async with AsyncWebCrawler(config=self.browser_config) as crawler:
-                crawl_results = await crawler.arun_many(urls=urls, config=config)
-                
-                for res in crawl_results:
-                    if not res.success:
-                        continue
-
-                    original_title = url_map.get(res.url, "Unknown Title")
-                    
-                    # --- 分支 A: 快讯 (包含多个子新闻) ---
-                    if "快讯" in original_title:
-                        # print(f"⚡ 发现快讯: {original_title}")
-                        sub_items = self._extract_flash_sub_items(res.html, res.url, original_title)
-                        if sub_items:
-                            results_list.extend(sub_items)
-                            continue 
-                        else:
-                            print(f"⚠️ 快讯拆解失败，回退: {original_title}")
-
-                    # --- 分支 B: 普通新闻 (保持格式) ---
-                    # [修改点] 不再直接使用 extracted_content，而是手动解析 HTML 以保留格式
-                    formatted_content = self._extract_normal_content(res.html)
-                    
-                    # 只有当手动解析失败时，才回退到 Crawl4AI 的自动提取
-                    if not formatted_content:
-                        data = json.loads(res.extracted_content)
-                        if data:
-                            formatted_content = data[0].get('content', '')
-
-                    results_list.append({
-                        "title": original_title,
-                        "content": formatted_content, # 这里现在包含了缩进和换行
-                        "original_url": res.url,
-                        "type": NewsType.NORMAL,
-                        "parent_url": None
-                    })
-            
-            # 重新排序
-            ordered_results = []
-            for item in news_items:
-                target_url = item['url']
-                related = [
-                    r for r in results_list 
-                    if r.get('original_url') == target_url or r.get('parent_url') == target_url
-                ]
-                ordered_results.extend(related)
-            return ordered_results
-
-        abstract_text, details_list = await asyncio.gather(get_abstract(), get_details())
-        return abstract_text, details_list
-
-    def _extract_normal_content(self, html_source: str) -> str:
-        """
-        [新增] 专门用于提取普通新闻正文，保留段落缩进和换行
-        """
-        if not html_source: return ""
-        soup = BeautifulSoup(html_source, 'lxml')
-        
-        # CCTV 正文通常在 #content_area
-        content_div = soup.find(id="content_area")
-        if not content_div:
-            return ""
-
-        paragraphs = []
-        for p in content_div.find_all('p', recursive=False):
-            text = p.get_text(strip=True)
-            if text:
-                # 核心技巧：手动添加两个全角空格 (\u3000) 实现缩进
-                formatted_p = f"\u3000\u3000{text}"
-                paragraphs.append(formatted_p)
-        
-        # 用换行符连接各段落
-        return "\n".join(paragraphs)
-
-    def _extract_flash_sub_items(self, html_source: str, parent_url: str, parent_title: str) -> List[dict]:
-        """
-        [修改] 提取快讯子项，并增加缩进处理
-        """
-        soup = BeautifulSoup(html_source, 'lxml')
-        content_div = soup.find(id="content_area")
-        if not content_div:
-            return []
+            return None
 
-        items = []
-        current_title = ""
-        current_content = []
-        sub_index = 1
+class BriefingStream:
+    """
+    一天简报的异步迭代器：按页面完成顺序产出 (order, RawNewsItem)。
+    order = (列表序号, 子条目序号)，是与完成顺序无关的稳定播出顺序键；
+    sub_counts 记录已完成的列表序号各有几个子条目 (获取失败为 0)，供下游按播出顺序重排；
+    迭代结束后 to_briefing() 按该键还原出完整的 DailyBriefing。
+    """
+    def __init__(self, crawler: CrawlerService, date_str: str):
+        self.crawler = crawler
+        self.date_str = date_str
+        self.abstract_text = ""
+        self.found = False      # 列表页是否获取成功且有内容
+        self.list_failed = False  # 列表页下载/解析失败 (区别于页面正常但当天无内容)
+        self.completed = False  # 是否已完整迭代
+        self._items: List[Tuple[Tuple[int, int], RawNewsItem]] = []
+        self.failed_urls: List[str] = []  # 最终未能获取正文的详情页
+        self.sub_counts: Dict[int, int] = {}  # 列表序号 -> 子条目数 (在产出该序号的条目之前写入)
 
-        IGNORE_PATTERNS = [
-            "央视网消息（新闻联播）：",
-            "央视网消息："
+    def __aiter__(self) -> AsyncIterator[Tuple[Tuple[int, int], RawNewsItem]]:
+        return self._run()
+
+    async def _run(self):
+        # 1. 获取列表
+        daily_list = await self.crawler._fetch_daily_list(self.date_str)
+        if daily_list is None:
+            self.list_failed = True
+            self.completed = True
+            return
+        abstract_item, news_items_links = daily_list
+        if not abstract_item:
+            self.completed = True
+            return
+        self.found = True
+
+        # 2. 摘要页与所有详情页同时开抓
+        abstract_task = asyncio.create_task(self.crawler._fetch_abstract(abstract_item))
+
+        async def fetch_indexed(index: int, item: dict):
+            return index, await self.crawler._fetch_detail(item['url'], item['title'])
+
+        detail_tasks = [
+            asyncio.create_task(fetch_indexed(index, item))
+            for index, item in enumerate(news_items_links)
         ]
+        try:
+            # 3. 谁先完成就先产出谁
+            for next_done in asyncio.as_completed(detail_tasks):
+                index, details = await next_done
+                if not details:
+                    self.failed_urls.append(news_items_links[index]['url'])
+                self.sub_counts[index] = len(details)
+                for sub_index, detail in enumerate(details):
+                    entry = ((index, sub_index), self._to_raw_item(detail))
+                    self._items.append(entry)
+                    yield entry
 
-        for p in content_div.find_all('p', recursive=False):
-            text = p.get_text(strip=True)
-            if not text:
-                continue
-
-            if text in IGNORE_PATTERNS or (len(text) < 15 and "央视网消息" in text):
-                continue
-
-            is_header = p.find('strong') or p.find('b')
-            
-            if is_header:
-                if current_title:
-                    full_content = "\n".join(current_content).strip()
-                    if full_content: 
-                        items.append({
-                            "title": current_title,
-                            "content": full_content,
-                            "original_url": f"{parent_url}#sub{sub_index}",
-                            "type": NewsType.FLASH_SUB,
-                            "parent_url": parent_url
-                        })
-                        sub_index += 1
-                
-                current_title = text
-                current_content = []
-            else:
-                if current_title: 
-                    # [修改点] 核心技巧：如果是内容行，手动添加缩进
-                    formatted_line = f"\u3000\u3000{text}"
-                    current_content.append(formatted_line)
-
-        # 保存最后一条
-        if current_title:
-            full_content = "\n".join(current_content).strip()
-            if full_content:
-                items.append({
-                    "title": current_title,
-                    "content": full_content,
-                    "original_url": f"{parent_url}#sub{sub_index}",
-                    "type": NewsType.FLASH_SUB,
-                    "parent_url": parent_url
-                })
-
-        return items
\ No newline at end of file
+            self.abstract_text = await abstract_task
+            self.completed = True
+            if self.failed_urls:
+                print(f"⚠️ [Crawler] {self.date_str} 有 {len(self.failed_urls)} 个详情页未能获取")
+        finally:
+            # 下游提前退出迭代时，取消仍在进行的抓取
+            for task in [abstract_task, *detail_tasks]:
+                if not task.done():
+                    task.cancel()
+
+    def _to_raw_item(self, detail: dict) -> RawNewsItem:
+        return RawNewsItem(
+            title=detail.get('title', 'No Title'),
+            url=detail.get('original_url', ''),
+            content=detail.get('content', ''),
+            date=self.date_str,
+            type=detail.get('type', NewsType.NORMAL),
+            parent_url=detail.get('parent_url', None)
+        )
+
+    def to_briefing(self) -> Optional[DailyBriefing]:
+        """按播出顺序组装完整简报 (列表页获取失败时返回 None)"""
+        if not self.found:
+            return None
+        ordered = sorted(self._items, key=lambda entry: entry[0])
+        return DailyBriefing(
+            date=self.date_str,
+            abstract_text=self.abstract_text,
+            news_items=[news for _, news in ordered]
+        )
@@ -1,5 +1,6 @@
 # src/date_utils.py
 from datetime import datetime, timedelta
+from typing import List
 import pytz
 
 def get_target_date_str():
@@ -23,6 +24,22 @@ def get_target_date_str():
     # 3. 格式化并移除斜杠 (YYYYMMDD)
     return target_date.strftime("%Y%m%d")
 
+def iter_date_range(start_str: str, end_str: str) -> List[str]:
+    """
+    生成闭区间 [start, end] 内的所有日期字符串 (YYYYMMDD)，按时间升序。
+    """
+    start = datetime.strptime(start_str, "%Y%m%d")
+    end = datetime.strptime(end_str, "%Y%m%d")
+    if end < start:
+        raise ValueError(f"结束日期 {end_str} 早于开始日期 {start_str}")
+
+    dates = []
+    current = start
+    while current <= end:
+        dates.append(current.strftime("%Y%m%d"))
+        current += timedelta(days=1)
+    return dates
+
 if __name__ == "__main__":
     # 测试打印
     print(get_target_date_str())
\ No newline at end of file
@@ -0,0 +1,187 @@
+# src/extractor.py
+"""
+单次解析的 HTML 提取引擎
+每个页面只构建一棵 lxml 树，在同一次遍历中得到普通正文、快讯子项，
+CSS 兜底字段 (等价于 SELECTORS 中的 JsonCss schema) 也只在手动解析失败时才在这棵树上计算。
+全部为模块级纯函数，便于投递到进程池执行。
+"""
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import lxml.html
+from lxml.etree import ParserError
+
+from .config import SELECTORS
+from .schema import NewsType
+
+# 快讯正文开头的导语，不属于任何子新闻
+FLASH_IGNORE_PATTERNS = [
+    "央视网消息（新闻联播）：",
+    "央视网消息："
+]
+
+# 列表页: 优先匹配带 title 属性的链接，没有时退回链接文本
+LIST_LINK_PATTERN = re.compile(r'<a\s+[^>]*?href=[\'"](.*?)[\'"][^>]*?title=[\'"](.*?)[\'"]', re.IGNORECASE)
+LIST_TEXT_PATTERN = re.compile(r'<a\s+[^>]*?href=[\'"](.*?)[\'"][^>]*?>(.*?)</a>', re.IGNORECASE)
+
+def parse_daily_list(html_content: str) -> Tuple[Optional[dict], List[dict]]:
+    """
+    解析每日列表页，返回 (摘要页条目, 新闻条目列表)。
+    列表页片段会被浏览器误判编码，因此这里直接对原始 HTML 做正则匹配。
+    """
+    matches = LIST_LINK_PATTERN.findall(html_content)
+    if not matches:
+        matches = LIST_TEXT_PATTERN.findall(html_content)
+
+    unique_items = {}
+    for url, title in matches:
+        if not url or not title: continue
+        if url in unique_items: continue
+        clean_title = title.replace('[视频]', '').strip()
+        unique_items[url] = {'url': url, 'title': clean_title}
+
+    final_list = list(unique_items.values())
+    if not final_list: return None, []
+    return final_list[0], final_list[1:]
+
+def _parse_tree(html_source: str):
+    """构建 lxml 树，空文档返回 None"""
+    if not html_source:
+        return None
+    try:
+        return lxml.html.fromstring(html_source)
+    except ValueError:
+        # 带 XML 编码声明的 str 无法直接解析，转成 bytes 交给 lxml 处理
+        return lxml.html.fromstring(html_source.encode('utf-8'))
+    except ParserError:
+        return None
+
+def _text(element) -> str:
+    """等价于 BeautifulSoup 的 get_text(strip=True)：逐段去空白后拼接 (不含注释与脚本)"""
+    parts = element.xpath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+    return "".join(part.strip() for part in parts)
+
+def _css_fields(tree, schema: Dict) -> Dict[str, str]:
+    """在已有的树上按 JsonCss schema 提取字段 (只取第一个 baseSelector 匹配)"""
+    bases = tree.cssselect(schema["baseSelector"])
+    if not bases:
+        return {}
+    base = bases[0]
+    result = {}
+    for field in schema["fields"]:
+        matches = base.cssselect(field["selector"])
+        if not matches:
+            result[field["name"]] = ""
+        elif field["type"] == "attribute":
+            result[field["name"]] = matches[0].get(field["attribute"], "")
+        else:
+            result[field["name"]] = _text(matches[0])
+    return result
+
+def _content_paragraphs(tree) -> List[Tuple[str, bool]]:
+    """
+    一次遍历 #content_area 的直接子 <p>，返回 [(文本, 是否为加粗小标题)]
+    普通正文和快讯拆分共用这份结果。
+    """
+    if tree is None:
+        return []
+    found = tree.xpath('//*[@id="content_area"]')
+    if not found:
+        return []
+
+    paragraphs = []
+    for p in found[0].iterchildren('p'):
+        text = _text(p)
+        if text:
+            is_header = p.find('.//strong') is not None or p.find('.//b') is not None
+            paragraphs.append((text, is_header))
+    return paragraphs
+
+def _format_normal(paragraphs: List[Tuple[str, bool]]) -> str:
+    # 核心技巧：手动添加两个全角空格 (　) 实现缩进，段落间用换行连接
+    return "\n".join(f"　　{text}" for text, _ in paragraphs)
+
+def _split_flash(paragraphs: List[Tuple[str, bool]], parent_url: str) -> List[dict]:
+    """按加粗小标题把快讯拆成多条子新闻"""
+    items = []
+    current_title = ""
+    current_content = []
+    sub_index = 1
+
+    def flush():
+        nonlocal sub_index
+        full_content = "\n".join(current_content).strip()
+        if full_content:
+            items.append({
+                "title": current_title,
+                "content": full_content,
+                "original_url": f"{parent_url}#sub{sub_index}",
+                "type": NewsType.FLASH_SUB,
+                "parent_url": parent_url
+            })
+            sub_index += 1
+
+    for text, is_header in paragraphs:
+        if text in FLASH_IGNORE_PATTERNS or (len(text) < 15 and "央视网消息" in text):
+            continue
+
+        if is_header:
+            if current_title:
+                flush()
+            current_title = text
+            current_content = []
+        elif current_title:
+            current_content.append(f"　　{text}")
+
+    # 保存最后一条
+    if current_title:
+        flush()
+    return items
+
+def extract_detail(html_source: str, url: str, original_title: str,
+                   require_content: bool = False) -> Optional[List[dict]]:
+    """
+    解析单个详情页，返回一条或多条 (快讯拆分) 结果。
+    require_content=True 时，若正文为空 (含 CSS 兜底) 则返回 None，交由调用方回退浏览器渲染。
+    """
+    tree = _parse_tree(html_source)
+    paragraphs = _content_paragraphs(tree)
+
+    # --- 分支 A: 快讯 (包含多个子新闻) ---
+    if "快讯" in original_title:
+        sub_items = _split_flash(paragraphs, url)
+        if sub_items:
+            return sub_items
+        elif not require_content:
+            print(f"⚠️ 快讯拆解失败，回退: {original_title}")
+
+    # --- 分支 B: 普通新闻 (保持格式) ---
+    formatted_content = _format_normal(paragraphs)
+
+    # 只有当手动解析失败时，才在同一棵树上计算 CSS 兜底字段
+    if not formatted_content and tree is not None:
+        formatted_content = _css_fields(tree, SELECTORS["news_detail_schema"]).get("content", "")
+    if not formatted_content and require_content:
+        return None
+
+    return [{
+        "title": original_title,
+        "content": formatted_content,
+        "original_url": url,
+        "type": NewsType.NORMAL,
+        "parent_url": None
+    }]
+
+def extract_abstract(html_source: str) -> str:
+    """解析摘要页：优先保留段落格式，失败时回退 abstract_schema"""
+    tree = _parse_tree(html_source)
+    formatted = _format_normal(_content_paragraphs(tree))
+    if formatted or tree is None:
+        return formatted
+    return _css_fields(tree, SELECTORS["abstract_schema"]).get("raw_content", "")
+
+def timed_call(func, *args) -> Tuple[Any, float]:
+    """执行提取函数并返回 (结果, 耗时秒)，在执行器内部计时，不含排队等待"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
@@ -0,0 +1,153 @@
+# src/fetch_governor.py
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from pydantic import BaseModel
+
+from .config import FETCH_RATE_PER_HOST, FETCH_MAX_CONCURRENCY_PER_HOST, FETCH_MAX_RETRIES
+
+# 视为 "服务端在限流/过载" 的状态码：触发退避与重试
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+# 视为抓取成功的状态码 (304 为缓存重新验证命中)；其余 4xx (404/410/401 等) 记为不可重试的失败
+OK_STATUSES = {200, 304}
+
+class FetchOutcome(BaseModel):
+    """单个 URL 的最终抓取结果"""
+    url: str
+    host: str
+    ok: bool
+    status: Optional[int] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+class TokenBucket:
+    """令牌桶：按固定速率补充令牌，限制每秒请求数 (允许 capacity 大小的突发)"""
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class HostState:
+    """
+    单个域名的限流状态
+    并发上限按 AIMD 调整：成功一次加 1/limit，遇到限流/超时减半。
+    """
+    def __init__(self, rate: float, max_concurrency: int):
+        self.bucket = TokenBucket(rate, capacity=max(1.0, rate))
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit)))
+            self.in_flight += 1
+        await self.bucket.acquire()
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def on_throttle(self):
+        self.limit = max(1.0, self.limit / 2)
+
+class FetchGovernor:
+    """
+    共享抓取调度器：所有列表/详情/渲染请求都经过这里。
+    - 每个域名一个令牌桶 + 自适应并发上限
+    - 403/429/5xx、超时与连接错误时带抖动的指数退避重试
+    - 记录每个 URL 的最终结果，便于排查丢失的条目
+    """
+    def __init__(self, rate: float = FETCH_RATE_PER_HOST,
+                 max_concurrency: int = FETCH_MAX_CONCURRENCY_PER_HOST,
+                 max_retries: int = FETCH_MAX_RETRIES,
+                 backoff_base: float = 1.0):
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.hosts: Dict[str, HostState] = {}
+        self.outcomes: Dict[str, FetchOutcome] = {}
+
+    def _host(self, host: str) -> HostState:
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.rate, self.max_concurrency)
+        return self.hosts[host]
+
+    def _backoff(self, attempt: int) -> float:
+        # 全抖动 (full jitter)：[0, base * 2^attempt]
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    async def run(self, url: str, attempt_fn: Callable[[], Awaitable[Tuple[Optional[int], Any]]]) -> Tuple[Optional[int], Any]:
+        """
+        执行一次受控抓取。attempt_fn 返回 (状态码, 结果)；状态码为 None 表示传输层失败。
+        返回最后一次尝试的 (状态码, 结果)；重试耗尽时为 (None, None)，
+        不可重试的错误状态 (如 404) 原样返回，但记为失败。
+        """
+        host = urlparse(url).netloc
+        state = self._host(host)
+        start = time.monotonic()
+        status, payload, error = None, None, None
+
+        for attempt in range(self.max_retries + 1):
+            await state.acquire()
+            try:
+                status, payload = await attempt_fn()
+                error = None if status is not None else "no response"
+            except Exception as e:
+                status, payload, error = None, None, f"{type(e).__name__}: {e}"
+            finally:
+                await state.release()
+
+            if status is not None and status not in RETRY_STATUSES:
+                # 404 之类是服务端的正常应答，不影响并发上限的调整
+                if status in OK_STATUSES:
+                    state.on_success()
+                break
+
+            state.on_throttle()
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt)
+                print(f"   [Governor] {host} 第 {attempt + 1} 次失败 ({status or error})，"
+                      f"{delay:.1f}s 后重试 (并发上限 {int(state.limit)})")
+                await asyncio.sleep(delay)
+
+        ok = status in OK_STATUSES
+        self.outcomes[url] = FetchOutcome(
+            url=url, host=host, ok=ok, status=status, attempts=attempt + 1,
+            elapsed=round(time.monotonic() - start, 3), error=None if ok else (error or f"HTTP {status}")
+        )
+        answered = status is not None and status not in RETRY_STATUSES
+        return (status, payload) if answered else (None, None)
+
+    def failed(self) -> List[FetchOutcome]:
+        return [o for o in self.outcomes.values() if not o.ok]
+
+    def print_report(self):
+        total = len(self.outcomes)
+        retried = sum(1 for o in self.outcomes.values() if o.attempts > 1)
+        failed = self.failed()
+        print(f"📡 [Governor] 请求 {total} 个 URL，重试过 {retried} 个，最终失败 {len(failed)} 个")
+        for outcome in failed:
+            print(f"   ❌ {outcome.url} ({outcome.error}, 尝试 {outcome.attempts} 次)")
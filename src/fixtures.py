@@ -0,0 +1,143 @@
+# src/fixtures.py
+import asyncio
+import json
+import random
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from aiohttp import web
+
+from .config import BASE_URL_TEMPLATE
+from .crawler import CrawlerService
+from .extractor import parse_daily_list
+
+class FixtureRecorder:
+    """
+    把某天的列表页、摘要页和全部详情页原样快照到夹具目录，供离线回放与基准测试使用。
+
+    目录结构:
+        {fixture_dir}/{date}/manifest.json   {"date", "pages": {路径: {"url", "file"}}}
+        {fixture_dir}/{date}/page_XXX.html
+    """
+    def __init__(self, fixture_dir: str = "data/fixtures"):
+        self.fixture_dir = Path(fixture_dir)
+
+    async def record(self, date_str: str) -> Optional[Path]:
+        target_dir = self.fixture_dir / date_str
+        target_dir.mkdir(parents=True, exist_ok=True)
+        pages: Dict[str, Dict[str, str]] = {}
+
+        # 录制时不读缓存，确保拿到线上原始页面
+        async with CrawlerService(cache_mode="off", parse_executor="inline") as crawler:
+            async def save(url: str, html: Optional[str]):
+                if html is None:
+                    print(f"⚠️ [Recorder] 未能录制: {url}")
+                    return
+                file_name = f"page_{len(pages):03d}.html"
+                (target_dir / file_name).write_text(html, encoding='utf-8')
+                pages[urlparse(url).path] = {"url": url, "file": file_name}
+
+            list_url = crawler.base_url_template.format(date_str=date_str)
+            list_html = await crawler._http_get(list_url)
+            await save(list_url, list_html)
+            if list_html is None:
+                return None
+
+            abstract_item, news_items = parse_daily_list(list_html)
+            if not abstract_item:
+                print(f"❌ [Recorder] {date_str} 列表页为空")
+                return None
+
+            urls = [abstract_item['url']] + [item['url'] for item in news_items]
+            bodies = await asyncio.gather(*(crawler._http_get(url) for url in urls))
+            for url, html in zip(urls, bodies):
+                await save(url, html)
+
+        manifest = {"date": date_str, "pages": pages}
+        with open(target_dir / "manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        print(f"📼 [Recorder] {date_str} 已录制 {len(pages)} 个页面 -> {target_dir}")
+        return target_dir
+
+class FixtureServer:
+    """
+    本地 CCTV 替身服务器：按 BASE_URL_TEMPLATE 的路径形状提供已录制的页面。
+    页面中原站的绝对链接会被改写为本服务器地址，爬虫无需任何改动即可整条链路离线运行。
+    支持注入延迟 (均值 ± 抖动) 与随机 503 错误。
+    """
+    def __init__(self, fixture_dir: str = "data/fixtures", host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0, seed: int = 0):
+        self.fixture_dir = Path(fixture_dir)
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.origin = ""
+        self.stats = {"served": 0, "errors_injected": 0, "not_found": 0}
+        self._routes: Dict[str, Path] = {}
+        self._source_origins = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url_template(self) -> str:
+        """与 BASE_URL_TEMPLATE 路径一致、指向本服务器的列表页模板"""
+        return self.origin + urlparse(BASE_URL_TEMPLATE).path
+
+    def _load_manifests(self):
+        for manifest_path in sorted(self.fixture_dir.glob("*/manifest.json")):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            for path, page in manifest["pages"].items():
+                self._routes[path] = manifest_path.parent / page["file"]
+                parsed = urlparse(page["url"])
+                self._source_origins.add(f"{parsed.scheme}://{parsed.netloc}")
+        if not self._routes:
+            raise FileNotFoundError(f"夹具目录中没有可用的 manifest: {self.fixture_dir}")
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        if self.latency_ms:
+            spread = self.latency_ms * self.jitter
+            await asyncio.sleep(max(0.0, self.random.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors_injected"] += 1
+            return web.Response(status=503, text="injected error")
+
+        file_path = self._routes.get(request.path)
+        if not file_path:
+            self.stats["not_found"] += 1
+            return web.Response(status=404)
+
+        body = file_path.read_text(encoding='utf-8')
+        for source_origin in self._source_origins:
+            body = body.replace(source_origin, self.origin)
+        self.stats["served"] += 1
+        return web.Response(text=body, content_type="text/html", charset="utf-8")
+
+    async def start(self) -> str:
+        self._load_manifests()
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # port=0 时由系统分配端口，这里取回实际地址
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.origin = f"http://{bound_host}:{bound_port}"
+        print(f"🧪 [FixtureServer] 已启动: {self.origin} ({len(self._routes)} 个页面)")
+        return self.origin
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
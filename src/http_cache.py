@@ -0,0 +1,159 @@
+# src/http_cache.py
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from pydantic import BaseModel
+
+class CachedResponse(BaseModel):
+    """一条缓存的 HTTP 响应"""
+    url: str
+    status: int
+    headers: Dict[str, str] = {}
+    fetched_at: float
+    body: bytes
+    extra: Dict = {}  # 附加信息 (如浏览器渲染时 CSS 策略的提取结果)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='ignore')
+
+    def validators(self) -> Dict[str, str]:
+        """构造条件请求头 (ETag / Last-Modified)"""
+        headers = {}
+        # 响应头落盘后丢失了大小写不敏感特性，这里统一转小写查找
+        lowered = {k.lower(): v for k, v in self.headers.items()}
+        etag = lowered.get("etag")
+        last_modified = lowered.get("last-modified")
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+class ResponseCache:
+    """
+    以 URL 为键的磁盘响应缓存，响应体按内容哈希存储 (相同内容只存一份)。
+
+    目录结构:
+        {cache_dir}/index/{sha256(variant:url)}.json   元数据 (状态码、响应头、抓取时间、body 哈希)
+        {cache_dir}/blobs/{hash[:2]}/{hash}            原始响应体
+
+    模式:
+        off         不读不写
+        revalidate  命中后用 ETag/Last-Modified 发条件请求，304 直接复用
+        replay      完全离线，只从缓存读取，未命中即视为失败
+
+    条目的 fetched_at 在每次下载或 304 复用时刷新，prune() 按它清理超过 ttl_days 未使用的条目。
+    """
+    MODES = ("off", "revalidate", "replay")
+
+    def __init__(self, cache_dir: str, mode: str = "revalidate", ttl_days: float = 30):
+        if mode not in self.MODES:
+            raise ValueError(f"未知的缓存模式: {mode} (可选: {', '.join(self.MODES)})")
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        self.ttl_seconds = ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == "replay"
+
+    def _index_path(self, url: str, variant: str) -> Path:
+        key = hashlib.sha256(f"{variant}:{url}".encode('utf-8')).hexdigest()
+        return self.cache_dir / "index" / f"{key}.json"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.cache_dir / "blobs" / digest[:2] / digest
+
+    def _atomic_write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, url: str, variant: str = "http") -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        index_path = self._index_path(url, variant)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self._blob_path(meta["body_sha256"]), 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedResponse(
+            url=meta["url"],
+            status=meta["status"],
+            headers=meta.get("headers", {}),
+            fetched_at=meta["fetched_at"],
+            body=body,
+            extra=meta.get("extra", {})
+        )
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes,
+              variant: str = "http", extra: Optional[Dict] = None):
+        if not self.enabled or self.replay:
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            self._atomic_write(blob_path, body)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": dict(headers),
+            "fetched_at": time.time(),
+            "body_sha256": digest,
+            "extra": extra or {}
+        }
+        self._atomic_write(self._index_path(url, variant), json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def touch(self, entry: CachedResponse, variant: str = "http"):
+        """304 命中后刷新抓取时间"""
+        self.store(entry.url, entry.status, entry.headers, entry.body, variant=variant, extra=entry.extra)
+
+    def prune(self) -> Dict[str, int]:
+        """
+        删除超过 TTL 未使用的索引条目，再删除不再被任何条目引用的响应体。
+        replay 模式只读缓存，不清理；ttl_days <= 0 时不清理。
+        """
+        removed = {"entries": 0, "blobs": 0}
+        if not self.enabled or self.replay or self.ttl_seconds <= 0:
+            return removed
+        started = time.time()
+        cutoff = started - self.ttl_seconds
+        referenced = set()
+        for index_path in (self.cache_dir / "index").glob("*.json"):
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                fetched_at, digest = meta["fetched_at"], meta["body_sha256"]
+            except (OSError, ValueError, KeyError):
+                # 损坏的条目查不出内容，一并清理
+                index_path.unlink(missing_ok=True)
+                removed["entries"] += 1
+                continue
+            if fetched_at < cutoff:
+                index_path.unlink(missing_ok=True)
+                removed["entries"] += 1
+            else:
+                referenced.add(digest)
+        for blob_path in (self.cache_dir / "blobs").glob("*/*"):
+            # 清理开始后才写入的响应体可能还没来得及写索引，跳过
+            if blob_path.name not in referenced and blob_path.stat().st_mtime < started:
+                blob_path.unlink(missing_ok=True)
+                removed["blobs"] += 1
+        return removed
@@ -2,26 +2,46 @@ import json
 import time
 import re
 import asyncio
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 from openai import AsyncOpenAI, APITimeoutError
 from .config import LLM_API_KEY, LLM_BASE_URL, LLM_MODEL
-from .schema import RawNewsItem, Saga
+from .config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL_DAYS, LLM_CACHE_MAX_ENTRIES
+from .config import LLM_LEDGER_DIR, LLM_TIMEOUT, LLM_MAX_RETRIES
+from .llm_cache import LLMResponseCache
+from .llm_metrics import LLMUsageLedger
+from .llm_governor import LLMGovernor, LLMUnavailableError, ErrorKind
+from .schema import RawNewsItem, SagaHeader
 
 # --- 常量定义：固定 AI 的输出空间 ---
 CATEGORIES = ["政治外交", "宏观经济", "产业科技", "社会民生", "军事国防", "国际局势", "文体卫生", "突发事故"]
 CAUSAL_TAGS = ["政策发布", "重要会议", "外交声明", "冲突爆发", "合作签署", "数据公布", "人事变动", "灾害事故", "其他"]
+ROUTE_ACTIONS = ["append", "create", "ignore"]
 
 class IntelligenceEngine:
-    def __init__(self):
-        if not LLM_API_KEY:
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 cache_path: Optional[str] = LLM_CACHE_PATH if LLM_CACHE_ENABLED else None,
+                 ledger_dir: Optional[str] = LLM_LEDGER_DIR, governor: Optional[LLMGovernor] = None):
+        """参数默认取自配置；基准测试等场景可指向本地替身服务、临时缓存与账本目录 (None 表示关闭)"""
+        api_key = api_key or LLM_API_KEY
+        if not api_key:
             raise ValueError("⚠️ [Critical Error] 未找到 LLM_API_KEY")
             
-        print(f"🧠 [Brain] 大脑已连接: {LLM_MODEL} (Timeout=90s)")
+        print(f"🧠 [Brain] 大脑已连接: {LLM_MODEL} (Timeout={LLM_TIMEOUT:.0f}s)")
         self.client = AsyncOpenAI(
-            api_key=LLM_API_KEY, 
-            base_url=LLM_BASE_URL,
-            timeout=90.0
+            api_key=api_key, 
+            base_url=base_url or LLM_BASE_URL,
+            timeout=LLM_TIMEOUT,
+            max_retries=0  # 重试、退避与并发统一由 governor 负责
         )
+        self.governor = governor or LLMGovernor()
+        # 持久化响应缓存 + 进行中请求合并 (相同 prompt 并发时只发一次)
+        self.cache: Optional[LLMResponseCache] = None
+        if cache_path:
+            self.cache = LLMResponseCache(cache_path, ttl_days=LLM_CACHE_TTL_DAYS,
+                                          max_entries=LLM_CACHE_MAX_ENTRIES)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 逐次调用记录 (token、延迟、重试、缓存命中)，由调用方按运行汇总落盘
+        self.ledger = LLMUsageLedger(ledger_dir)
 
     def _clean_json_string(self, text: str) -> str:
         """清洗 LLM 返回的字符串"""
@@ -30,51 +50,139 @@ class IntelligenceEngine:
         text = re.sub(r'\s*```$', '', text, flags=re.MULTILINE)
         return text.strip()
 
-    async def _safe_api_call(self, func_name: str, messages: List[Dict], max_retries=2) -> Dict:
-        """内部通用 API 调用包装器"""
+    async def _safe_api_call(self, func_name: str, messages: List[Dict], max_retries=LLM_MAX_RETRIES,
+                             temperature: float = 0.1, usage: Optional[Dict[str, int]] = None) -> Dict:
+        """
+        内部通用 API 调用包装器 (先查缓存，再合并同键的进行中请求，最后才真正调用)
+        usage: 可选的累加器，本次实际发出请求消耗的 token 数累加到 usage["total_tokens"]
+        """
+        key = LLMResponseCache.make_key(LLM_MODEL, messages, temperature)
+
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                print(f"   [Debug] {func_name} | 💾 命中缓存")
+                self.ledger.record(func_name, LLM_MODEL, "cache_hit")
+                return dict(cached)
+
+        if key in self._inflight:
+            print(f"   [Debug] {func_name} | 🔗 合并到进行中的相同请求")
+            shared = self._inflight[key]
+            start_time = time.time()
+            try:
+                result = dict(await asyncio.shield(shared))
+                self.ledger.record(func_name, LLM_MODEL, "coalesced", latency=time.time() - start_time)
+                return result
+            except asyncio.CancelledError:
+                # 被取消的是发起方 (如被丢弃的投机请求) 而不是自己时，自己重新发起
+                if not shared.cancelled():
+                    raise
+                return await self._safe_api_call(func_name, messages, max_retries, temperature, usage)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        stats = {"attempts": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        start_time = time.time()
+        outcome = "failed"
+        try:
+            result = await self._call_with_retries(func_name, messages, max_retries, temperature, stats)
+            outcome = "ok" if result else "failed"
+            # 失败返回的空字典不写缓存，下次仍会重试
+            if result and self.cache:
+                self.cache.put(key, LLM_MODEL, func_name, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            future.cancel()
+            raise
+        except Exception as e:
+            if isinstance(e, LLMUnavailableError):
+                outcome = "unavailable"
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+            self.ledger.record(func_name, LLM_MODEL, outcome, attempts=stats["attempts"],
+                               latency=time.time() - start_time, prompt_tokens=stats["prompt_tokens"],
+                               completion_tokens=stats["completion_tokens"])
+            if usage is not None:
+                usage["total_tokens"] = (usage.get("total_tokens", 0)
+                                         + stats["prompt_tokens"] + stats["completion_tokens"])
+
+    async def _call_with_retries(self, func_name: str, messages: List[Dict], max_retries: int,
+                                 temperature: float, stats: Dict[str, int]) -> Dict:
+        """
+        经 governor 真正发起请求，失败时退避重试；尝试次数与 token 用量累加到 stats。
+        - 返回内容无法解析：重试耗尽后返回空字典 (由调用方兜底)
+        - 限流/超时/5xx 重试耗尽或熔断器打开：抛出 LLMUnavailableError，条目留待下次重试
+        - 鉴权/参数类错误：不重试，返回空字典
+        """
         for attempt in range(max_retries):
+            stats["attempts"] += 1
+            await self.governor.acquire()
+            start_time = time.time()
+            print(f"   [Debug] {func_name} | 请求发送... (Attempt {attempt+1})")
+            error: Optional[Exception] = None
             try:
-                start_time = time.time()
-                print(f"   [Debug] {func_name} | 请求发送... (Attempt {attempt+1})")
-                
                 response = await self.client.chat.completions.create(
                     model=LLM_MODEL,
                     messages=messages,
                     response_format={"type": "json_object"},
-                    temperature=0.1 # 保持低温度以确保格式稳定
+                    temperature=temperature # 保持低温度以确保格式稳定
                 )
-                
-                duration = time.time() - start_time
-                raw_content = response.choices[0].message.content
-                clean_json = self._clean_json_string(raw_content)
-                
-                try:
-                    data = json.loads(clean_json)
-                    # 列表自动拆包
-                    if isinstance(data, list):
-                        if len(data) > 0 and isinstance(data[0], dict):
-                            data = data[0]
-                        else:
-                            raise ValueError(f"Invalid list format: {str(data)[:50]}...")
-                    
-                    print(f"   [Debug] {func_name} | ✅ 响应成功 ({duration:.2f}s)")
-                    return data
-                    
-                except json.JSONDecodeError:
-                    print(f"⚠️ [Intelligence] JSON 解析失败: {raw_content[:50]}...")
-                    raise ValueError("JSON Decode Error")
-
-            except APITimeoutError:
-                print(f"   [Debug] {func_name} | ❌ 请求超时 (90s)!")
+            except asyncio.CancelledError:
+                self.governor.abandon()
+                raise
             except Exception as e:
-                print(f"   [Debug] {func_name} | ❌ 发生错误: {e}")
-            
+                error = e
+            finally:
+                await self.governor.release()
+
+            if error is not None:
+                kind = self.governor.on_error(error)
+                if isinstance(error, APITimeoutError):
+                    print(f"   [Debug] {func_name} | ❌ 请求超时 ({LLM_TIMEOUT:.0f}s)!")
+                else:
+                    print(f"   [Debug] {func_name} | ❌ 发生错误: {error}")
+                if kind == ErrorKind.FATAL:
+                    return {}
+                if attempt == max_retries - 1:
+                    if kind == ErrorKind.THROTTLE:
+                        raise LLMUnavailableError(f"{func_name} 重试 {max_retries} 次仍失败: {error}")
+                    return {}
+                delay = self.governor.backoff(attempt, error)
+                print(f"   [Debug] {func_name} | ⏳ {delay:.1f}s 后重试")
+                await asyncio.sleep(delay)
+                continue
+
+            self.governor.on_success()
+            duration = time.time() - start_time
+            if response.usage:
+                stats["prompt_tokens"] += response.usage.prompt_tokens or 0
+                stats["completion_tokens"] += response.usage.completion_tokens or 0
+            try:
+                raw_content = response.choices[0].message.content
+                data = json.loads(self._clean_json_string(raw_content))
+                # 列表自动拆包
+                if isinstance(data, list):
+                    if len(data) > 0 and isinstance(data[0], dict):
+                        data = data[0]
+                    else:
+                        raise ValueError(f"Invalid list format: {str(data)[:50]}...")
+                print(f"   [Debug] {func_name} | ✅ 响应成功 ({duration:.2f}s)")
+                return data
+            except (ValueError, TypeError, IndexError, AttributeError) as e:  # JSONDecodeError 属于 ValueError
+                print(f"⚠️ [Intelligence] JSON 解析失败: {e}")
+
             if attempt < max_retries - 1:
-                await asyncio.sleep(2)
+                await asyncio.sleep(self.governor.backoff(attempt))
         
         return {}
 
-    async def route_news(self, news: RawNewsItem, active_sagas: List[Saga]) -> Dict[str, Any]:
+    async def route_news(self, news: RawNewsItem, active_sagas: List[SagaHeader]) -> Dict[str, Any]:
         """
         [Prompt 优化点]
         1. CoT (Chain of Thought): 增加 'reason' 字段，强迫 AI 先思考后决策。
@@ -109,7 +217,167 @@ class IntelligenceEngine:
             {"role": "user", "content": user_content}
         ])
         
-        return result if result else {"action": "ignore"}
+        # 调用失败时按忽略处理，并标记出来 (断点日志据此记为失败而非已完成)
+        return result if result else {"action": "ignore", "call_failed": True}
+
+    async def route_news_batch(self, news_list: List[RawNewsItem], active_sagas: List[SagaHeader]) -> List[Dict[str, Any]]:
+        """
+        批量路由：一次请求判断多条新闻的去向，Saga 上下文每批只发送一次。
+        逐条校验返回结果，缺失或格式错误的条目回退到单条 route_news。
+        """
+        if len(news_list) == 1:
+            return [await self.route_news(news_list[0], active_sagas)]
+
+        saga_context = [{"id": s.id, "title": s.title, "keywords": s.title} for s in active_sagas]
+        
+        system_prompt = f"""
+        你是由中央电视台聘请的高级新闻主编。请逐条分析【输入新闻】列表，为每条新闻分配合适的处理路径。
+        
+        现有活跃故事线 (Sagas):
+        {json.dumps(saga_context, ensure_ascii=False)}
+
+        决策逻辑：
+        1. **APPEND (追加)**: 新闻内容是现有某个 Saga 的直接后续、进展、反转或相关评论。
+        2. **CREATE (新建)**: 新闻是具有长期追踪价值的重大独立事件（如新政策、国际冲突、重大科技突破）。
+        3. **IGNORE (忽略)**: 日常天气预报、节气介绍、无实质内容的纯礼节性会议、单纯的节日庆祝、广告嫌疑内容。
+
+        每条新闻独立判断，decisions 数组必须覆盖全部 {len(news_list)} 条新闻，index 与输入编号一致。
+        请输出严格的 JSON 格式：
+        {{
+            "decisions": [
+                {{
+                    "index": 0,
+                    "reason": "简述判断理由 (50字内)",
+                    "action": "append" | "create" | "ignore",
+                    "saga_id": "如果选append，必须填入对应ID，否则为null"
+                }}
+            ]
+        }}
+        """
+        
+        user_content = "\n\n".join(
+            f"【新闻 {index}】\n标题: {news.title}\n内容摘要: {news.content[:500]}"
+            for index, news in enumerate(news_list)
+        )
+
+        result = await self._safe_api_call("RouteBatch", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ])
+
+        decisions = self._validate_batch_decisions(result, len(news_list), {s.id for s in active_sagas})
+        missing = [index for index, decision in enumerate(decisions) if decision is None]
+        if missing:
+            print(f"   [Debug] RouteBatch | ⚠️ {len(missing)}/{len(news_list)} 条结果缺失或无效，回退单条路由")
+            fallbacks = await asyncio.gather(*(self.route_news(news_list[i], active_sagas) for i in missing))
+            for index, decision in zip(missing, fallbacks):
+                decisions[index] = decision
+        return decisions
+
+    def _validate_batch_decisions(self, result: Dict, count: int, valid_ids: set) -> List[Optional[Dict]]:
+        """按 index 取出每条决策，不合法的位置为 None"""
+        decisions: List[Optional[Dict]] = [None] * count
+        raw_decisions = result.get("decisions") if isinstance(result, dict) else None
+        if not isinstance(raw_decisions, list):
+            return decisions
+
+        for raw in raw_decisions:
+            if not isinstance(raw, dict):
+                continue
+            index = raw.get("index")
+            if not isinstance(index, int) or not 0 <= index < count or decisions[index] is not None:
+                continue
+            decisions[index] = self._validate_decision(raw, valid_ids)
+        return decisions
+
+    async def route_and_summarize(self, news: RawNewsItem, active_sagas: List[SagaHeader]) -> Dict[str, Any]:
+        """
+        融合模式：一次请求同时给出路由决策、事件节点，以及 (新建时) Saga 元数据。
+        各部分分别校验，返回 {"decision", "event", "meta"}，校验失败的部分为 None，
+        由调用方回退到对应的单独调用。
+        """
+        saga_context = [{"id": s.id, "title": s.title, "keywords": s.title} for s in active_sagas]
+
+        system_prompt = f"""
+        你是由中央电视台聘请的高级新闻主编。请分析【输入新闻】，一次性完成路由决策、事件节点提炼和 (需要时) 新专题建档。
+
+        现有活跃故事线 (Sagas):
+        {json.dumps(saga_context, ensure_ascii=False)}
+
+        决策逻辑：
+        1. **APPEND (追加)**: 新闻内容是现有某个 Saga 的直接后续、进展、反转或相关评论。
+        2. **CREATE (新建)**: 新闻是具有长期追踪价值的重大独立事件（如新政策、国际冲突、重大科技突破）。
+        3. **IGNORE (忽略)**: 日常天气预报、节气介绍、无实质内容的纯礼节性会议、单纯的节日庆祝、广告嫌疑内容。
+
+        event (action 为 append 或 create 时必填):
+        - summary: 50字以内的核心事实摘要，去掉客套话，保留关键数据/人名/地点。
+        - causal_tag: 必须从以下列表中选择: {json.dumps(CAUSAL_TAGS, ensure_ascii=False)}。
+        - importance: 整数 1-5 (5 历史性时刻/国家级重大政策，3 正常推进/标准报道，1 提及性报道/背景补充)。
+
+        saga (仅 action 为 create 时必填，否则为 null):
+        - title: 类似于维基百科词条的客观标题，不超过20字。
+        - category: 必须从以下列表中选择一个: {json.dumps(CATEGORIES, ensure_ascii=False)}
+        - context_summary: 200字以内的背景介绍，说明该事件为何重要，涉及哪些关键方。
+
+        请输出严格的 JSON 格式：
+        {{
+            "reason": "简述判断理由 (50字内)",
+            "action": "append" | "create" | "ignore",
+            "saga_id": "如果选append，必须填入对应ID，否则为null",
+            "event": {{"summary": "...", "causal_tag": "...", "importance": 3}},
+            "saga": {{"title": "...", "category": "...", "context_summary": "..."}}
+        }}
+        """
+
+        user_content = f"【今日新闻】\n标题: {news.title}\n内容: {news.content[:800]}"
+
+        result = await self._safe_api_call("RouteFused", [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ])
+
+        decision = self._validate_decision(result, {s.id for s in active_sagas})
+        fused: Dict[str, Any] = {"decision": decision, "event": None, "meta": None}
+        if decision and decision["action"] in ("append", "create"):
+            fused["event"] = self._validate_event(result.get("event"))
+        if decision and decision["action"] == "create":
+            fused["meta"] = self._validate_meta(result.get("saga"))
+        return fused
+
+    @staticmethod
+    def _validate_decision(raw: Any, valid_ids: set) -> Optional[Dict[str, Any]]:
+        if not isinstance(raw, dict) or raw.get("action") not in ROUTE_ACTIONS:
+            return None
+        if raw["action"] == "append" and raw.get("saga_id") not in valid_ids:
+            return None
+        return {"reason": raw.get("reason", ""), "action": raw["action"], "saga_id": raw.get("saga_id")}
+
+    @staticmethod
+    def _validate_event(raw: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(raw, dict):
+            return None
+        summary = raw.get("summary")
+        if not isinstance(summary, str) or not summary.strip() or raw.get("causal_tag") not in CAUSAL_TAGS:
+            return None
+        try:
+            importance = int(raw.get("importance"))
+        except (TypeError, ValueError):
+            return None
+        if not 1 <= importance <= 5:
+            return None
+        return {"summary": summary.strip(), "causal_tag": raw["causal_tag"], "importance": importance}
+
+    @staticmethod
+    def _validate_meta(raw: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(raw, dict):
+            return None
+        title = raw.get("title")
+        if not isinstance(title, str) or not title.strip() or raw.get("category") not in CATEGORIES:
+            return None
+        context_summary = raw.get("context_summary", "")
+        if not isinstance(context_summary, str):
+            return None
+        return {"title": title.strip(), "category": raw["category"], "context_summary": context_summary}
 
     async def analyze_new_saga(self, news: RawNewsItem) -> Dict[str, Any]:
         """
@@ -142,7 +410,7 @@ class IntelligenceEngine:
             {"role": "user", "content": f"标题: {news.title}\n内容: {news.content[:800]}"}
         ])
 
-    async def summarize_event(self, news: RawNewsItem) -> Dict[str, Any]:
+    async def summarize_event(self, news: RawNewsItem, usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         [Prompt 优化点]
         1. 限制 Causal Tag: 使用固定列表。
@@ -173,9 +441,66 @@ class IntelligenceEngine:
         result = await self._safe_api_call("Summarize", [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": news.content[:800]}
-        ])
+        ], usage=usage)
         
         # 兜底数据
         if not result:
             return {"summary": news.content[:100], "causal_tag": "其他", "importance": 1}
-        return result
\ No newline at end of file
+        return result
+
+class RouteBatcher:
+    """
+    路由微批处理器：把并发到达的单条路由请求攒成批次 (满 batch_size 条或等待 linger 秒后发出)，
+    调用方仍按单条 await route(news)，拿到各自的决策。
+    candidates(news) 返回该条新闻的候选故事线，一个批次使用各条候选的并集。
+    """
+    def __init__(self, engine: IntelligenceEngine, candidates: Callable[[RawNewsItem], List[SagaHeader]],
+                 batch_size: int, linger: float = 0.05):
+        self.engine = engine
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.linger = linger
+        self._pending: List = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def route(self, news: RawNewsItem) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((news, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            # 保留引用，防止任务在完成前被回收
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _batch_candidates(self, batch: List) -> List[SagaHeader]:
+        merged: Dict[str, SagaHeader] = {}
+        for news, _ in batch:
+            for saga in self.candidates(news):
+                merged.setdefault(saga.id, saga)
+        return list(merged.values())
+
+    async def _run(self, batch: List):
+        try:
+            decisions = await self.engine.route_news_batch([news for news, _ in batch],
+                                                           self._batch_candidates(batch))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), decision in zip(batch, decisions):
+            if not future.done():
+                future.set_result(decision)
@@ -0,0 +1,85 @@
+# src/llm_cache.py
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+class LLMResponseCache:
+    """
+    LLM 响应的持久化缓存 (SQLite)
+    键 = sha256(模型 + 消息列表 + 温度)，相同 prompt 的重跑直接命中，不再消耗 Token。
+    按 TTL 过期，并在条目数超过上限时按最近使用时间淘汰。
+    """
+    EVICT_EVERY = 50  # 每写入 N 条检查一次容量
+
+    def __init__(self, db_path: str, ttl_days: float = 30, max_entries: int = 20000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                func_name TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self.conn.commit()
+        self.evict()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], temperature: float) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "temperature": temperature},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, func_name: str, response: Dict):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, func_name, response, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, func_name, json.dumps(response, ensure_ascii=False), now, now)
+        )
+        self.conn.commit()
+        self._puts += 1
+        if self._puts % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """删除过期条目，并把条目数压回上限以内 (最久未使用的先淘汰)"""
+        self.conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        overflow = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)", (overflow,)
+            )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,157 @@
+# src/llm_governor.py
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from openai import APIConnectionError, APIStatusError, RateLimitError
+
+from .config import (LLM_MAX_CONCURRENCY, LLM_BACKOFF_BASE, LLM_BACKOFF_CAP,
+                     LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+
+# 可重试且说明服务端在限流/过载的状态码
+THROTTLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMUnavailableError(RuntimeError):
+    """熔断器打开 (服务不可用) 时快速失败，调用方应把条目留待下次重试"""
+
+class ErrorKind:
+    THROTTLE = "throttle"   # 429/5xx/超时/连接失败：降并发、退避、计入熔断
+    RETRY = "retry"         # 服务正常但结果不可用 (如 JSON 解析失败)：直接重试
+    FATAL = "fatal"         # 其他 4xx (鉴权、参数错误)：重试无意义
+
+def classify_error(error: BaseException) -> str:
+    if isinstance(error, (RateLimitError, APIConnectionError)):  # APITimeoutError 是 APIConnectionError 的子类
+        return ErrorKind.THROTTLE
+    if isinstance(error, APIStatusError):
+        return ErrorKind.THROTTLE if error.status_code in THROTTLE_STATUSES else ErrorKind.FATAL
+    return ErrorKind.RETRY
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """从 429/503 响应头读取 retry-after-ms / Retry-After (秒数或 HTTP 日期)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class LLMGovernor:
+    """
+    LLM 调用的共享调度器，所有请求都经过这里。
+    - 在途请求上限按 AIMD 调整：成功一次加 1/limit，遇到限流/5xx/超时减半
+    - 退避为带全抖动的指数退避，服务端给了 Retry-After 时至少等这么久
+    - 熔断器：连续 breaker_threshold 次限流类失败后打开，cooldown 秒内直接快速失败；
+      冷却后放行一个探测请求 (半开)，成功即关闭
+    """
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, backoff_base: float = LLM_BACKOFF_BASE,
+                 backoff_cap: float = LLM_BACKOFF_CAP, breaker_threshold: int = LLM_BREAKER_THRESHOLD,
+                 breaker_cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self.stats = {"throttled": 0, "retried": 0, "fast_failed": 0, "breaker_opened": 0}
+        self._cond = asyncio.Condition()
+
+    @property
+    def breaker_state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.breaker_cooldown:
+            return "open"
+        return "half-open"
+
+    def _check_breaker(self):
+        state = self.breaker_state
+        if state == "open" or (state == "half-open" and self._probing):
+            self.stats["fast_failed"] += 1
+            remaining = self.breaker_cooldown - (time.monotonic() - self.opened_at)
+            raise LLMUnavailableError(f"LLM 服务熔断中 (约 {max(0.0, remaining):.0f}s 后重试)")
+        if state == "half-open":
+            self._probing = True
+
+    async def acquire(self):
+        """占用一个在途名额；熔断器打开时抛出 LLMUnavailableError"""
+        async with self._cond:
+            # 熔断期间排队的请求也会很快轮到，然后在这里快速失败
+            await self._cond.wait_for(lambda: self.in_flight < max(1, int(self.limit))
+                                      or self.breaker_state == "open")
+            try:
+                self._check_breaker()
+            except LLMUnavailableError:
+                self._cond.notify_all()
+                raise
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def abandon(self):
+        """请求被取消 (未得到结果)：若它是半开探测请求，让出探测资格"""
+        self._probing = False
+
+    def on_error(self, error: BaseException) -> str:
+        """记录一次失败，返回错误类别 (ErrorKind)"""
+        kind = classify_error(error)
+        if kind in (ErrorKind.RETRY, ErrorKind.FATAL):
+            # 服务端有响应，不影响并发上限与熔断；鉴权/参数错误 (FATAL) 若计入熔断，
+            # 之后的条目都会变成"延后处理"，反而掩盖了配置问题
+            self._probing = False
+            return kind
+        if kind == ErrorKind.THROTTLE:
+            self.stats["throttled"] += 1
+            self.limit = max(1.0, self.limit / 2)
+        self.consecutive_failures += 1
+        half_open_failed = self._probing
+        self._probing = False
+        if half_open_failed or (self.opened_at is None and self.consecutive_failures >= self.breaker_threshold):
+            self.opened_at = time.monotonic()
+            self.stats["breaker_opened"] += 1
+            print(f"🔌 [LLM Governor] 连续失败 {self.consecutive_failures} 次，熔断 {self.breaker_cooldown:.0f}s")
+        return kind
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """第 attempt 次 (从 0 开始) 失败后的等待时间"""
+        self.stats["retried"] += 1
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_cap))
+        return delay
+
+    def print_report(self):
+        if not any(self.stats.values()):
+            return
+        print(f"🚦 [LLM Governor] 限流/超时 {self.stats['throttled']} 次，退避重试 {self.stats['retried']} 次，"
+              f"熔断 {self.stats['breaker_opened']} 次，快速失败 {self.stats['fast_failed']} 次，"
+              f"当前并发上限 {int(self.limit)}")
@@ -0,0 +1,147 @@
+# src/llm_metrics.py
+import csv
+import json
+import math
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+from .config import LLM_PRICE_INPUT_PER_M, LLM_PRICE_OUTPUT_PER_M, LLM_PRICE_CURRENCY
+
+# 真正向服务端发出过请求的结果 (参与延迟统计)
+SENT_OUTCOMES = ("ok", "failed", "cancelled")
+# 计入失败的结果；unavailable = 熔断快速失败或限流重试耗尽，条目被延后处理
+FAILED_OUTCOMES = ("failed", "unavailable")
+
+class LLMCallRecord(BaseModel):
+    """一次 _safe_api_call 的结构化记录"""
+    ts: float
+    func: str
+    model: str
+    outcome: str  # ok / failed / unavailable / cache_hit / coalesced / cancelled
+    cache_hit: bool = False
+    attempts: int = 0
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩百分位数 (空列表返回 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+class LLMUsageLedger:
+    """
+    LLM 调用账本：收集每次调用的记录，按运行汇总延迟分位数、token 与估算费用，
+    并落盘为 {ledger_dir}/{run_id}_calls.csv (逐次调用) 与 {run_id}_summary.json (汇总)。
+    """
+    CSV_FIELDS = ["ts", "func", "model", "outcome", "cache_hit", "attempts", "latency",
+                  "prompt_tokens", "completion_tokens"]
+
+    def __init__(self, ledger_dir: Optional[str] = None,
+                 price_input_per_m: float = LLM_PRICE_INPUT_PER_M,
+                 price_output_per_m: float = LLM_PRICE_OUTPUT_PER_M):
+        self.ledger_dir = Path(ledger_dir) if ledger_dir else None
+        self.price_input_per_m = price_input_per_m
+        self.price_output_per_m = price_output_per_m
+        self.records: List[LLMCallRecord] = []
+        # 最近一次 flush 时的汇总，供基准测试等调用方读取
+        self.last_summary: Optional[Dict] = None
+
+    def record(self, func: str, model: str, outcome: str, attempts: int = 0, latency: float = 0.0,
+               prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.records.append(LLMCallRecord(
+            ts=time.time(), func=func, model=model, outcome=outcome,
+            cache_hit=outcome == "cache_hit", attempts=attempts, latency=latency,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+        ))
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.price_input_per_m + completion_tokens * self.price_output_per_m) / 1_000_000
+
+    def summary(self, items: int = 0) -> Dict:
+        """汇总当前记录；延迟分位数只统计真正发出的请求 (不含缓存命中与合并)"""
+        sent = [r for r in self.records if r.outcome in SENT_OUTCOMES]
+        prompt_tokens = sum(r.prompt_tokens for r in self.records)
+        completion_tokens = sum(r.completion_tokens for r in self.records)
+
+        by_func: Dict[str, Dict] = {}
+        for r in self.records:
+            entry = by_func.setdefault(r.func, {"calls": 0, "sent": 0, "cache_hits": 0, "failed": 0,
+                                                "tokens": 0, "latencies": []})
+            entry["calls"] += 1
+            entry["cache_hits"] += r.cache_hit
+            entry["failed"] += r.outcome in FAILED_OUTCOMES
+            entry["tokens"] += r.total_tokens
+            if r.outcome in SENT_OUTCOMES:
+                entry["sent"] += 1
+                entry["latencies"].append(r.latency)
+        for entry in by_func.values():
+            latencies = entry.pop("latencies")
+            entry["p50"] = percentile(latencies, 50)
+            entry["p95"] = percentile(latencies, 95)
+
+        latencies = [r.latency for r in sent]
+        total_cost = self.cost(prompt_tokens, completion_tokens)
+        return {
+            "items": items,
+            "calls": len(self.records),
+            "sent": len(sent),
+            "cache_hits": sum(1 for r in self.records if r.cache_hit),
+            "coalesced": sum(1 for r in self.records if r.outcome == "coalesced"),
+            "failed": sum(1 for r in self.records if r.outcome in FAILED_OUTCOMES),
+            "unavailable": sum(1 for r in self.records if r.outcome == "unavailable"),
+            "retries": sum(max(0, r.attempts - 1) for r in sent),
+            "latency_p50": percentile(latencies, 50),
+            "latency_p95": percentile(latencies, 95),
+            "latency_p99": percentile(latencies, 99),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_per_item": (prompt_tokens + completion_tokens) / items if items else 0.0,
+            "cost": total_cost,
+            "cost_per_item": total_cost / items if items else 0.0,
+            "currency": LLM_PRICE_CURRENCY,
+            "by_func": by_func,
+        }
+
+    def print_report(self, items: int = 0):
+        if not self.records:
+            return
+        s = self.summary(items)
+        print(f"💰 [LLM] 调用 {s['calls']} 次 (实际发出 {s['sent']}，缓存命中 {s['cache_hits']}，"
+              f"合并 {s['coalesced']}，失败 {s['failed']} (其中服务不可用 {s['unavailable']})，重试 {s['retries']})")
+        print(f"   延迟 p50/p95/p99: {s['latency_p50']:.2f}s / {s['latency_p95']:.2f}s / {s['latency_p99']:.2f}s")
+        print(f"   token: 输入 {s['prompt_tokens']} / 输出 {s['completion_tokens']}，"
+              f"每条新闻 {s['tokens_per_item']:.0f}；估算费用 {s['cost']:.4f} {s['currency']}")
+        for func, entry in sorted(s["by_func"].items()):
+            print(f"   - {func:<10} 调用 {entry['calls']:>4}  发出 {entry['sent']:>4}  命中 {entry['cache_hits']:>4}  "
+                  f"token {entry['tokens']:>7}  p50 {entry['p50']:.2f}s  p95 {entry['p95']:.2f}s")
+
+    def flush(self, items: int = 0, tag: str = "") -> Optional[Path]:
+        """写出本次运行的账本并清空记录；未配置目录或没有记录时只清空"""
+        records, summary = self.records, self.summary(items)
+        self.records = []
+        self.last_summary = summary
+        if not self.ledger_dir or not records:
+            return None
+        self.ledger_dir.mkdir(parents=True, exist_ok=True)
+        run_id = time.strftime("%Y%m%d_%H%M%S") + (f"_{tag}" if tag else "")
+
+        with open(self.ledger_dir / f"{run_id}_calls.csv", 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.CSV_FIELDS)
+            writer.writeheader()
+            for r in records:
+                writer.writerow(r.model_dump(include=set(self.CSV_FIELDS)))
+
+        summary_path = self.ledger_dir / f"{run_id}_summary.json"
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({"run_id": run_id, **summary}, f, ensure_ascii=False, indent=2)
+        return summary_path
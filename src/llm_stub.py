@@ -0,0 +1,181 @@
+# src/llm_stub.py
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from typing import Dict, List, Optional
+from aiohttp import web
+
+from .intelligence import CATEGORIES, CAUSAL_TAGS
+
+_SAGA_ID = re.compile(r'"id":\s*"([^"]+)"')
+_BATCH_ITEM = re.compile(r'【新闻 (\d+)】')
+
+class LLMStubServer:
+    """
+    本地 OpenAI 兼容替身服务 (POST /v1/chat/completions)，用于离线压测 IntelligenceEngine / SagaManager。
+
+    - 按 system prompt 识别 Route / RouteBatch / RouteFused / NewSaga / Summarize，
+      返回符合各自 schema 的 JSON；结果只由请求内容的哈希决定，同一输入每次相同
+    - 延迟分布: uniform (均值 ± 抖动) 或 lognormal (均值 latency_ms，长尾由 jitter 控制)
+    - 按 error_rate 随机返回 429 (带 Retry-After) 或 503
+    - usage 中的 token 数按字符数估算 (chars_per_token)，便于核对账本
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, jitter: float = 0.5,
+                 distribution: str = "uniform", error_rate: float = 0.0, retry_after: float = 1.0,
+                 chars_per_token: float = 1.5, ignore_ratio: float = 0.3, append_ratio: float = 0.4,
+                 seed: int = 0):
+        if distribution not in ("uniform", "lognormal"):
+            raise ValueError(f"未知的延迟分布: {distribution}")
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.chars_per_token = chars_per_token
+        self.ignore_ratio = ignore_ratio
+        self.append_ratio = append_ratio
+        self.random = random.Random(seed)
+        self.origin = ""
+        self.stats: Dict[str, int] = {"requests": 0, "errors_injected": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        """传给 AsyncOpenAI(base_url=...) 的地址"""
+        return f"{self.origin}/v1"
+
+    @staticmethod
+    def _hash(text: str) -> int:
+        return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+
+    def _latency(self) -> float:
+        if not self.latency_ms:
+            return 0.0
+        if self.distribution == "lognormal":
+            # 均值保持为 latency_ms：mu = ln(mean) - sigma^2 / 2
+            sigma = max(self.jitter, 1e-6)
+            mu = math.log(self.latency_ms) - sigma ** 2 / 2
+            return self.random.lognormvariate(mu, sigma) / 1000
+        spread = self.latency_ms * self.jitter
+        return max(0.0, self.random.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000
+
+    def _decision(self, text: str, saga_ids: List[str]) -> Dict:
+        h = self._hash(text)
+        roll = (h % 1000) / 1000
+        if roll < self.ignore_ratio:
+            return {"reason": "stub: 琐事", "action": "ignore", "saga_id": None}
+        if roll < self.ignore_ratio + self.append_ratio and saga_ids:
+            return {"reason": "stub: 后续进展", "action": "append", "saga_id": saga_ids[h % len(saga_ids)]}
+        return {"reason": "stub: 新事件", "action": "create", "saga_id": None}
+
+    def _event(self, text: str) -> Dict:
+        h = self._hash("event:" + text)
+        summary = re.sub(r'\s+', '', text)[:50] or "stub 摘要"
+        return {"summary": summary, "causal_tag": CAUSAL_TAGS[h % len(CAUSAL_TAGS)], "importance": 1 + h % 5}
+
+    def _saga_meta(self, text: str) -> Dict:
+        h = self._hash("saga:" + text)
+        title_line = next((line for line in text.splitlines() if line.startswith("标题")), text)
+        title = title_line.split(":", 1)[-1].strip()[:20] or "stub 专题"
+        return {"title": title, "category": CATEGORIES[h % len(CATEGORIES)],
+                "context_summary": f"stub 背景: {title}", "causal_tag": "其他", "importance": 3 + h % 3}
+
+    @staticmethod
+    def _kind(system: str) -> str:
+        if '"decisions"' in system:
+            return "RouteBatch"
+        if "一次性完成" in system:
+            return "RouteFused"
+        if "分配到合适的处理路径" in system:
+            return "Route"
+        if "Event Node" in system:
+            return "Summarize"
+        if "新的新闻专题" in system:
+            return "NewSaga"
+        return "Unknown"
+
+    def _respond(self, kind: str, system: str, user: str) -> Dict:
+        saga_ids = _SAGA_ID.findall(system)
+        if kind == "RouteBatch":
+            indexes = [int(i) for i in _BATCH_ITEM.findall(user)]
+            chunks = _BATCH_ITEM.split(user)[2::2]
+            return {"decisions": [{"index": index, **self._decision(chunk, saga_ids)}
+                                  for index, chunk in zip(indexes, chunks)]}
+        if kind == "RouteFused":
+            decision = self._decision(user, saga_ids)
+            result = {**decision, "event": None, "saga": None}
+            if decision["action"] != "ignore":
+                result["event"] = self._event(user)
+            if decision["action"] == "create":
+                result["saga"] = self._saga_meta(user)
+            return result
+        if kind == "Route":
+            return self._decision(user, saga_ids)
+        if kind == "Summarize":
+            return self._event(user)
+        if kind == "NewSaga":
+            return self._saga_meta(user)
+        return {"error": "unknown prompt"}
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        body = await request.json()
+        await asyncio.sleep(self._latency())
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["errors_injected"] += 1
+            if self.random.random() < 0.5:
+                return web.json_response({"error": {"message": "stub: rate limited", "type": "rate_limit"}},
+                                         status=429, headers={"Retry-After": str(self.retry_after)})
+            return web.json_response({"error": {"message": "stub: overloaded", "type": "server_error"}}, status=503)
+
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        kind = self._kind(system)
+        self.stats[kind] = self.stats.get(kind, 0) + 1
+        result = self._respond(kind, system, user)
+
+        content = json.dumps(result, ensure_ascii=False)
+        prompt_tokens = int(sum(len(m.get("content", "")) for m in messages) / self.chars_per_token)
+        completion_tokens = int(len(content) / self.chars_per_token)
+        return web.json_response({
+            "id": f"stub-{self._hash(system + user):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.origin = f"http://{bound_host}:{bound_port}"
+        print(f"🧪 [LLMStub] 已启动: {self.base_url} (latency={self.latency_ms}ms/{self.distribution}, "
+              f"error_rate={self.error_rate})")
+        return self.origin
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
@@ -1,38 +1,87 @@
 # src/manager.py (修改版)
-import json
+import asyncio
 import os
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Set # 新增 Set
-from .schema import Saga, SagaStatus, DailyBriefing, EventNode, RawNewsItem
-from .intelligence import IntelligenceEngine
+from typing import Any, AsyncIterable, List, Dict, Optional, Set, Tuple # 新增 Set
+from .config import SAGA_CONCURRENCY, ROUTE_BATCH_SIZE, ROUTE_CANDIDATE_K, SPECULATIVE_SUMMARY
+from .config import FUSED_ROUTING, SAGA_COLD_AFTER_DAYS
+from .config import RUN_JOURNAL_DIR, RUN_JOURNAL_KEEP_DAYS, RUN_JOURNAL_MAX_ATTEMPTS
+from .config import NEAR_DUP_ENABLED, NEAR_DUP_THRESHOLD
+from .config import PRE_ROUTER_ENABLED, PRE_ROUTER_MODEL_PATH, PRE_ROUTER_IGNORE_THRESHOLD, PRE_ROUTER_AUDIT_PATH
+from .schema import Saga, SagaHeader, SagaStatus, DailyBriefing, EventNode, RawNewsItem
+from .intelligence import IntelligenceEngine, RouteBatcher
+from .llm_governor import LLMUnavailableError
+from .saga_index import SagaRetrievalIndex
+from .pre_router import PreRouter, PreRouterAudit, IgnoreDecisionLog, ignore_log_path, undecided_urls
+from .near_dup import NearDuplicateIndex
+from .saga_store import SagaStore, open_saga_store, index_dir_for
+from .url_index import UrlIndex
+from .saga_catalog import SagaCatalog, open_cold_store
+from .run_journal import RunJournal
 
 class SagaManager:
-    def __init__(self, db_dir: str = "data/sagas"):
+    def __init__(self, db_dir: str = "data/sagas", concurrency: int = SAGA_CONCURRENCY,
+                 speculative: bool = SPECULATIVE_SUMMARY, fused: bool = FUSED_ROUTING,
+                 pre_route: bool = PRE_ROUTER_ENABLED, near_dup: bool = NEAR_DUP_ENABLED,
+                 intelligence: Optional[IntelligenceEngine] = None, store: Optional[SagaStore] = None,
+                 journal: Optional[RunJournal] = None, retry_failed: bool = False):
         self.db_dir = Path(db_dir)
-        self.db_dir.mkdir(parents=True, exist_ok=True)
-        self.sagas: Dict[str, Saga] = {}
-        self.intelligence = IntelligenceEngine()
+        # 故事线存储 (JSON 目录或 SQLite，见 SAGA_STORE_BACKEND)
+        self.store = store or open_saga_store(db_dir)
+        # 同时进行 LLM 处理的新闻条数 (1 = 逐条顺序处理)
+        self.concurrency = concurrency
+        # 投机摘要：摘要与路由同时发出，省掉追加/新建路径上的一次串行往返
+        self.speculative = speculative
+        self.speculation_stats = {"launched": 0, "used": 0, "cancelled": 0, "discarded": 0, "wasted_tokens": 0}
+        # 融合模式：路由 + 摘要 + 新建元数据一次请求完成，校验失败的部分回退到单独调用
+        self.fused = fused
+        self.fused_stats = {"calls": 0, "fallback_route": 0, "fallback_event": 0, "fallback_meta": 0}
+        # 本地预路由：高置信度的琐事直接 ignore，不发路由请求
+        self.pre_router: Optional[PreRouter] = None
+        self.pre_router_audit = PreRouterAudit(PRE_ROUTER_AUDIT_PATH)
+        # 未入故事线新闻的判定来源 (随故事线数据入库)，训练预路由/重建近似重复索引时据此排除非 LLM 判定的忽略
+        self.ignore_log = IgnoreDecisionLog(str(ignore_log_path(db_dir)))
+        self.pre_router_stats = {"checked": 0, "skipped": 0}
+        if pre_route:
+            self.pre_router = PreRouter.load(PRE_ROUTER_MODEL_PATH)
+            if self.pre_router is None:
+                print(f"⚠️ 未找到预路由模型 {PRE_ROUTER_MODEL_PATH}，请先运行 python run_train_pre_router.py")
+        # 按需加载：常驻内存的只有头信息，事件列表首次访问时载入 (LRU，内存预算 SAGA_CACHE_MB)
+        self.sagas = SagaCatalog(self.store, str(index_dir_for(db_dir) / "catalog.json"),
+                                 cold=open_cold_store(db_dir, self.store))
+        self.intelligence = intelligence or IntelligenceEngine()
         self._load_sagas()
+        # URL -> (saga_id, 事件下标) 持久化索引：去重与报告关联共用，新建/追加时增量登记
+        self.url_index = UrlIndex(str(index_dir_for(db_dir) / "url_index.jsonl"))
+        if not self.url_index.load(self.store.fingerprint()):
+            count = self.url_index.rebuild(self.sagas.iter_full_history(), self.store.fingerprint())
+            print(f"🗂️ URL 索引已从故事线重建: {count} 条")
+        # 路由候选检索索引 (只收录 ACTIVE 故事线)，新建/追加时增量更新
+        self.saga_index = SagaRetrievalIndex()
+        for header in self.sagas.active_headers():
+            self.saga_index.add(header)
+        # 近似重复索引：换了 URL 的重播/改写稿件直接沿用历史处理结果
+        self.near_dup: Optional[NearDuplicateIndex] = None
+        self.near_dup_stats = {"attached": 0, "ignored": 0}
+        # LLM 服务不可用 (熔断/限流重试耗尽) 而延后的新闻，不标记为已处理，重跑当天即可补上
+        self.deferred: List[RawNewsItem] = []
+        # 断点日志：重跑同一天时跳过已完成的条目、复用已得到的 LLM 结果；
+        # 处理失败的条目自动重试，连续失败 RUN_JOURNAL_MAX_ATTEMPTS 次后跳过 (retry_failed 时仍重试)
+        self.journal = journal or RunJournal(RUN_JOURNAL_DIR, RUN_JOURNAL_KEEP_DAYS)
+        self.retry_failed = retry_failed
+        self.resume_stats = {"skipped": 0, "failed": 0, "reused": 0}
+        if near_dup:
+            index_path = index_dir_for(db_dir) / "near_dup.jsonl"
+            self.near_dup = NearDuplicateIndex(str(index_path), threshold=NEAR_DUP_THRESHOLD)
+            if not self.near_dup.load():
+                count = self.near_dup.rebuild(self.sagas.iter_full_history(), exclude=undecided_urls(db_dir))
+                print(f"🧬 近似重复索引已从原始档案重建: {count} 条")
 
     def _load_sagas(self):
-        """加载所有现存的 Saga"""
-        for file_path in self.db_dir.glob("*.json"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    saga = Saga(**data)
-                    self.sagas[saga.id] = saga
-            except Exception as e:
-                print(f"⚠️ 加载 Saga 异常 {file_path}: {e}")
-
-    # [新增方法] 获取所有已经存在的新闻链接
-    def _get_all_processed_urls(self) -> Set[str]:
-        processed_urls = set()
-        for saga in self.sagas.values():
-            for event in saga.events:
-                if event.source_url:
-                    processed_urls.add(event.source_url)
-        return processed_urls
+        """加载所有现存 Saga 的头信息 (事件按需载入)"""
+        if not self.sagas.load():
+            print(f"📇 故事线目录已从存储重建: {len(self.sagas)} 个")
 
     async def process_daily_briefing(self, briefing: DailyBriefing):
         """核心业务流：处理每日简报"""
@@ -40,57 +89,531 @@ class SagaManager:
             print("📭 今日无新闻，跳过处理。")
             return
 
-        # 1. [关键修复] 构建去重集合
-        # 收集所有 Saga 中已经记录过的 URL
-        existing_urls = self._get_all_processed_urls()
-        print(f"🛡️ 已知历史事件 URL: {len(existing_urls)} 个 (用于去重)")
+        async def ordered_items():
+            for index, news in enumerate(briefing.news_items):
+                yield (index, 0), news
 
-        active_sagas = [s for s in self.sagas.values() if s.status == SagaStatus.ACTIVE]
+        await self._process_items(ordered_items())
+
+    async def process_news_stream(self, stream: AsyncIterable[Tuple[Tuple[int, int], RawNewsItem]]):
+        """
+        流式业务流：爬虫每解析完一条新闻就立即路由，抓取与 LLM 调用相互重叠。
+        stream 产出 (播出顺序键, 新闻)，通常来自 CrawlerService.stream_daily_briefing。
+        """
+        count = await self._process_items(stream)
+        if count == 0:
+            print("📭 今日无新闻，跳过处理。")
+
+    def print_plan_report(self):
+        stats = self.sagas.stats
+        if stats["loads"]:
+            print(f"📦 按需加载: 头信息 {len(self.sagas)} 个，事件页载入 {stats['loads']} 次 / 命中 {stats['hits']} / "
+                  f"淘汰 {stats['evictions']}，常驻约 {self.sagas.resident_bytes / 1024 / 1024:.1f} MB")
+        stats = self.speculation_stats
+        if stats["launched"]:
+            print(f"🎲 投机摘要: 发起 {stats['launched']} 次，采用 {stats['used']}，"
+                  f"取消 {stats['cancelled']}，完成后丢弃 {stats['discarded']}，浪费 token {stats['wasted_tokens']}")
+        stats = self.fused_stats
+        if stats["calls"]:
+            print(f"🧩 融合调用: {stats['calls']} 次，回退 路由 {stats['fallback_route']} / "
+                  f"摘要 {stats['fallback_event']} / 元数据 {stats['fallback_meta']}")
+        stats = self.near_dup_stats
+        if stats["attached"] or stats["ignored"]:
+            print(f"🧬 近似重复: 直接追加 {stats['attached']} 条，沿用忽略 {stats['ignored']} 条")
+        stats = self.resume_stats
+        if stats["skipped"] or stats["failed"] or stats["reused"]:
+            print(f"♻️ 断点续跑: 跳过已完成 {stats['skipped']} 条，复用 LLM 结果 {stats['reused']} 条，"
+                  f"跳过上次失败 {stats['failed']} 条")
+        stats = self.pre_router_stats
+        if stats["checked"]:
+            print(f"🧮 本地预路由: 判断 {stats['checked']} 条，直接忽略 {stats['skipped']} 条 "
+                  f"({stats['skipped'] / stats['checked']:.0%})，审计日志: {PRE_ROUTER_AUDIT_PATH}")
+
+    async def _process_items(self, items: AsyncIterable[Tuple[Tuple[int, int], RawNewsItem]]) -> int:
+        """
+        处理一批带播出顺序键的新闻，返回条目数。
+        - 顺序模式 (concurrency=1): 按播出顺序逐条 路由 -> 生成 -> 落盘 (乱序到达的条目先缓存，见 _in_broadcast_order)
+        - 并发模式: LLM 阶段 (_plan_news) 受信号量限制并行执行，全部完成后
+          再按播出顺序串行落盘 (_apply_plan)，最终 Saga 状态与完成先后无关
+        """
+        existing_urls, active_sagas = self._prepare_context()
+        created_today: Dict[str, str] = {}
+        count = 0
+        run_date = ""
+        # 批量路由：并发到达的路由请求合并为一次调用；顺序模式每次只有一条请求，攒批只会白等 linger
+        router = None
+        if ROUTE_BATCH_SIZE > 1 and self.concurrency > 1:
+            router = RouteBatcher(self.intelligence, lambda news: self._candidate_sagas(news, active_sagas),
+                                  ROUTE_BATCH_SIZE)
+
+        if self.concurrency <= 1:
+            async for order, news in self._in_broadcast_order(items):
+                count += 1
+                run_date = run_date or news.date
+                if self._is_duplicate(news, existing_urls) or self._skip_journaled(news):
+                    continue
+                plan = await self._plan_news_or_defer(news, active_sagas, router)
+                await self._apply_plan(news, plan, existing_urls, created_today)
+            self._finish_run(count, run_date)
+            return count
+
+        print(f"⚡ 并发模式: 最多 {self.concurrency} 条新闻同时进行 LLM 处理")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        scheduled: List[Tuple[Tuple[int, int], RawNewsItem, Optional[asyncio.Task]]] = []
+        scheduled_urls: Set[str] = set()
+        # 当天内容近似重复的稿件：各自并发规划时彼此都还不在近似重复索引中，会各调一次 LLM 且可能结论不同。
+        # 先到的一条照常规划，与之相似的后到稿件不规划 (task 为 None)，等落盘阶段按播出顺序再规划
+        same_day = self.near_dup.empty_like() if self.near_dup is not None else None
+        same_day_leaders: Set[str] = set()
+
+        async def plan_guarded(news: RawNewsItem) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._plan_news_or_defer(news, active_sagas, router)
+
+        async for order, news in items:
+            count += 1
+            run_date = run_date or news.date
+            if self._is_duplicate(news, existing_urls) or news.url in scheduled_urls or self._skip_journaled(news):
+                continue
+            scheduled_urls.add(news.url)
+            signature = same_day.signature(news.content) if same_day is not None else None
+            match = same_day.query(signature) if signature is not None else None
+            if match is not None:
+                same_day_leaders.add(match[0])
+                scheduled.append((order, news, None))
+                continue
+            if signature is not None:
+                same_day.add(news.url, None, signature)
+            scheduled.append((order, news, asyncio.create_task(plan_guarded(news))))
+
+        # 按播出顺序落盘
+        scheduled.sort(key=lambda entry: entry[0])
+        await asyncio.gather(*(task for _, _, task in scheduled if task is not None))
+        for order, news, task in scheduled:
+            print(f"\n📌 落盘 #{order[0] + 1:02d}.{order[1]}: {news.title[:30]}...")
+            if task is None:
+                # 播出在前的相似稿件已落盘并登记到近似重复索引，这里通常直接沿用其结果
+                plan = await self._plan_news_or_defer(news, self.sagas.active_headers())
+            else:
+                plan = task.result()
+                if news.url in same_day_leaders and not plan.get("near_dup_of"):
+                    # 播出顺序在本条之前的相似稿件已先落盘：与顺序模式一致，改为沿用它的结果
+                    plan = self._plan_near_duplicate(news) or plan
+            await self._apply_plan(news, plan, existing_urls, created_today)
+        self._finish_run(count, run_date)
+        return count
+
+    @staticmethod
+    async def _in_broadcast_order(items: AsyncIterable[Tuple[Tuple[int, int], RawNewsItem]]
+                                  ) -> AsyncIterable[Tuple[Tuple[int, int], RawNewsItem]]:
+        """
+        把按完成顺序到达的条目重排为播出顺序：缓存已到达的条目，只放出连续的前缀，
+        使顺序模式的结果与网络快慢无关。
+        需要流对象提供 sub_counts (列表序号 -> 子条目数，见 BriefingStream)；没有时视为已按顺序产出。
+        """
+        sub_counts = getattr(items, "sub_counts", None)
+        if sub_counts is None:
+            async for entry in items:
+                yield entry
+            return
+        buffer: Dict[int, List[Tuple[Tuple[int, int], RawNewsItem]]] = {}
+        next_index = 0
+        async for order, news in items:
+            buffer.setdefault(order[0], []).append((order, news))
+            while next_index in sub_counts and len(buffer.get(next_index, [])) >= sub_counts[next_index]:
+                for entry in sorted(buffer.pop(next_index, []), key=lambda entry: entry[0]):
+                    yield entry
+                next_index += 1
+        # 流结束：剩余条目 (如前面有获取失败的列表序号) 按顺序放出
+        for index in sorted(buffer):
+            for entry in sorted(buffer[index], key=lambda entry: entry[0]):
+                yield entry
+
+    def _finish_run(self, count: int, run_date: str):
+        """打印本次运行的处理统计与 LLM 账本，并把账本落盘"""
+        self.print_plan_report()
+        self.intelligence.governor.print_report()
+        if self.deferred:
+            print(f"⏸️ LLM 服务不可用，{len(self.deferred)} 条新闻延后处理 (未标记为已处理，重跑当天即可补上):")
+            for news in self.deferred:
+                print(f"   - {news.title[:30]} ({news.url})")
+        if SAGA_COLD_AFTER_DAYS > 0 and run_date:
+            cutoff = (datetime.strptime(run_date, "%Y%m%d") - timedelta(days=SAGA_COLD_AFTER_DAYS)).strftime("%Y%m%d")
+            moved = self.sagas.archive_cold(cutoff, str(self.db_dir))
+            if moved:
+                print(f"🧊 {moved} 个早于 {cutoff} 的事件已转入冷存储")
+        # 增量写入合并进快照 (JSON 存储的事件日志 / SQLite 的 WAL)，之后再记录索引对应的存储状态
+        compacted = self.store.compact()
+        if compacted:
+            print(f"🗜️ 事件日志已合并进 {compacted} 个故事线快照")
+        self.sagas.flush()
+        self.url_index.flush(self.store.fingerprint())
+        self.intelligence.ledger.print_report(count)
+        ledger_path = self.intelligence.ledger.flush(count, tag=run_date)
+        if ledger_path:
+            print(f"🧾 LLM 账本已写入: {ledger_path}")
+
+    def _prepare_context(self) -> Tuple[Set[str], List[SagaHeader]]:
+        # 1. [关键修复] 去重：历史 URL 由 url_index 提供，这里只收集本次运行内处理过的 URL
+        existing_urls: Set[str] = set()
+        print(f"🛡️ 已知历史事件 URL: {len(self.url_index)} 个 (用于去重)")
+
+        active_sagas = self.sagas.active_headers()
         print(f"📚 当前活跃故事线: {len(active_sagas)} 个")
+        if ROUTE_CANDIDATE_K > 0:
+            print(f"🔎 路由候选检索: 每条新闻最多 {ROUTE_CANDIDATE_K} 个候选")
+        return existing_urls, active_sagas
+
+    def _candidate_sagas(self, news: RawNewsItem, active_sagas: List[SagaHeader]) -> List[SagaHeader]:
+        """路由候选：按 BM25 检索 top-K 活跃故事线；未开启检索时返回全部活跃故事线"""
+        if ROUTE_CANDIDATE_K <= 0:
+            return active_sagas
+        query = f"{news.title} {news.content[:300]}"
+        return [self.sagas.header(saga_id) for saga_id in self.saga_index.search(query, ROUTE_CANDIDATE_K)]
 
-        for news in briefing.news_items:
+    def _is_duplicate(self, news: RawNewsItem, existing_urls: Set[str]) -> bool:
+        # 2. [关键修复] 强力去重逻辑
+        # 如果这条新闻的 URL 已经在数据库里了，直接跳过！
+        # 注意：快讯拆分后的 URL 带有 #sub1, #sub2，是唯一的，所以也能完美去重
+        if news.url in self.url_index or news.url in existing_urls:
             print(f"\n📰 分析: {news.title[:30]}...")
-            
-            # 2. [关键修复] 强力去重逻辑
-            # 如果这条新闻的 URL 已经在数据库里了，直接跳过！
-            # 注意：快讯拆分后的 URL 带有 #sub1, #sub2，是唯一的，所以也能完美去重
-            if news.url in existing_urls:
-                print(f"   ↳ 🚫 [Duplicate] 该新闻已存在于故事线中，跳过 (省钱模式)。")
-                continue
+            print("   ↳ 🚫 [Duplicate] 该新闻已存在于故事线中，跳过 (省钱模式)。")
+            return True
+        return False
 
-            # --- 下面是正常的 AI 流程 ---
-            
+    def _skip_journaled(self, news: RawNewsItem) -> bool:
+        """
+        断点日志判定本条无需再处理时返回 True：上次已判定忽略，或连续失败次数已达上限且未开启 retry_failed。
+        已追加/新建的条目由 URL 索引去重；若日志记为完成而 URL 不在索引中 (存储写入未保存)，
+        则交给 _plan_news_or_defer 复用计划重新落盘。
+        """
+        entry = self.journal.get(news.date, news.url)
+        if entry is None:
+            return False
+        if entry["status"] == RunJournal.DONE and entry["plan"].get("action") == "ignore":
+            print(f"\n📰 分析: {news.title[:30]}...")
+            print("   ↳ ⏭️ [Resume] 上次运行已判定忽略，跳过")
+            self.resume_stats["skipped"] += 1
+            return True
+        attempts = self.journal.failed_attempts(news.date, news.url)
+        if attempts >= RUN_JOURNAL_MAX_ATTEMPTS and not self.retry_failed:
+            print(f"\n📰 分析: {news.title[:30]}...")
+            print(f"   ↳ ⏭️ [Resume] 已连续失败 {attempts} 次 ({entry.get('error', '')[:60]})，跳过 (--retry-failed 可强制重试)")
+            self.resume_stats["failed"] += 1
+            return True
+        return False
+
+    def _journaled_plan(self, news: RawNewsItem) -> Optional[Dict[str, Any]]:
+        """断点日志中上次运行已得到、且仍可落盘的计划"""
+        entry = self.journal.get(news.date, news.url)
+        if entry is None or entry["status"] not in (RunJournal.PLANNED, RunJournal.DONE):
+            return None
+        plan = entry["plan"]
+        # 要追加的故事线已不存在 (如上次新建后未保存)：重新路由
+        if plan.get("action") == "append" and plan.get("saga_id") not in self.sagas:
+            return None
+        return plan
+
+    async def _plan_news(self, news: RawNewsItem, active_sagas: List[SagaHeader],
+                         router: Optional[RouteBatcher] = None) -> Dict[str, Any]:
+        """
+        LLM 阶段：路由决策 + 生成事件/元数据，只读 self.sagas，不做任何写入。
+        返回的计划交给 _apply_plan 落盘。
+        """
+        print(f"\n📰 分析: {news.title[:30]}...")
+
+        if self.near_dup is not None:
+            plan = self._plan_near_duplicate(news)
+            if plan is not None:
+                return plan
+
+        if self.pre_router:
+            p_ignore = self.pre_router.predict_ignore(news.title, news.content)
+            skipped = p_ignore >= PRE_ROUTER_IGNORE_THRESHOLD
+            self.pre_router_stats["checked"] += 1
+            self.pre_router_stats["skipped"] += skipped
+            self.pre_router_audit.record(news, p_ignore, PRE_ROUTER_IGNORE_THRESHOLD, skipped)
+            if skipped:
+                return {"action": "ignore", "pre_routed": True, "p_ignore": p_ignore}
+
+        if self.fused:
+            plan = await self._plan_news_fused(news, active_sagas)
+            if plan is not None:
+                return plan
+
+        # 摘要的输入与路由结果无关，投机模式下与路由同时发出
+        summary_task: Optional[asyncio.Task] = None
+        summary_usage: Dict[str, int] = {"total_tokens": 0}
+        if self.speculative:
+            self.speculation_stats["launched"] += 1
+            summary_task = asyncio.create_task(self.intelligence.summarize_event(news, usage=summary_usage))
+
+        try:
             # A. 路由决策 (Router)
-            decision = await self.intelligence.route_news(news, active_sagas)
-            action = decision.get("action", "ignore")
-            
-            if action == "ignore":
+            if router:
+                decision = await router.route(news)
+            else:
+                decision = await self.intelligence.route_news(news, self._candidate_sagas(news, active_sagas))
+        except BaseException:
+            if summary_task:
+                summary_task.cancel()
+            raise
+        action = decision.get("action", "ignore")
+        plan: Dict[str, Any] = {"action": action}
+        if decision.get("call_failed"):
+            plan["call_failed"] = True
+
+        if action not in ("append", "create"):
+            if summary_task:
+                await self._discard_speculation(summary_task, summary_usage)
+            return plan
+
+        if summary_task:
+            self.speculation_stats["used"] += 1
+            event_call = summary_task
+        else:
+            event_call = self.intelligence.summarize_event(news)
+
+        if action == "append":
+            saga_id = decision.get("saga_id")
+            if saga_id and saga_id in self.sagas:
+                plan["saga_id"] = saga_id
+                plan["event"] = await event_call
+                return plan
+            plan["action"] = action = "create"
+            plan["invalid_append"] = True
+
+        # 元数据与首个事件互不依赖，可同时请求
+        plan["meta"], plan["event"] = await asyncio.gather(
+            self.intelligence.analyze_new_saga(news),
+            event_call
+        )
+        return plan
+
+    async def _plan_news_or_defer(self, news: RawNewsItem, active_sagas: List[SagaHeader],
+                                  router: Optional[RouteBatcher] = None) -> Dict[str, Any]:
+        plan = self._journaled_plan(news)
+        if plan is not None:
+            print(f"\n📰 分析: {news.title[:30]}...")
+            print("   ↳ ♻️ [Resume] 复用上次运行的 LLM 结果")
+            self.resume_stats["reused"] += 1
+            return plan
+        try:
+            plan = await self._plan_news(news, active_sagas, router)
+        except LLMUnavailableError as e:
+            self.journal.record(news.date, news.url, RunJournal.DEFERRED, reason=str(e))
+            return {"action": "deferred", "reason": str(e)}
+        except Exception as e:
+            # 单条失败不影响其他条目 (顺序/并发模式一致)，运行照常收尾
+            print(f"   ↳ ❌ [Error] 处理失败: {news.title[:30]}... ({e})")
+            self.journal.record_failure(news.date, news.url, str(e))
+            return {"action": "error"}
+        if plan.get("call_failed"):
+            self.journal.record_failure(news.date, news.url, "路由调用失败")
+        else:
+            self.journal.record(news.date, news.url, RunJournal.PLANNED, plan=plan)
+        return plan
+
+    def _plan_near_duplicate(self, news: RawNewsItem) -> Optional[Dict[str, Any]]:
+        """
+        正文与历史已处理新闻近似重复时，不调用 LLM，直接沿用当时的结果：
+        当时被忽略则忽略；当时进入某个仍活跃的故事线则追加到该故事线，并复用原事件的摘要。
+        """
+        signature = self.near_dup.signature(news.content)
+        match = self.near_dup.query(signature) if signature is not None else None
+        if match is None:
+            return None
+        source_url, saga_id, similarity = match
+        plan: Dict[str, Any] = {"near_dup_of": source_url, "similarity": similarity}
+        if saga_id is None:
+            plan["action"] = "ignore"
+            return plan
+
+        if saga_id not in self.sagas or self.sagas.header(saga_id).status != SagaStatus.ACTIVE:
+            return None
+        plan.update(action="append", saga_id=saga_id)
+        # 来源事件可能已转入冷存储，按完整历史查找
+        saga = self.sagas.full_history(saga_id)
+        source_event = next((e for e in saga.events if e.source_url == source_url), None) if saga else None
+        if source_event:
+            plan["event"] = {
+                "summary": source_event.summary,
+                # 首个事件的 Inception 标记不沿用
+                "causal_tag": source_event.causal_tag if source_event.causal_tag != "Inception" else "其他",
+                "importance": source_event.importance,
+            }
+        return plan
+
+    async def _plan_news_fused(self, news: RawNewsItem, active_sagas: List[SagaHeader]) -> Optional[Dict[str, Any]]:
+        """融合模式的 LLM 阶段；路由决策本身不合法时返回 None，由调用方走分步流程"""
+        self.fused_stats["calls"] += 1
+        fused = await self.intelligence.route_and_summarize(news, self._candidate_sagas(news, active_sagas))
+        decision = fused["decision"]
+        if decision is None:
+            self.fused_stats["fallback_route"] += 1
+            print("   ↳ ⚠️ [Fused] 融合结果路由字段无效，回退分步调用")
+            return None
+
+        action = decision["action"]
+        plan: Dict[str, Any] = {"action": action}
+        if action == "ignore":
+            return plan
+
+        missing = []
+        if fused["event"] is None:
+            self.fused_stats["fallback_event"] += 1
+            missing.append(("event", self.intelligence.summarize_event(news)))
+        if action == "create" and fused["meta"] is None:
+            self.fused_stats["fallback_meta"] += 1
+            missing.append(("meta", self.intelligence.analyze_new_saga(news)))
+        if missing:
+            print(f"   ↳ ⚠️ [Fused] 字段校验失败，单独补调: {', '.join(name for name, _ in missing)}")
+            results = await asyncio.gather(*(call for _, call in missing))
+            fused.update({name: result for (name, _), result in zip(missing, results)})
+
+        plan["event"] = fused["event"]
+        if action == "append":
+            plan["saga_id"] = decision["saga_id"]
+        else:
+            plan["meta"] = fused["meta"]
+        return plan
+
+    async def _discard_speculation(self, task: asyncio.Task, usage: Dict[str, int]):
+        """路由结果不需要摘要：还在进行中则取消，已完成则丢弃并计入浪费的 token"""
+        if task.done():
+            self.speculation_stats["discarded"] += 1
+        else:
+            task.cancel()
+            self.speculation_stats["cancelled"] += 1
+        await asyncio.wait([task])
+        if not task.cancelled():
+            task.exception()  # 取走异常，避免 "never retrieved" 警告
+        # 取消前已完成的重试同样计费
+        self.speculation_stats["wasted_tokens"] += usage["total_tokens"]
+
+    async def _apply_plan(self, news: RawNewsItem, plan: Dict[str, Any], existing_urls: Set[str],
+                          created_today: Dict[str, str]):
+        """
+        写入阶段：按计划追加/新建 Saga 并落盘。
+        同一天内两条新闻各自要求新建同名 Saga 时，后到 (播出顺序靠后) 的一条改为追加到先建的那条。
+        """
+        action = plan.get("action", "ignore")
+        
+        saga_id: Optional[str] = None
+
+        if action == "ignore":
+            if plan.get("near_dup_of"):
+                self.near_dup_stats["ignored"] += 1
+                print(f"   ↳ 🗑️ [Ignore] 与已忽略的新闻近似重复 (相似度 {plan['similarity']:.2f})")
+                self.ignore_log.record(news, IgnoreDecisionLog.NEAR_DUP)
+            elif plan.get("pre_routed"):
+                print(f"   ↳ 🗑️ [Ignore] 本地预路由判定为琐事 (p={plan['p_ignore']:.2f})")
+                self.ignore_log.record(news, IgnoreDecisionLog.PRE_ROUTER)
+            elif plan.get("call_failed"):
+                # 不登记为已处理：断点日志中保持失败状态，下次运行重新路由
+                print("   ↳ ⚠️ [Ignore] 路由调用失败，暂按忽略处理")
+                self.ignore_log.record(news, IgnoreDecisionLog.CALL_FAILED)
+                return
+            else:
                 print("   ↳ 🗑️ [Ignore] 琐事/无关")
-                continue
-                
-            elif action == "append":
-                saga_id = decision.get("saga_id")
-                if saga_id and saga_id in self.sagas:
-                    print(f"   ↳ 🔗 [Append] 归入 Saga: {self.sagas[saga_id].title}")
-                    await self._handle_append(saga_id, news)
-                else:
-                    print(f"   ↳ ⚠️ [Error] AI 建议 Append 但 ID 无效，转为 Create")
-                    await self._handle_create(news)
-
-            elif action == "create":
-                print(f"   ↳ ✨ [Create] 发现新故事线")
-                await self._handle_create(news)
-
-            # [小优化] 处理完一条后，立即把它加入去重集合
-            # 防止同一天的新闻列表里有重复链接（虽然爬虫层已经去重了，但双重保险更好）
-            existing_urls.add(news.url)
-
-    async def _handle_create(self, news: RawNewsItem):
-        # 1. 生成元数据
-        meta = await self.intelligence.analyze_new_saga(news)
+                self.ignore_log.record(news, IgnoreDecisionLog.LLM)
+            # 预路由的判断不进入近似重复索引：否则一次误判会经由近似重复扩散到这条新闻的所有重播
+            if not plan.get("pre_routed"):
+                self._remember_decision(news, None)
+            self.journal.record(news.date, news.url, RunJournal.DONE, plan=plan)
+            return
+            
+        elif action == "append":
+            saga_id = plan["saga_id"]
+            if plan.get("near_dup_of"):
+                self.near_dup_stats["attached"] += 1
+                print(f"   ↳ 🧬 [Near-Dup] 与已收录新闻近似重复 (相似度 {plan['similarity']:.2f})，"
+                      f"直接归入 Saga: {self.sagas.header(saga_id).title}")
+            else:
+                print(f"   ↳ 🔗 [Append] 归入 Saga: {self.sagas.header(saga_id).title}")
+            await self._handle_append(saga_id, news, plan.get("event"))
+
+        elif action == "create":
+            if plan.get("invalid_append"):
+                print("   ↳ ⚠️ [Error] AI 建议 Append 但 ID 无效，转为 Create")
+            title_key = self._title_key(plan.get("meta", {}).get("title", news.title))
+            rerouted_id = None
+            if title_key not in created_today and self.concurrency > 1 and created_today:
+                rerouted_id = await self._reroute_after_same_day_create(news, created_today)
+            if title_key in created_today:
+                saga_id = created_today[title_key]
+                print(f"   ↳ 🔗 [Merge] 今日已新建同名故事线，改为追加: {self.sagas.header(saga_id).title}")
+                await self._handle_append(saga_id, news, plan.get("event"))
+            elif rerouted_id:
+                saga_id = rerouted_id
+                plan = {**plan, "action": "append", "saga_id": saga_id, "rerouted": True}
+                print(f"   ↳ 🔗 [Append] 重新路由后归入 Saga: {self.sagas.header(saga_id).title}")
+                await self._handle_append(saga_id, news, plan.get("event"))
+            else:
+                print("   ↳ ✨ [Create] 发现新故事线")
+                saga = await self._handle_create(news, plan.get("meta"), plan.get("event"))
+                created_today[title_key] = saga.id
+                saga_id = saga.id
+
+        elif action == "error":
+            self.ignore_log.record(news, IgnoreDecisionLog.ERROR)
+            return
+
+        elif action == "deferred":
+            print(f"   ↳ ⏸️ [Deferred] {plan.get('reason', 'LLM 服务不可用')}，留待下次重试")
+            self.ignore_log.record(news, IgnoreDecisionLog.DEFERRED)
+            self.deferred.append(news)
+            return
+
+        self._remember_decision(news, saga_id)
+        self.journal.record(news.date, news.url, RunJournal.DONE, plan=plan)
+
+        # [小优化] 处理完一条后，立即把它加入去重集合
+        # 防止同一天的新闻列表里有重复链接（虽然爬虫层已经去重了，但双重保险更好）
+        existing_urls.add(news.url)
+
+    async def _reroute_after_same_day_create(self, news: RawNewsItem, created_today: Dict[str, str]) -> Optional[str]:
+        """
+        并发模式下 LLM 阶段用的是运行开始时的检索索引，当天新建的故事线进不了候选 (同名的除外，见 created_today)。
+        落盘时若当天新建的故事线出现在最新候选中，用最新候选重新路由一次；
+        判定追加时返回目标 saga_id，仍判定新建 (或 LLM 不可用) 时返回 None。
+        """
+        same_day = set(created_today.values())
+        candidates = self._candidate_sagas(news, self.sagas.active_headers())
+        if not any(header.id in same_day for header in candidates):
+            return None
+        print("   ↳ 🔁 [Re-route] 当天新建的故事线进入候选，重新路由")
+        try:
+            decision = await self.intelligence.route_news(news, candidates)
+        except LLMUnavailableError:
+            return None
+        saga_id = decision.get("saga_id")
+        if decision.get("action") == "append" and saga_id in self.sagas:
+            return saga_id
+        return None
+
+    def _remember_decision(self, news: RawNewsItem, saga_id: Optional[str]):
+        """把本条新闻的处理结果登记到近似重复索引 (saga_id 为 None 表示忽略)"""
+        if self.near_dup is None or news.url in self.near_dup:
+            return
+        signature = self.near_dup.signature(news.content)
+        if signature is not None:
+            self.near_dup.add(news.url, saga_id, signature)
+
+    @staticmethod
+    def _title_key(title: str) -> str:
+        """用于判断同名 Saga 的归一化标题 (去空白、统一大小写)"""
+        return "".join(title.split()).lower()
+
+    async def _handle_create(self, news: RawNewsItem, meta: Optional[Dict] = None,
+                             event_data: Optional[Dict] = None) -> Saga:
+        # 1. 生成元数据 (并发模式下已在 LLM 阶段提前生成)
+        if meta is None:
+            meta = await self.intelligence.analyze_new_saga(news)
         
         # 2. 生成第一个事件
-        event_data = await self.intelligence.summarize_event(news)
+        if event_data is None:
+            event_data = await self.intelligence.summarize_event(news)
         
         # 3. 组装 Saga 对象
         new_saga_id = f"saga_{int(os.times().system)}_{abs(hash(news.title))}"[:20] # 简单 ID 生成
@@ -118,15 +641,16 @@ class SagaManager:
         )
 
         # 4. 保存
-        self.sagas[new_saga_id] = new_saga
         self._save_saga(new_saga)
+        self.url_index.add(news.url, new_saga_id, 0)
+        self.saga_index.add(self.sagas.header(new_saga_id))
         print(f"   -> ✅ 新故事 '{new_saga.title}' 已创建并保存")
+        return new_saga
 
-    async def _handle_append(self, saga_id: str, news: RawNewsItem):
-        saga = self.sagas[saga_id]
-        
-        # 1. 生成事件
-        event_data = await self.intelligence.summarize_event(news)
+    async def _handle_append(self, saga_id: str, news: RawNewsItem, event_data: Optional[Dict] = None):
+        # 1. 生成事件 (并发模式下已在 LLM 阶段提前生成)
+        if event_data is None:
+            event_data = await self.intelligence.summarize_event(news)
         
         safe_importance = self._safe_parse_importance(event_data.get("importance", 1))
 
@@ -139,19 +663,16 @@ class SagaManager:
             importance=safe_importance
         )
         
-        # 2. 更新 Saga 状态
-        saga.events.append(new_event)
-        saga.last_updated = news.date
+        # 2. 更新 Saga 状态并保存 (只写入新增事件)
         # (可选: 更新 context_summary，这里暂时略过，保留原 summary)
-        
-        # 3. 保存
-        self._save_saga(saga)
-        print(f"   -> ✅ 事件已追加到 '{saga.title}'")
+        event_index = self.sagas.append(saga_id, new_event, news.date)
+        self.url_index.add(news.url, saga_id, event_index)
+        header = self.sagas.header(saga_id)
+        self.saga_index.add(header)
+        print(f"   -> ✅ 事件已追加到 '{header.title}'")
 
     def _save_saga(self, saga: Saga):
-        file_path = self.db_dir / f"{saga.id}.json"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(saga.model_dump_json(indent=2))
+        self.sagas.add(saga)
 
     def _safe_parse_importance(self, val) -> int:
         """清洗 importance 字段，确保是 int"""
@@ -0,0 +1,155 @@
+# src/near_dup.py
+import json
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .schema import Saga
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_NON_WORD = re.compile(r'\W+')
+
+class NearDuplicateIndex:
+    """
+    新闻正文的近似重复索引 (MinHash + LSH 分桶)，用于识别换了 URL 的重播/轻度改写稿件。
+
+    - 正文去掉空白与标点后切成字符 shingle，MinHash 签名估计 Jaccard 相似度
+    - 签名按 bands 切段分桶，只和同桶的候选比较，不做两两比对
+    - 每条记录: 源 URL -> 当时的处理结果 (saga_id；None 表示被忽略)
+    - 持久化为追加写入的 JSONL，重启后重放即可恢复；path 为 None 时只保存在内存中
+    """
+    def __init__(self, path: Optional[str], num_perm: int = 128, bands: int = 16, threshold: float = 0.85,
+                 shingle_size: int = 5, min_length: int = 50):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.path = Path(path) if path else None
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        # 固定种子，保证签名跨进程可复现
+        rng = np.random.default_rng(20260101)
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._entries: Dict[str, Tuple[Optional[str], np.ndarray]] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def empty_like(self) -> "NearDuplicateIndex":
+        """参数相同、只在内存中的空索引 (签名可互相比较)，用于本次运行内的临时判重"""
+        return NearDuplicateIndex(None, num_perm=self.num_perm, bands=self.bands, threshold=self.threshold,
+                                  shingle_size=self.shingle_size, min_length=self.min_length)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """返回 MinHash 签名；正文过短 (如快讯子条目) 时返回 None，不参与判重"""
+        normalized = _NON_WORD.sub('', text)
+        if len(normalized) < self.min_length:
+            return None
+        size = self.shingle_size
+        shingles = {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        # a,b < 2^32 且 hash < 2^32，乘积不会溢出 uint64
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _insert(self, url: str, saga_id: Optional[str], signature: np.ndarray):
+        self._entries[url] = (saga_id, signature)
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(key, set()).add(url)
+
+    def add(self, url: str, saga_id: Optional[str], signature: np.ndarray):
+        """登记一条已处理新闻并追加写盘；同一 URL 重复登记时忽略"""
+        if url in self._entries:
+            return
+        self._insert(url, saga_id, signature)
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"url": url, "saga_id": saga_id, "sig": signature.tobytes().hex()}) + "\n")
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[str, Optional[str], float]]:
+        """返回相似度最高且不低于阈值的 (URL, saga_id, 相似度)，没有则 None"""
+        candidates: Set[str] = set()
+        for band, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(key, ()))
+        best = None
+        for url in sorted(candidates):
+            saga_id, other = self._entries[url]
+            similarity = float(np.mean(signature == other))
+            if similarity >= self.threshold and (best is None or similarity > best[2]):
+                best = (url, saga_id, similarity)
+        return best
+
+    def load(self) -> bool:
+        """重放持久化文件；文件不存在时返回 False"""
+        if self.path is None or not self.path.exists():
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    signature = np.frombuffer(bytes.fromhex(record["sig"]), dtype=np.uint32)
+                except (ValueError, KeyError):
+                    # 中断写入留下的残行直接跳过
+                    continue
+                if len(signature) == self.num_perm:
+                    self._insert(record["url"], record.get("saga_id"), signature)
+        return True
+
+    def rebuild(self, sagas: Iterable[Saga], archive_dir: str = "data/archive",
+                exclude: Iterable[str] = ()) -> int:
+        """
+        从原始档案与现有故事线重建索引：进入故事线的条目记录其 saga_id，
+        不晚于最新事件日期却未进入任何故事线的条目记为忽略；
+        exclude 中的 URL (未经 LLM 判断，如预路由直接忽略的) 不记为忽略。
+        """
+        exclude = set(exclude)
+        url_to_saga: Dict[str, str] = {}
+        last_processed = ""
+        for saga in sagas:
+            for event in saga.events:
+                if event.source_url:
+                    url_to_saga[event.source_url] = saga.id
+                last_processed = max(last_processed, event.date)
+
+        self._entries.clear()
+        self._buckets = [{} for _ in range(self.bands)]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for file_path in sorted(Path(archive_dir).glob("*/*_raw.json")):
+                with open(file_path, 'r', encoding='utf-8') as archive_file:
+                    data = json.load(archive_file)
+                if data.get("date", "") > last_processed:
+                    continue
+                for item in data.get("news_items", []):
+                    signature = self.signature(item.get("content", ""))
+                    if signature is None or item["url"] in self._entries:
+                        continue
+                    saga_id = url_to_saga.get(item["url"])
+                    if saga_id is None and item["url"] in exclude:
+                        continue
+                    self._insert(item["url"], saga_id, signature)
+                    f.write(json.dumps({"url": item["url"], "saga_id": saga_id,
+                                        "sig": signature.tobytes().hex()}) + "\n")
+        tmp_path.replace(self.path)
+        return len(self._entries)
@@ -0,0 +1,275 @@
+# src/pre_router.py
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .saga_index import tokenize
+from .saga_store import open_saga_store, index_dir_for
+from .saga_catalog import open_cold_store, merge_cold
+from .schema import RawNewsItem
+
+# 标签: 1 = 曾被忽略 (没有进入任何 Saga)，0 = 曾被路由
+IGNORED, ROUTED = 1, 0
+
+def _features(title: str, content: str) -> Set[str]:
+    """标题与正文开头的字符二元组，标题特征单独加前缀；按出现与否计 (一篇文档内不重复计数)"""
+    features = {f"t:{token}" for token in tokenize(title)}
+    features.update(tokenize(content[:300]))
+    return features
+
+def ignore_log_path(sagas_dir: str) -> Path:
+    """未入故事线新闻的判定来源日志，与故事线索引放在一起 (随 data/ 入库)"""
+    return index_dir_for(sagas_dir) / "ignore_decisions.jsonl"
+
+def undecided_urls(sagas_dir: str = "data/sagas") -> Set[str]:
+    """
+    未经 LLM 判断就没有进入故事线的 URL (预路由直接忽略、沿用近似重复结果、路由调用失败、延后或出错)。
+    这些条目不能当作"已忽略"的样本，否则分类器会从自己的判断里学习，误判不断自我强化。
+    """
+    return IgnoreDecisionLog(str(ignore_log_path(sagas_dir))).undecided_urls()
+
+def build_training_set(archive_dir: str = "data/archive", sagas_dir: str = "data/sagas",
+                       exclude: Optional[Set[str]] = None) -> List[Tuple[str, str, int]]:
+    """
+    从历史数据构造训练样本 (标题, 正文, 标签)。
+    归档中 URL 出现在任一 Saga 事件 source_url 里的记为"已路由"，否则记为"已忽略"；
+    未进入故事线且未经 LLM 判断的条目 (exclude，默认取 undecided_urls(sagas_dir)) 不参与训练。
+    只取不晚于 Saga 最新事件日期的归档，避免把尚未处理的日子误标为忽略。
+    """
+    if exclude is None:
+        exclude = undecided_urls(sagas_dir)
+    routed_urls: Set[str] = set()
+    last_processed = ""
+    store = open_saga_store(sagas_dir)
+    cold = open_cold_store(sagas_dir, store)
+    for saga in store.load_all().values():
+        for event in merge_cold(saga, cold).events:
+            if event.source_url:
+                routed_urls.add(event.source_url)
+            last_processed = max(last_processed, event.date)
+
+    samples = []
+    for file_path in sorted(Path(archive_dir).glob("*/*_raw.json")):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("date", "") > last_processed:
+            continue
+        for item in data.get("news_items", []):
+            label = ROUTED if item["url"] in routed_urls else IGNORED
+            if label == IGNORED and item["url"] in exclude:
+                continue
+            samples.append((item["title"], item.get("content", ""), label))
+    return samples
+
+def _sigmoid(x: float) -> float:
+    if x < -700:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-x))
+
+def _fit_platt(scores: List[Tuple[float, int]], iterations: int = 50) -> Tuple[float, float]:
+    """Platt 标定：在留出分数上拟合 P(忽略) = sigmoid(a * score + b) (牛顿法，带标签平滑)"""
+    positives = sum(label for _, label in scores)
+    negatives = len(scores) - positives
+    hi, lo = (positives + 1) / (positives + 2), 1 / (negatives + 2)
+    targets = [(score, hi if label == IGNORED else lo) for score, label in scores]
+    a, b = 1.0, 0.0
+    for _ in range(iterations):
+        g_a = g_b = h_aa = h_ab = h_bb = 0.0
+        for score, target in targets:
+            p = _sigmoid(a * score + b)
+            d = p - target
+            w = max(p * (1 - p), 1e-12)
+            g_a += d * score
+            g_b += d
+            h_aa += w * score * score
+            h_ab += w * score
+            h_bb += w
+        det = h_aa * h_bb - h_ab * h_ab
+        if abs(det) < 1e-12:
+            break
+        step_a = (h_bb * g_a - h_ab * g_b) / det
+        step_b = (h_aa * g_b - h_ab * g_a) / det
+        a, b = a - step_a, b - step_b
+        if abs(step_a) < 1e-9 and abs(step_b) < 1e-9:
+            break
+    return a, b
+
+def _folds(samples: List, folds: int, seed: int):
+    shuffled = list(samples)
+    random.Random(seed).shuffle(shuffled)
+    for fold in range(folds):
+        train = [s for i, s in enumerate(shuffled) if i % folds != fold]
+        test = [s for i, s in enumerate(shuffled) if i % folds == fold]
+        yield train, test
+
+class PreRouter:
+    """
+    路由前的本地 CPU 分类器 (二值化特征的多项式朴素贝叶斯)，给出新闻"会被忽略"的概率。
+    原始打分取每个特征的平均对数似然比 (不随文本长度膨胀)，再用交叉验证的留出分数
+    做 Platt 标定，使阈值可以按概率理解。
+    概率不低于阈值的条目直接判为 ignore，省掉一次路由调用；其余照常交给 LLM。
+    """
+    def __init__(self, class_counts: Optional[Dict[int, int]] = None,
+                 feature_counts: Optional[Dict[int, Dict[str, int]]] = None, alpha: float = 1.0,
+                 calibration: Tuple[float, float] = (1.0, 0.0)):
+        self.alpha = alpha
+        self.class_counts = class_counts or {IGNORED: 0, ROUTED: 0}
+        self.feature_counts = feature_counts or {IGNORED: {}, ROUTED: {}}
+        self.calibration = calibration
+        self._totals = {label: sum(counts.values()) for label, counts in self.feature_counts.items()}
+        self._vocab_size = len(set(self.feature_counts[IGNORED]) | set(self.feature_counts[ROUTED]))
+
+    @classmethod
+    def _fit_counts(cls, samples: Iterable[Tuple[str, str, int]], alpha: float) -> "PreRouter":
+        class_counts = {IGNORED: 0, ROUTED: 0}
+        feature_counts = {IGNORED: Counter(), ROUTED: Counter()}
+        for title, content, label in samples:
+            class_counts[label] += 1
+            feature_counts[label].update(_features(title, content))
+        return cls(class_counts, {label: dict(counts) for label, counts in feature_counts.items()}, alpha)
+
+    @classmethod
+    def train(cls, samples: List[Tuple[str, str, int]], alpha: float = 1.0,
+              folds: int = 5, seed: int = 0) -> "PreRouter":
+        """全量样本拟合计数；标定参数来自 K 折留出分数，避免用训练集分数过度自信"""
+        held_out = []
+        for train, test in _folds(samples, folds, seed):
+            fold_model = cls._fit_counts(train, alpha)
+            if fold_model.trained:
+                held_out.extend((fold_model.score(title, content), label) for title, content, label in test)
+        model = cls._fit_counts(samples, alpha)
+        if held_out and 0 < sum(label for _, label in held_out) < len(held_out):
+            model.calibration = _fit_platt(held_out)
+        return model
+
+    @property
+    def trained(self) -> bool:
+        return self.class_counts[IGNORED] > 0 and self.class_counts[ROUTED] > 0
+
+    def score(self, title: str, content: str) -> float:
+        """平均对数似然比 log P(特征|忽略) - log P(特征|路由)，越大越像会被忽略的新闻"""
+        features = _features(title, content)
+        if not features:
+            return 0.0
+        llr = 0.0
+        for feature in features:
+            for label, sign in ((IGNORED, 1), (ROUTED, -1)):
+                denominator = self._totals[label] + self.alpha * self._vocab_size
+                llr += sign * math.log((self.feature_counts[label].get(feature, 0) + self.alpha) / denominator)
+        return llr / len(features)
+
+    def predict_ignore(self, title: str, content: str) -> float:
+        """返回标定后的 P(忽略 | 新闻)；未训练时返回 0 (全部交给 LLM)"""
+        if not self.trained:
+            return 0.0
+        a, b = self.calibration
+        return _sigmoid(a * self.score(title, content) + b)
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "alpha": self.alpha,
+            "calibration": list(self.calibration),
+            "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "class_counts": {str(label): count for label, count in self.class_counts.items()},
+            "feature_counts": {str(label): counts for label, counts in self.feature_counts.items()},
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PreRouter"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        return cls(
+            {int(label): count for label, count in payload["class_counts"].items()},
+            {int(label): counts for label, counts in payload["feature_counts"].items()},
+            payload.get("alpha", 1.0),
+            tuple(payload.get("calibration", (1.0, 0.0)))
+        )
+
+def cross_validate(samples: List[Tuple[str, str, int]], thresholds: List[float],
+                   folds: int = 5, seed: int = 0) -> List[Dict[str, float]]:
+    """
+    K 折交叉验证 (每折内部再做标定)，按阈值统计:
+    skip_rate = 被直接忽略的比例，precision = 其中确实该忽略的比例，
+    lost = 本该路由却被跳过的条数 (误杀)。
+    """
+    scored = []
+    for train, test in _folds(samples, folds, seed):
+        model = PreRouter.train(train, seed=seed + 1)
+        scored.extend((model.predict_ignore(title, content), label) for title, content, label in test)
+
+    rows = []
+    for threshold in thresholds:
+        skipped = [label for prob, label in scored if prob >= threshold]
+        correct = sum(1 for label in skipped if label == IGNORED)
+        rows.append({
+            "threshold": threshold,
+            "skip_rate": len(skipped) / max(1, len(scored)),
+            "precision": correct / len(skipped) if skipped else 1.0,
+            "lost": len(skipped) - correct,
+        })
+    return rows
+
+class IgnoreDecisionLog:
+    """
+    未进入故事线的新闻是如何判定的 (JSONL，每次判定一行，同一 URL 以最后一条为准)。
+    与可重建的索引不同，这份记录无法从故事线还原，因此和故事线数据一起入库，不随缓存/日志清理。
+    只有 source=llm 的条目是 LLM 真正判定的忽略，可作为"已忽略"训练样本。
+    """
+    LLM = "llm"
+    PRE_ROUTER = "pre_router"
+    NEAR_DUP = "near_dup"
+    CALL_FAILED = "call_failed"
+    DEFERRED = "deferred"
+    ERROR = "error"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def record(self, news: RawNewsItem, source: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"date": news.date, "url": news.url, "source": source}, ensure_ascii=False) + "\n")
+
+    def undecided_urls(self) -> Set[str]:
+        latest: Dict[str, str] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        latest[entry["url"]] = entry["source"]
+                    except (ValueError, KeyError):
+                        # 中断写入留下的残行直接跳过
+                        continue
+        return {url for url, source in latest.items() if source != self.LLM}
+
+class PreRouterAudit:
+    """预路由审计日志 (JSONL，每条新闻一行)，用于事后核对阈值是否误杀"""
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def record(self, news: RawNewsItem, p_ignore: float, threshold: float, skipped: bool):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "date": news.date,
+            "url": news.url,
+            "title": news.title,
+            "p_ignore": round(p_ignore, 4),
+            "threshold": threshold,
+            "skipped": skipped,
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
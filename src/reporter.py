@@ -1,30 +1,50 @@
-import os
-import json
 from pathlib import Path
 from typing import List, Optional, Dict
 
 # 引入数据结构
 from .schema import DailyBriefing, NewsType, Saga, SagaStatus, EventNode
+from .saga_store import SagaStore, open_saga_store, index_dir_for
+from .url_index import UrlIndex
+from .saga_catalog import open_cold_store, merge_cold
 
 class SagaReporter:
-    def __init__(self, saga_db_dir: str = "data/sagas"):
+    def __init__(self, saga_db_dir: str = "data/sagas", store: Optional[SagaStore] = None,
+                 url_index: Optional[UrlIndex] = None):
+        """store / url_index 可直接复用 SagaManager 的实例，省去重新加载"""
         self.saga_db_dir = Path(saga_db_dir)
+        self.store = store or open_saga_store(saga_db_dir)
+        self.cold = open_cold_store(saga_db_dir, self.store)
+        self.url_index = url_index
     
     def _load_all_sagas(self) -> List[Saga]:
-        """从磁盘读取所有 Saga 状态文件"""
-        sagas = []
-        if not self.saga_db_dir.exists():
-            return sagas
-            
-        for file_path in self.saga_db_dir.glob("*.json"):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    sagas.append(Saga(**data))
-            except Exception as e:
-                print(f"⚠️ 加载 Saga 失败 {file_path}: {e}")
-        
-        return sagas
+        """读取所有 Saga (含冷存储中的早期事件)"""
+        return [merge_cold(saga, self.cold) for saga in self.store.load_all().values()]
+
+    def _get_url_index(self) -> UrlIndex:
+        if self.url_index is None:
+            self.url_index = UrlIndex(str(index_dir_for(str(self.saga_db_dir)) / "url_index.jsonl"))
+            fingerprint = self.store.fingerprint()
+            if not self.url_index.load(fingerprint):
+                count = self.url_index.rebuild(self._load_all_sagas(), fingerprint)
+                print(f"🗂️ URL 索引已从故事线重建: {count} 条")
+        return self.url_index
+
+    def _url_to_saga_map(self, briefing: DailyBriefing) -> Dict[str, Saga]:
+        """按 URL 索引只读取与当日新闻关联的故事线"""
+        url_index = self._get_url_index()
+        sagas: Dict[str, Optional[Saga]] = {}
+        mapping: Dict[str, Saga] = {}
+        for item in briefing.news_items:
+            ref = url_index.get(item.url)
+            if ref is None:
+                continue
+            saga_id = ref[0]
+            if saga_id not in sagas:
+                saga = self.store.get(saga_id)
+                sagas[saga_id] = merge_cold(saga, self.cold) if saga else None
+            if sagas[saga_id] is not None:
+                mapping[item.url] = sagas[saga_id]
+        return mapping
 
     def generate_readme(self, file_path: str = "README.md", briefing: Optional[DailyBriefing] = None):
         """
@@ -39,12 +59,7 @@ class SagaReporter:
             return
 
         # 1. 预处理
-        sagas = self._load_all_sagas()
-        url_to_saga_map: Dict[str, Saga] = {}
-        for saga in sagas:
-            for event in saga.events:
-                if event.source_url:
-                    url_to_saga_map[event.source_url] = saga
+        url_to_saga_map = self._url_to_saga_map(briefing)
 
         # 2. 构建 Markdown 内容
         md_lines = []
@@ -113,12 +128,7 @@ class SagaReporter:
             return "<h1>今日无数据</h1>"
 
         # 1. 加载 Saga 索引
-        sagas = self._load_all_sagas()
-        url_to_saga_map: Dict[str, Saga] = {}
-        for saga in sagas:
-            for event in saga.events:
-                if event.source_url:
-                    url_to_saga_map[event.source_url] = saga
+        url_to_saga_map = self._url_to_saga_map(briefing)
 
         # HTML 模板
         html_template = """
@@ -0,0 +1,90 @@
+# src/run_journal.py
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+class RunJournal:
+    """
+    按日期记录每条新闻处理进度的断点日志 ({journal_dir}/{YYYYMMDD}.jsonl)，进程中途被杀后重跑可续上。
+
+    - LLM 阶段完成即记 PLANNED 并保存完整计划 (路由决策、摘要、新建元数据)，重跑时直接复用，不再调用 LLM
+    - 落盘后记 DONE；忽略的新闻不会进入 URL 索引，重跑靠这里跳过
+    - LLM 不可用记 DEFERRED，重跑时重新处理；处理异常记 FAILED 并累计失败次数，
+      重跑时继续重试，连续失败达到上限后跳过 (retry_failed 时不受上限限制)
+    - 追加写入，同一 URL 以最后一条记录为准；journal_dir 为空时不记录
+    """
+    PLANNED = "planned"
+    DONE = "done"
+    DEFERRED = "deferred"
+    FAILED = "failed"
+
+    def __init__(self, journal_dir: Optional[str], keep_days: int = 14):
+        self.journal_dir = Path(journal_dir) if journal_dir else None
+        self.keep_days = keep_days
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pruned = False
+
+    def _path(self, date_str: str) -> Path:
+        return self.journal_dir / f"{date_str}.jsonl"
+
+    def _entries_for(self, date_str: str) -> Dict[str, Dict[str, Any]]:
+        if date_str not in self._entries:
+            self._entries[date_str] = self._read(date_str) if self.journal_dir else {}
+            if self.journal_dir and not self._pruned:
+                self._prune(date_str)
+        return self._entries[date_str]
+
+    def _read(self, date_str: str) -> Dict[str, Dict[str, Any]]:
+        path = self._path(date_str)
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not path.exists():
+            return entries
+        valid_end = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    if line.strip():
+                        record = json.loads(line)
+                        entries[record["url"]] = record
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_end += len(line)
+        if valid_end < path.stat().st_size:
+            # 进程被杀时留下的残行：截掉，避免后续追加接在残行上
+            print(f"⚠️ 断点日志末尾有不完整记录，已截断: {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+        return entries
+
+    def _prune(self, date_str: str):
+        """删除比当前日期早 keep_days 天以上的日志"""
+        self._pruned = True
+        if self.keep_days <= 0 or not self.journal_dir.exists():
+            return
+        cutoff = (datetime.strptime(date_str, "%Y%m%d") - timedelta(days=self.keep_days)).strftime("%Y%m%d")
+        for path in self.journal_dir.glob("*.jsonl"):
+            if path.stem < cutoff:
+                path.unlink(missing_ok=True)
+
+    def get(self, date_str: str, url: str) -> Optional[Dict[str, Any]]:
+        return self._entries_for(date_str).get(url)
+
+    def failed_attempts(self, date_str: str, url: str) -> int:
+        """该条目连续处理失败的次数"""
+        entry = self.get(date_str, url)
+        return entry.get("attempts", 1) if entry and entry["status"] == self.FAILED else 0
+
+    def record_failure(self, date_str: str, url: str, error: str):
+        self.record(date_str, url, self.FAILED, error=error, attempts=self.failed_attempts(date_str, url) + 1)
+
+    def record(self, date_str: str, url: str, status: str, **extra):
+        record = {"url": url, "status": status, "updated_at": datetime.now().isoformat(timespec="seconds"), **extra}
+        self._entries_for(date_str)[url] = record
+        if not self.journal_dir:
+            return
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        with open(self._path(date_str), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,229 @@
+# src/saga_catalog.py
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .config import SAGA_CACHE_MB
+from .saga_store import SagaStore, SqliteSagaStore, JsonSagaStore, sqlite_path_for
+from .schema import Saga, SagaHeader, SagaStatus, EventNode
+
+def cold_dir_for(db_dir: str) -> Path:
+    """冷存储目录: data/sagas -> data/sagas_cold (SQLite 后端为 data/sagas_cold.sqlite)"""
+    db_dir = Path(db_dir)
+    return db_dir.with_name(f"{db_dir.name}_cold")
+
+def open_cold_store(db_dir: str, store: SagaStore, create: bool = False) -> Optional[SagaStore]:
+    """与热存储同一后端的冷存储；尚不存在且 create=False 时返回 None"""
+    cold_dir = cold_dir_for(db_dir)
+    if isinstance(store, SqliteSagaStore):
+        path = sqlite_path_for(str(cold_dir))
+        return SqliteSagaStore(str(path)) if create or path.exists() else None
+    return JsonSagaStore(str(cold_dir)) if create or cold_dir.exists() else None
+
+def merge_cold(saga: Saga, cold: Optional[SagaStore]) -> Saga:
+    """拼出完整历史：冷存储中的早期事件 + 热存储中的事件"""
+    archived = cold.get(saga.id) if cold else None
+    if archived is None or not archived.events:
+        return saga
+    # 归档中途崩溃时同一事件可能冷热两边都有，以热存储为准
+    hot_keys = {(e.date, e.source_url, e.title) for e in saga.events}
+    early = [e for e in archived.events if (e.date, e.source_url, e.title) not in hot_keys]
+    return saga.model_copy(update={"events": early + saga.events})
+
+class SagaCatalog:
+    """
+    故事线的按需加载层。
+    - 头信息目录 (SagaHeader) 常驻内存，路由、检索、状态过滤只用它；
+      目录缓存在 {index_dir}/catalog.json，存储指纹一致时启动不必读任何事件
+    - 完整 Saga (热存储中的事件) 首次访问时从存储载入，放入按近似字节数计的 LRU，超出预算即淘汰
+    - 冷存储存放早于一定天数的事件 (archive_cold)，只在需要完整历史时读取
+    """
+    def __init__(self, store: SagaStore, cache_path: str, cold: Optional[SagaStore] = None,
+                 memory_budget_mb: float = SAGA_CACHE_MB, recent: int = 5):
+        self.store = store
+        self.cold = cold
+        self.cache_path = Path(cache_path)
+        self.budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self.recent = recent
+        self._headers: Dict[str, SagaHeader] = {}
+        self._pages: "OrderedDict[str, Saga]" = OrderedDict()
+        self._page_bytes: Dict[str, int] = {}
+        self.resident_bytes = 0
+        self.stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._headers)
+
+    def __contains__(self, saga_id: str) -> bool:
+        return saga_id in self._headers
+
+    def __getitem__(self, saga_id: str) -> Saga:
+        saga = self.get(saga_id)
+        if saga is None:
+            raise KeyError(saga_id)
+        return saga
+
+    def header(self, saga_id: str) -> SagaHeader:
+        return self._headers[saga_id]
+
+    def headers(self) -> List[SagaHeader]:
+        return list(self._headers.values())
+
+    def active_headers(self) -> List[SagaHeader]:
+        return [h for h in self._headers.values() if h.status == SagaStatus.ACTIVE]
+
+    def fingerprint(self) -> str:
+        cold = self.cold.fingerprint() if self.cold else "-"
+        return f"{self.store.fingerprint()}|{cold}"
+
+    # --- 头信息目录 ---
+
+    def load(self) -> bool:
+        """载入头信息目录；缓存缺失或与存储不一致时从存储重建，返回是否命中缓存"""
+        fingerprint = self.fingerprint()
+        if self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                if cached.get("store") == fingerprint and cached.get("recent") == self.recent:
+                    self._headers = {h["id"]: SagaHeader(**h) for h in cached["headers"]}
+                    return True
+            except (ValueError, KeyError, TypeError):
+                pass
+        self._headers = self.store.load_headers(self.recent)
+        if self.cold:
+            for saga_id, cold_header in self.cold.load_headers(0).items():
+                if saga_id in self._headers:
+                    self._headers[saga_id].cold_count = cold_header.event_count
+        self.flush()
+        return False
+
+    def flush(self):
+        """把头信息目录连同当前存储指纹写盘 (存储写入完成后调用)"""
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"store": self.fingerprint(), "recent": self.recent,
+                       "headers": [h.model_dump(mode="json") for h in self._headers.values()]},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    # --- 事件页 (LRU) ---
+
+    @staticmethod
+    def _estimate_bytes(saga: Saga) -> int:
+        # 近似值：字符串内容长度 + 每个对象的固定开销
+        size = 400 + len(saga.title) + len(saga.context_summary)
+        for e in saga.events:
+            size += 300 + len(e.title) + len(e.summary) + len(e.source_url)
+        return size
+
+    def _admit(self, saga: Saga):
+        self._drop(saga.id)
+        size = self._estimate_bytes(saga)
+        self._pages[saga.id] = saga
+        self._page_bytes[saga.id] = size
+        self.resident_bytes += size
+        # 至少保留刚载入的这一页
+        while self.resident_bytes > self.budget_bytes and len(self._pages) > 1:
+            victim, _ = self._pages.popitem(last=False)
+            self.resident_bytes -= self._page_bytes.pop(victim)
+            self.stats["evictions"] += 1
+
+    def _drop(self, saga_id: str):
+        if self._pages.pop(saga_id, None) is not None:
+            self.resident_bytes -= self._page_bytes.pop(saga_id)
+
+    def get(self, saga_id: str) -> Optional[Saga]:
+        """热存储中的完整 Saga (不含冷事件)"""
+        if saga_id not in self._headers:
+            return None
+        saga = self._pages.get(saga_id)
+        if saga is not None:
+            self._pages.move_to_end(saga_id)
+            self.stats["hits"] += 1
+            return saga
+        saga = self.store.get(saga_id)
+        if saga is None:
+            return None
+        self.stats["loads"] += 1
+        self._admit(saga)
+        return saga
+
+    def full_history(self, saga_id: str) -> Optional[Saga]:
+        saga = self.get(saga_id)
+        return merge_cold(saga, self.cold) if saga else None
+
+    def iter_full_history(self) -> Iterator[Saga]:
+        """逐个产出完整历史 (重建索引等一次性任务用，不进入 LRU)"""
+        for saga in self.store.load_all().values():
+            yield merge_cold(saga, self.cold)
+
+    # --- 写入 ---
+
+    def add(self, saga: Saga):
+        """新建 (或整体覆盖) 一个故事线"""
+        self.store.save(saga)
+        cold_count = self._headers[saga.id].cold_count if saga.id in self._headers else 0
+        self._headers[saga.id] = SagaHeader.from_saga(saga, self.recent, cold_count)
+        self._admit(saga)
+
+    def append(self, saga_id: str, event: EventNode, last_updated: str) -> int:
+        """追加事件并持久化增量，返回该事件在完整历史中的下标"""
+        saga = self[saga_id]
+        saga.events.append(event)
+        saga.last_updated = last_updated
+        self.store.append_event(saga, event)
+        header = self._headers[saga_id]
+        header.event_count = len(saga.events)
+        header.last_updated = last_updated
+        if not header.oldest_hot_date:
+            header.oldest_hot_date = saga.events[0].date
+        if self.recent:
+            header.recent_titles = (header.recent_titles + [event.title])[-self.recent:]
+        self._admit(saga)
+        return header.cold_count + len(saga.events) - 1
+
+    # --- 冷存储 ---
+
+    def archive_cold(self, cutoff_date: str, db_dir: str) -> int:
+        """
+        把早于 cutoff_date 的事件移入冷存储，每个故事线至少留下最近一个事件在热存储。
+        返回移动的事件数；完整历史 (冷 + 热) 与移动前一致。
+        只读取头信息中最早热事件早于 cutoff_date 的故事线 (日期未知的也读取)，其余无需加载。
+        """
+        candidates = [h.id for h in self._headers.values()
+                      if h.event_count > 1 and h.oldest_hot_date < cutoff_date]
+        moved = 0
+        for saga_id in candidates:
+            saga = self.store.get(saga_id)
+            if saga is None:
+                continue
+            keep_from = next((i for i, e in enumerate(saga.events) if e.date >= cutoff_date), len(saga.events))
+            keep_from = min(keep_from, len(saga.events) - 1)
+            if keep_from <= 0:
+                continue
+            if self.cold is None:
+                self.cold = open_cold_store(db_dir, self.store, create=True)
+            archived = self.cold.get(saga_id)
+            old_events = saga.events[:keep_from]
+            if archived is None:
+                archived = saga.model_copy(update={"events": []})
+            # 先写冷存储再缩减热存储：中途崩溃时热存储仍是完整的，重跑会跳过已归档的事件
+            archived_keys = {(e.date, e.source_url, e.title) for e in archived.events}
+            new_cold = [e for e in old_events if (e.date, e.source_url, e.title) not in archived_keys]
+            archived = archived.model_copy(update={"events": archived.events + new_cold})
+            self.cold.save(archived)
+            saga.events = saga.events[keep_from:]
+            self.store.save(saga)
+            header = self._headers[saga_id]
+            header.event_count = len(saga.events)
+            header.cold_count = len(archived.events)
+            header.oldest_hot_date = saga.events[0].date
+            self._drop(saga_id)
+            moved += len(old_events)
+        if moved:
+            self.cold.compact()
+        return moved
@@ -0,0 +1,106 @@
+# src/saga_index.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from .schema import SagaHeader, SagaStatus
+
+# 中文按字符二元组切分，英文/数字按整词切分
+_CJK_RUN = re.compile(r'[一-鿿]+')
+_WORD_RUN = re.compile(r'[A-Za-z0-9]+')
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    tokens.extend(word.lower() for word in _WORD_RUN.findall(text))
+    return tokens
+
+class SagaRetrievalIndex:
+    """
+    活跃 Saga 的本地候选检索索引 (BM25，倒排表，无外部服务)
+    文档 = 标题 + context_summary + 最近若干事件标题。
+    新建/追加事件时按单个 Saga 增量更新，路由时只把 top-K 候选交给 LLM，
+    使 prompt 长度不随故事线总数增长。
+    """
+    def __init__(self, recent_events: int = 5, k1: float = 1.5, b: float = 0.75):
+        self.recent_events = recent_events
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}  # 词 -> {saga_id: 词频}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._last_updated: Dict[str, str] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def _document(self, saga: SagaHeader) -> str:
+        recent_titles = saga.recent_titles[-self.recent_events:] if self.recent_events else []
+        return " ".join([saga.title, saga.context_summary, *recent_titles])
+
+    def add(self, saga: SagaHeader):
+        """新增或重建单个 Saga 的索引；非 ACTIVE 状态的 Saga 会被移出索引"""
+        self.remove(saga.id)
+        if saga.status != SagaStatus.ACTIVE:
+            return
+        terms = Counter(tokenize(self._document(saga)))
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[saga.id] = tf
+        length = sum(terms.values())
+        self._doc_terms[saga.id] = terms
+        self._doc_len[saga.id] = length
+        self._last_updated[saga.id] = saga.last_updated
+        self._total_len += length
+
+    def remove(self, saga_id: str):
+        terms = self._doc_terms.pop(saga_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(saga_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(saga_id)
+        self._last_updated.pop(saga_id, None)
+
+    def search(self, text: str, k: int) -> List[str]:
+        """
+        返回与文本最相关的最多 k 个 Saga ID (按 BM25 分数降序)。
+        命中不足 k 个时，用最近更新的 Saga 补齐，保证新故事线有机会被追加。
+        """
+        doc_count = len(self._doc_terms)
+        if doc_count == 0 or k <= 0:
+            return []
+        avg_len = self._total_len / doc_count
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for saga_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[saga_id] / avg_len)
+                scores[saga_id] = scores.get(saga_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        # 分数相同按 ID 排序，保证结果稳定
+        ranked: List[Tuple[float, str]] = sorted(((-score, saga_id) for saga_id, score in scores.items()))
+        result = [saga_id for _, saga_id in ranked[:k]]
+
+        if len(result) < k:
+            chosen = set(result)
+            recent = sorted(
+                (saga_id for saga_id in self._doc_terms if saga_id not in chosen),
+                key=lambda saga_id: (self._last_updated[saga_id], saga_id),
+                reverse=True
+            )
+            result.extend(recent[:k - len(result)])
+        return result
@@ -0,0 +1,421 @@
+# src/saga_store.py
+import hashlib
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .config import SAGA_STORE_BACKEND, SAGA_LOG_ENABLED, SAGA_LOG_COMPACT_EVERY
+from .schema import Saga, SagaHeader, SagaStatus, EventNode
+
+class SagaStore(ABC):
+    """故事线持久化接口；SagaManager / SagaReporter 只通过它读写，不关心底层格式"""
+
+    @abstractmethod
+    def load_all(self) -> Dict[str, Saga]:
+        """读出全部故事线 (saga_id -> Saga)"""
+
+    @abstractmethod
+    def get(self, saga_id: str) -> Optional[Saga]:
+        ...
+
+    @abstractmethod
+    def save(self, saga: Saga):
+        """整体写入 (新建或覆盖) 一个故事线"""
+
+    @abstractmethod
+    def append_event(self, saga: Saga, event: EventNode):
+        """saga 已在内存中追加了 event，这里只持久化增量"""
+
+    @abstractmethod
+    def processed_urls(self) -> Set[str]:
+        """所有事件的 source_url (用于去重)"""
+
+    @abstractmethod
+    def sagas_for_urls(self, urls: Iterable[str]) -> Dict[str, Saga]:
+        """URL -> 包含该 URL 事件的故事线 (报告关联历史用)"""
+
+    @abstractmethod
+    def fingerprint(self) -> str:
+        """不解析内容即可得到的存储状态指纹，派生索引据此判断是否过期"""
+
+    def load_headers(self, recent: int = 5) -> Dict[str, SagaHeader]:
+        """只读头信息 (事件数与最近 recent 个事件标题)；默认实现需要读出全部事件"""
+        return {saga_id: SagaHeader.from_saga(saga, recent) for saga_id, saga in self.load_all().items()}
+
+    def save_many(self, sagas: Iterable[Saga]):
+        with self.transaction():
+            for saga in sagas:
+                self.save(saga)
+
+    @contextmanager
+    def transaction(self):
+        """批量写入的事务边界；不支持事务的后端直接执行"""
+        yield
+
+    def compact(self) -> int:
+        """把增量写入合并进主存储 (按需或每次运行结束时调用)"""
+        return 0
+
+    def close(self):
+        pass
+
+class JsonSagaStore(SagaStore):
+    """
+    原有格式：每个故事线一个缩进 JSON 快照 ({db_dir}/{saga_id}.json)，便于在 Git 中查看差异。
+
+    开启事件日志 (log_path) 时，新建/追加只向日志追加一行 (O(1))，读取时在快照上重放；
+    compact() 把日志合并进快照 (临时文件 + 原子 rename) 后清空日志。
+    重放按事件序号幂等，任何时刻崩溃 (含写了一半的日志行) 都能恢复到最后一条完整记录。
+    """
+    def __init__(self, db_dir: str, log_path: Optional[str] = None, compact_every: int = SAGA_LOG_COMPACT_EVERY):
+        self.db_dir = Path(db_dir)
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        self.log_path = Path(log_path) if log_path else None
+        self.compact_every = compact_every
+        # 尚未合并进快照的日志操作 (saga_id -> 按顺序的操作)
+        self._pending: Dict[str, List[Dict]] = {}
+        self._log_ops = 0
+        if self.log_path:
+            self._read_log()
+
+    def _path(self, saga_id: str) -> Path:
+        return self.db_dir / f"{saga_id}.json"
+
+    def _read_log(self):
+        if not self.log_path.exists():
+            return
+        valid_end = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    if line.strip():
+                        op = json.loads(line)
+                        saga_id = op["saga"]["id"] if op["op"] == "put" else op["saga_id"]
+                        self._pending.setdefault(saga_id, []).append(op)
+                        self._log_ops += 1
+                except (ValueError, KeyError, TypeError):
+                    break
+                valid_end += len(line)
+        if valid_end < self.log_path.stat().st_size:
+            # 中断写入留下的残行 (写入是顺序追加的，其后不会再有完整记录)：截掉，避免后续追加接在残行上
+            print(f"⚠️ 事件日志末尾有不完整记录，已截断: {self.log_path}")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(valid_end)
+
+    def _append_log(self, saga_id: str, op: Dict):
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._pending.setdefault(saga_id, []).append(op)
+        self._log_ops += 1
+        if self.compact_every and self._log_ops >= self.compact_every:
+            self.compact()
+
+    @staticmethod
+    def _replay(saga: Optional[Saga], ops: List[Dict]) -> Optional[Saga]:
+        for op in ops:
+            if op["op"] == "put":
+                saga = Saga(**op["saga"])
+            elif saga is not None and op["seq"] == len(saga.events):
+                # seq 小于当前长度说明已合并进快照，跳过
+                saga.events.append(EventNode(**op["event"]))
+                saga.last_updated = op["last_updated"]
+                saga.status = SagaStatus(op["status"])
+        return saga
+
+    def _read_snapshot(self, file_path: Path) -> Optional[Saga]:
+        try:
+            return Saga.model_validate_json(file_path.read_text(encoding='utf-8'))
+        except Exception as e:
+            print(f"⚠️ 加载 Saga 异常 {file_path}: {e}")
+            return None
+
+    def _write_snapshot(self, saga: Saga):
+        file_path = self._path(saga.id)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(saga.model_dump_json(indent=2))
+        os.replace(tmp_path, file_path)
+
+    def load_all(self) -> Dict[str, Saga]:
+        sagas: Dict[str, Saga] = {}
+        for file_path in self.db_dir.glob("*.json"):
+            saga = self._read_snapshot(file_path)
+            if saga is not None:
+                sagas[saga.id] = saga
+        for saga_id, ops in self._pending.items():
+            saga = self._replay(sagas.get(saga_id), ops)
+            if saga is not None:
+                sagas[saga_id] = saga
+        return sagas
+
+    def get(self, saga_id: str) -> Optional[Saga]:
+        file_path = self._path(saga_id)
+        saga = self._read_snapshot(file_path) if file_path.exists() else None
+        return self._replay(saga, self._pending.get(saga_id, []))
+
+    def save(self, saga: Saga):
+        if self.log_path:
+            self._append_log(saga.id, {"op": "put", "saga": saga.model_dump(mode="json")})
+        else:
+            self._write_snapshot(saga)
+
+    def append_event(self, saga: Saga, event: EventNode):
+        if not self.log_path:
+            # 没有日志时只能整体重写快照
+            self._write_snapshot(saga)
+            return
+        self._append_log(saga.id, {
+            "op": "append", "saga_id": saga.id, "seq": len(saga.events) - 1,
+            "event": event.model_dump(mode="json"), "last_updated": saga.last_updated,
+            "status": saga.status.value,
+        })
+
+    def compact(self) -> int:
+        """把日志中的改动合并进快照并清空日志，返回重写的快照数"""
+        if not self._pending:
+            return 0
+        count = 0
+        for saga_id in list(self._pending):
+            saga = self.get(saga_id)
+            if saga is not None:
+                self._write_snapshot(saga)
+                count += 1
+        # 快照全部落盘后才清空日志；中途崩溃时重放会跳过已合并的事件
+        tmp_path = self.log_path.with_name(self.log_path.name + ".tmp")
+        tmp_path.write_text("", encoding='utf-8')
+        os.replace(tmp_path, self.log_path)
+        self._pending.clear()
+        self._log_ops = 0
+        return count
+
+    def processed_urls(self) -> Set[str]:
+        return {e.source_url for saga in self.load_all().values() for e in saga.events if e.source_url}
+
+    def sagas_for_urls(self, urls: Iterable[str]) -> Dict[str, Saga]:
+        wanted = set(urls)
+        mapping: Dict[str, Saga] = {}
+        for saga in self.load_all().values():
+            for event in saga.events:
+                if event.source_url in wanted:
+                    mapping[event.source_url] = saga
+        return mapping
+
+    def fingerprint(self) -> str:
+        # 只看文件名与大小 (不用 mtime：CI 每次重新 checkout 都会改变 mtime)
+        digest = hashlib.sha1()
+        for file_path in sorted(self.db_dir.glob("*.json")):
+            digest.update(f"{file_path.name}:{file_path.stat().st_size}\n".encode('utf-8'))
+        if self.log_path and self.log_path.exists():
+            digest.update(f"log:{self.log_path.stat().st_size}".encode('utf-8'))
+        return "json:" + digest.hexdigest()
+
+class SqliteSagaStore(SagaStore):
+    """
+    SQLite 存储：sagas 表存头信息，events 表每个事件一行 (saga_id, seq) 为主键。
+    source_url / status / category / date 上建索引，去重与报告关联按索引查询，追加事件只插入一行。
+    """
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sagas (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                category TEXT NOT NULL,
+                status TEXT NOT NULL,
+                context_summary TEXT NOT NULL,
+                last_updated TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                saga_id TEXT NOT NULL REFERENCES sagas(id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                source_url TEXT NOT NULL,
+                causal_tag TEXT NOT NULL,
+                importance INTEGER NOT NULL,
+                PRIMARY KEY (saga_id, seq)
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_source_url ON events(source_url);
+            CREATE INDEX IF NOT EXISTS idx_events_date ON events(date);
+            CREATE INDEX IF NOT EXISTS idx_sagas_status ON sagas(status);
+            CREATE INDEX IF NOT EXISTS idx_sagas_category ON sagas(category);
+        """)
+        self.conn.commit()
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self):
+        """可嵌套；最外层退出时提交，异常时整体回滚"""
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.rollback()
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self.conn.commit()
+
+    @staticmethod
+    def _event_row(saga_id: str, seq: int, e: EventNode) -> tuple:
+        return (saga_id, seq, e.date, e.title, e.summary, e.source_url, e.causal_tag, e.importance)
+
+    def _build(self, header: tuple, event_rows: List[tuple]) -> Saga:
+        saga_id, title, category, status, context_summary, last_updated = header
+        events = [EventNode(date=r[0], title=r[1], summary=r[2], source_url=r[3], causal_tag=r[4], importance=r[5])
+                  for r in event_rows]
+        return Saga(id=saga_id, title=title, category=category, status=status,
+                    context_summary=context_summary, events=events, last_updated=last_updated)
+
+    def _load(self, where: str = "", params: tuple = ()) -> Dict[str, Saga]:
+        headers = self.conn.execute(
+            f"SELECT id, title, category, status, context_summary, last_updated FROM sagas {where}", params
+        ).fetchall()
+        if not headers:
+            return {}
+        events: Dict[str, List[tuple]] = {h[0]: [] for h in headers}
+        event_where = where.replace("WHERE id", "WHERE saga_id")
+        for row in self.conn.execute(
+            f"SELECT saga_id, date, title, summary, source_url, causal_tag, importance FROM events "
+            f"{event_where} ORDER BY saga_id, seq", params
+        ):
+            if row[0] in events:
+                events[row[0]].append(row[1:])
+        return {h[0]: self._build(h, events[h[0]]) for h in headers}
+
+    def load_all(self) -> Dict[str, Saga]:
+        return self._load()
+
+    def get(self, saga_id: str) -> Optional[Saga]:
+        return self._load("WHERE id = ?", (saga_id,)).get(saga_id)
+
+    def load_headers(self, recent: int = 5) -> Dict[str, SagaHeader]:
+        headers: Dict[str, SagaHeader] = {}
+        for saga_id, title, category, status, context_summary, last_updated, event_count, oldest in self.conn.execute(
+            "SELECT s.id, s.title, s.category, s.status, s.context_summary, s.last_updated, "
+            "(SELECT COUNT(*) FROM events e WHERE e.saga_id = s.id), "
+            "(SELECT e.date FROM events e WHERE e.saga_id = s.id ORDER BY e.seq LIMIT 1) FROM sagas s"
+        ):
+            headers[saga_id] = SagaHeader(id=saga_id, title=title, category=category, status=status,
+                                          context_summary=context_summary, last_updated=last_updated,
+                                          event_count=event_count, oldest_hot_date=oldest or "")
+        if recent:
+            for saga_id, title in self.conn.execute(
+                "SELECT saga_id, title FROM (SELECT saga_id, seq, title, ROW_NUMBER() OVER "
+                "(PARTITION BY saga_id ORDER BY seq DESC) AS rn FROM events) WHERE rn <= ? ORDER BY saga_id, seq",
+                (recent,)
+            ):
+                if saga_id in headers:
+                    headers[saga_id].recent_titles.append(title)
+        return headers
+
+    def _load_ids(self, saga_ids: List[str]) -> Dict[str, Saga]:
+        sagas: Dict[str, Saga] = {}
+        # 分块避免超过 SQLite 的参数个数上限
+        for start in range(0, len(saga_ids), 500):
+            chunk = saga_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            sagas.update(self._load(f"WHERE id IN ({placeholders})", tuple(chunk)))
+        return sagas
+
+    def save(self, saga: Saga):
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sagas (id, title, category, status, context_summary, last_updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (saga.id, saga.title, saga.category, saga.status.value, saga.context_summary, saga.last_updated)
+            )
+            self.conn.execute("DELETE FROM events WHERE saga_id = ?", (saga.id,))
+            self.conn.executemany(
+                "INSERT INTO events (saga_id, seq, date, title, summary, source_url, causal_tag, importance) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._event_row(saga.id, seq, e) for seq, e in enumerate(saga.events)]
+            )
+
+    def append_event(self, saga: Saga, event: EventNode):
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO events (saga_id, seq, date, title, summary, source_url, causal_tag, importance) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._event_row(saga.id, len(saga.events) - 1, event)
+            )
+            self.conn.execute("UPDATE sagas SET last_updated = ?, status = ? WHERE id = ?",
+                              (saga.last_updated, saga.status.value, saga.id))
+
+    def processed_urls(self) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT source_url FROM events WHERE source_url != ''")}
+
+    def sagas_for_urls(self, urls: Iterable[str]) -> Dict[str, Saga]:
+        urls = list(set(urls))
+        url_to_id: Dict[str, str] = {}
+        for start in range(0, len(urls), 500):
+            chunk = urls[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for url, saga_id in self.conn.execute(
+                f"SELECT source_url, saga_id FROM events WHERE source_url IN ({placeholders})", tuple(chunk)
+            ):
+                url_to_id[url] = saga_id
+        sagas = self._load_ids(sorted(set(url_to_id.values())))
+        return {url: sagas[saga_id] for url, saga_id in url_to_id.items() if saga_id in sagas}
+
+    def fingerprint(self) -> str:
+        sagas = self.conn.execute("SELECT COUNT(*) FROM sagas").fetchone()[0]
+        events, max_rowid = self.conn.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM events").fetchone()
+        return f"sqlite:{sagas}:{events}:{max_rowid}"
+
+    def compact(self) -> int:
+        # SQLite 的增量在 WAL 中，检查点后截断 WAL 文件
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return 0
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "sagas": self.conn.execute("SELECT COUNT(*) FROM sagas").fetchone()[0],
+            "events": self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+        }
+
+    def close(self):
+        self.conn.close()
+
+def sqlite_path_for(db_dir: str) -> Path:
+    """故事线目录对应的数据库路径: data/sagas -> data/sagas.sqlite"""
+    db_dir = Path(db_dir)
+    return db_dir.with_name(f"{db_dir.name}.sqlite")
+
+def log_path_for(db_dir: str) -> Path:
+    """JSON 存储的事件日志路径: data/sagas -> data/sagas.log.jsonl"""
+    db_dir = Path(db_dir)
+    return db_dir.with_name(f"{db_dir.name}.log.jsonl")
+
+def index_dir_for(db_dir: str) -> Path:
+    """故事线派生索引 (URL 索引、近似重复索引) 的目录: data/sagas -> data/sagas_index"""
+    db_dir = Path(db_dir)
+    return db_dir.with_name(f"{db_dir.name}_index")
+
+def open_saga_store(db_dir: str = "data/sagas", backend: str = SAGA_STORE_BACKEND) -> SagaStore:
+    if backend == "auto":
+        backend = "sqlite" if sqlite_path_for(db_dir).exists() else "json"
+    if backend == "sqlite":
+        return SqliteSagaStore(str(sqlite_path_for(db_dir)))
+    if backend == "json":
+        return JsonSagaStore(db_dir, log_path=str(log_path_for(db_dir)) if SAGA_LOG_ENABLED else None)
+    raise ValueError(f"未知的故事线存储后端: {backend}")
+
+def export_json(store: SagaStore, out_dir: str) -> int:
+    """把故事线导出为原有的每文件一个 JSON 格式 (直接写快照)，返回导出数量"""
+    target = JsonSagaStore(out_dir)
+    sagas = store.load_all()
+    target.save_many(sagas.values())
+    return len(sagas)
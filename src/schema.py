@@ -47,4 +47,26 @@ class Saga(BaseModel):
     status: SagaStatus
     context_summary: str
     events: List[EventNode]
-    last_updated: str
\ No newline at end of file
+    last_updated: str
+
+
+class SagaHeader(BaseModel):
+    """Saga 的轻量头信息 (不含事件列表)，路由与检索只需要这些字段"""
+    id: str
+    title: str
+    category: str
+    status: SagaStatus
+    context_summary: str
+    last_updated: str
+    event_count: int = 0       # 热存储中的事件数
+    cold_count: int = 0        # 已转入冷存储的事件数
+    oldest_hot_date: str = ""  # 热存储中最早事件的日期 (冷存储归档据此挑选候选，空值表示未知)
+    recent_titles: List[str] = []  # 最近几个事件的标题 (检索索引用)
+
+    @classmethod
+    def from_saga(cls, saga: "Saga", recent: int = 5, cold_count: int = 0) -> "SagaHeader":
+        return cls(id=saga.id, title=saga.title, category=saga.category, status=saga.status,
+                   context_summary=saga.context_summary, last_updated=saga.last_updated,
+                   event_count=len(saga.events), cold_count=cold_count,
+                   oldest_hot_date=saga.events[0].date if saga.events else "",
+                   recent_titles=[e.title for e in saga.events[-recent:]] if recent else [])
@@ -0,0 +1,103 @@
+# src/url_index.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from .schema import Saga
+
+class UrlIndex:
+    """
+    持久化的 URL -> (saga_id, 事件下标) 索引，供去重与报告关联共用，查询 O(1)。
+
+    - 条目追加写入 JSONL，新建/追加事件时增量登记
+    - 旁路的 meta 文件记录条目数、条目摘要 (各条目哈希按位异或，与顺序无关) 以及写入时的存储指纹；
+      flush() 在每次运行结束时更新它
+    - load() 时任一项对不上 (中途崩溃、手工改过故事线、换了存储后端) 即返回 False，由调用方 rebuild()
+    """
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.meta_path = self.path.with_name(self.path.stem + ".meta.json")
+        self._entries: Dict[str, Tuple[str, int]] = {}
+        self._digest = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def get(self, url: str) -> Optional[Tuple[str, int]]:
+        return self._entries.get(url)
+
+    @staticmethod
+    def _entry_hash(url: str, saga_id: str, idx: int) -> int:
+        return int.from_bytes(hashlib.sha1(f"{url}\t{saga_id}\t{idx}".encode('utf-8')).digest()[:8], 'big')
+
+    def _set(self, url: str, saga_id: str, idx: int):
+        old = self._entries.get(url)
+        if old is not None:
+            self._digest ^= self._entry_hash(url, *old)
+        self._entries[url] = (saga_id, idx)
+        self._digest ^= self._entry_hash(url, saga_id, idx)
+
+    @property
+    def checksum(self) -> str:
+        return f"{self._digest:016x}"
+
+    def add(self, url: str, saga_id: str, idx: int):
+        """登记一个事件并追加写盘 (同一 URL 以最后一次为准)"""
+        if not url or self._entries.get(url) == (saga_id, idx):
+            return
+        self._set(url, saga_id, idx)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"url": url, "saga_id": saga_id, "idx": idx}, ensure_ascii=False) + "\n")
+
+    def _write_meta(self, fingerprint: str):
+        self.meta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"count": len(self._entries), "checksum": self.checksum, "store": fingerprint}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def flush(self, fingerprint: str):
+        """记录当前条目与存储状态一致 (在存储写入完成后调用)"""
+        self._write_meta(fingerprint)
+
+    def load(self, fingerprint: str) -> bool:
+        """重放索引文件并校验；索引缺失、条目摘要或存储指纹不一致时返回 False"""
+        self._entries.clear()
+        self._digest = 0
+        if not self.path.exists() or not self.meta_path.exists():
+            return False
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._set(record["url"], record["saga_id"], int(record["idx"]))
+        except (ValueError, KeyError):
+            return False
+        return (meta.get("count") == len(self._entries) and meta.get("checksum") == self.checksum
+                and meta.get("store") == fingerprint)
+
+    def rebuild(self, sagas: Iterable[Saga], fingerprint: str) -> int:
+        """从故事线全量重建 (原子替换索引文件)，返回条目数"""
+        self._entries.clear()
+        self._digest = 0
+        for saga in sagas:
+            for idx, event in enumerate(saga.events):
+                if event.source_url:
+                    self._set(event.source_url, saga.id, idx)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for url, (saga_id, idx) in self._entries.items():
+                f.write(json.dumps({"url": url, "saga_id": saga_id, "idx": idx}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._write_meta(fingerprint)
+        return len(self._entries)
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+
+# src.config 在导入时读取环境变量，须在任何测试导入 src 之前设置
+os.environ.setdefault("LLM_API_KEY", "test")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["LLM_LEDGER_DIR"] = ""
+os.environ["RUN_JOURNAL_DIR"] = ""
@@ -0,0 +1,38 @@
+# tests/test_backfill_status.py
+import asyncio
+
+from src import backfill
+from src.archiver import DataArchiver
+from src.backfill import BackfillRunner
+from src.crawler import BriefingStream
+
+# 日期 -> 列表页结果：None 表示下载失败，(None, []) 表示页面正常但当天无节目
+LISTS = {
+    "20260101": None,
+    "20260102": (None, []),
+}
+
+class FakeCrawler:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def stream_daily_briefing(self, date_str):
+        return BriefingStream(self, date_str)
+
+    async def _fetch_daily_list(self, date_str):
+        return LISTS[date_str]
+
+def test_list_fetch_failure_is_failed_not_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, "CrawlerService", FakeCrawler)
+    runner = BackfillRunner(DataArchiver(str(tmp_path / "archive")), str(tmp_path / "progress.json"))
+
+    stats = asyncio.run(runner.run(list(LISTS)))
+
+    assert runner.progress["20260101"]["status"] == BackfillRunner.FAILED
+    assert runner.progress["20260102"]["status"] == BackfillRunner.EMPTY
+    assert stats[BackfillRunner.FAILED] == 1 and stats[BackfillRunner.EMPTY] == 1
+    # 失败的日期下次回填会重试，无内容的日期默认跳过
+    assert runner.pending_dates(list(LISTS)) == ["20260101"]
@@ -0,0 +1,49 @@
+# tests/test_http_cache.py
+import json
+import os
+import time
+
+from src.http_cache import ResponseCache
+
+def _age(cache, url, days):
+    """把条目的最近使用时间改到 days 天前 (响应体文件同样改旧)"""
+    index_path = cache._index_path(url, "http")
+    meta = json.loads(index_path.read_text(encoding='utf-8'))
+    meta["fetched_at"] -= days * 86400
+    index_path.write_text(json.dumps(meta), encoding='utf-8')
+    old = time.time() - days * 86400
+    os.utime(cache._blob_path(meta["body_sha256"]), (old, old))
+
+def test_prune_removes_stale_entries_and_orphan_blobs(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_days=30)
+    cache.store("http://a/old", 200, {}, b"old body")
+    cache.store("http://a/shared-old", 200, {}, b"shared body")
+    cache.store("http://a/shared-new", 200, {}, b"shared body")
+    cache.store("http://a/new", 200, {}, b"new body")
+    for url in ("http://a/old", "http://a/shared-old"):
+        _age(cache, url, 40)
+
+    assert cache.prune() == {"entries": 2, "blobs": 1}
+
+    assert cache.lookup("http://a/old") is None
+    assert cache.lookup("http://a/shared-old") is None
+    # 仍被新条目引用的响应体保留
+    assert cache.lookup("http://a/shared-new").body == b"shared body"
+    assert cache.lookup("http://a/new").body == b"new body"
+
+def test_touch_keeps_entry_alive(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_days=30)
+    cache.store("http://a/page", 200, {"ETag": "x"}, b"body")
+    _age(cache, "http://a/page", 40)
+    cache.touch(cache.lookup("http://a/page"))
+
+    assert cache.prune() == {"entries": 0, "blobs": 0}
+    assert cache.lookup("http://a/page") is not None
+
+def test_replay_mode_never_prunes(tmp_path):
+    ResponseCache(str(tmp_path)).store("http://a/page", 200, {}, b"body")
+    replay = ResponseCache(str(tmp_path), mode="replay", ttl_days=0.0000001)
+    time.sleep(0.05)
+
+    assert replay.prune() == {"entries": 0, "blobs": 0}
+    assert replay.lookup("http://a/page") is not None
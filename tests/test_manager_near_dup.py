@@ -0,0 +1,60 @@
+# tests/test_manager_near_dup.py
+import asyncio
+import json
+import re
+import types
+
+from src.manager import SagaManager
+from src.schema import RawNewsItem
+
+DATE = "20260101"
+TYPHOON = "强台风今日下午在东南沿海登陆，中心附近最大风力十四级，沿海多地启动防汛一级应急响应，转移群众二十余万人，铁路航班大面积停运。"
+
+# 列表序号 -> (标题, 正文)；0 与 1 是换了标题与 URL 的同一篇稿件
+ITEMS = {
+    0: ("台风登陆", TYPHOON),
+    1: ("台风登陆东南沿海", TYPHOON + "记者现场报道。"),
+    2: ("芯片新规", "半导体出口管制新规今日发布，涉及先进制程设备与相关技术服务，主管部门表示将分阶段实施并设置过渡期安排。"),
+}
+
+def make_manager(tmp_path, route_calls):
+    async def fake_create(model, messages, response_format, temperature):
+        system, user = messages[0]["content"], messages[1]["content"]
+        if "分配到合适的处理路径" in system:
+            route_calls.append(re.search(r"标题: (\S+)", user).group(1))
+            body = {"action": "create"}
+        elif "Event Node" in system:
+            body = {"summary": "摘要", "causal_tag": "其他", "importance": 3}
+        else:
+            body = {"title": re.search(r"标题: (\S+)", user).group(1), "category": "其他", "context_summary": ""}
+        return types.SimpleNamespace(
+            usage=types.SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20),
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=json.dumps(body, ensure_ascii=False)))])
+
+    manager = SagaManager(str(tmp_path / "sagas"), concurrency=4, pre_route=False, near_dup=True)
+    manager.intelligence.client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=fake_create)))
+    return manager
+
+async def stream(completion_order):
+    for index in completion_order:
+        title, content = ITEMS[index]
+        await asyncio.sleep(0)
+        yield (index, 0), RawNewsItem(title=title, url=f"u{index}", content=content, date=DATE)
+
+def test_concurrent_mode_catches_same_day_near_duplicates(tmp_path):
+    expected = {"台风登陆": ["u0", "u1"], "芯片新规": ["u2"]}
+    for completion_order in ([0, 1, 2], [1, 0, 2], [2, 1, 0]):
+        route_calls = []
+        manager = make_manager(tmp_path / "".join(map(str, completion_order)), route_calls)
+        asyncio.run(manager.process_news_stream(stream(completion_order)))
+        timelines = {saga.title: [event.source_url for event in saga.events]
+                     for saga in manager.sagas.iter_full_history()}
+        assert timelines == expected, completion_order
+        assert manager.near_dup_stats["attached"] == 1
+        # 相似稿件先到达时，它已发出的路由结果作废，这一对最多路由两次
+        assert route_calls.count("台风登陆") + route_calls.count("台风登陆东南沿海") <= 2
+    # 播出在前的稿件先到达时，后一条不调用 LLM
+    route_calls = []
+    asyncio.run(make_manager(tmp_path / "again", route_calls).process_news_stream(stream([0, 1, 2])))
+    assert "台风登陆东南沿海" not in route_calls
@@ -0,0 +1,69 @@
+# tests/test_manager_order.py
+import asyncio
+import json
+import re
+import types
+
+from src.manager import SagaManager
+from src.schema import RawNewsItem
+
+DATE = "20260101"
+
+# (列表序号, 子条目序号) -> (标题, 正文)；序号 1 是拆成两条的快讯，序号 3 获取失败
+ITEMS = {
+    (0, 0): ("台风登陆", "强台风今日登陆东南沿海 防汛应急响应启动"),
+    (1, 0): ("台风续报一", "强台风继续影响东南沿海 防汛应急响应升级"),
+    (1, 1): ("芯片新规", "半导体出口管制新规发布 涉及先进制程设备"),
+    (2, 0): ("台风续报二", "强台风减弱 东南沿海防汛应急响应解除"),
+    (4, 0): ("台风续报三", "台风过境后东南沿海灾后重建启动"),
+}
+SUB_COUNTS = {0: 1, 1: 2, 2: 1, 3: 0, 4: 1}
+
+async def fake_create(model, messages, response_format, temperature):
+    system, user = messages[0]["content"], messages[1]["content"]
+    if "分配到合适的处理路径" in system:
+        match = re.search(r'"id": "([^"]+)", "title": "台风登陆"', system)
+        if "续报" in user and match:
+            body = {"action": "append", "saga_id": match.group(1)}
+        else:
+            body = {"action": "create"}
+    elif "Event Node" in system:
+        body = {"summary": "摘要", "causal_tag": "其他", "importance": 3}
+    else:
+        title = re.search(r"标题: (\S+)", user).group(1)
+        body = {"title": title, "category": "其他", "context_summary": ""}
+    return types.SimpleNamespace(
+        usage=types.SimpleNamespace(prompt_tokens=10, completion_tokens=10, total_tokens=20),
+        choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=json.dumps(body, ensure_ascii=False)))])
+
+class OutOfOrderStream:
+    """按给定的完成顺序产出条目，并像 BriefingStream 一样在产出前登记 sub_counts"""
+    def __init__(self, completion_order):
+        self.completion_order = completion_order
+        self.sub_counts = {}
+
+    async def _run(self):
+        for index in self.completion_order:
+            self.sub_counts[index] = SUB_COUNTS[index]
+            for sub_index in range(SUB_COUNTS[index]):
+                title, content = ITEMS[(index, sub_index)]
+                await asyncio.sleep(0)
+                yield (index, sub_index), RawNewsItem(title=title, url=f"u{index}.{sub_index}",
+                                                      content=content, date=DATE)
+
+    def __aiter__(self):
+        return self._run()
+
+def timelines(completion_order, tmp_path) -> dict:
+    manager = SagaManager(str(tmp_path / "sagas"), concurrency=1, pre_route=False, near_dup=False)
+    manager.intelligence.client = types.SimpleNamespace(
+        chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=fake_create)))
+    asyncio.run(manager.process_news_stream(OutOfOrderStream(completion_order)))
+    return {saga.title: [event.source_url for event in saga.events]
+            for saga in manager.sagas.iter_full_history()}
+
+def test_sequential_mode_applies_in_broadcast_order(tmp_path):
+    expected = {"台风登陆": ["u0.0", "u1.0", "u2.0", "u4.0"], "芯片新规": ["u1.1"]}
+    assert timelines([0, 1, 2, 3, 4], tmp_path / "in_order") == expected
+    assert timelines([4, 2, 3, 1, 0], tmp_path / "reversed") == expected
+    assert timelines([2, 0, 4, 3, 1], tmp_path / "shuffled") == expected